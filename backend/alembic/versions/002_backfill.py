@@ -0,0 +1,52 @@
+"""Backfill jobs and ranges
+
+Revision ID: 002_backfill
+Revises: 001_initial
+Create Date: 2024-02-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '002_backfill'
+down_revision = '001_initial'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Backfill jobs
+    op.create_table(
+        'backfill_jobs',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, server_default=sa.text('gen_random_uuid()')),
+        sa.Column('chain', sa.String(10), nullable=False, index=True),
+        sa.Column('start_block', sa.Integer(), nullable=False),
+        sa.Column('end_block', sa.Integer(), nullable=False),
+        sa.Column('range_size', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False, index=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+    )
+    
+    # Backfill ranges
+    op.create_table(
+        'backfill_ranges',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, server_default=sa.text('gen_random_uuid()')),
+        sa.Column('job_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('backfill_jobs.id'), nullable=False, index=True),
+        sa.Column('start_block', sa.Integer(), nullable=False),
+        sa.Column('end_block', sa.Integer(), nullable=False),
+        sa.Column('checkpoint', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(20), nullable=False, index=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('queued_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('backfill_ranges')
+    op.drop_table('backfill_jobs')
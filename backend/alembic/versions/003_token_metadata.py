@@ -0,0 +1,35 @@
+"""Token metadata cache
+
+Revision ID: 003_token_metadata
+Revises: 002_backfill
+Create Date: 2024-02-08 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '003_token_metadata'
+down_revision = '002_backfill'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Resolved ERC20 symbol/decimals
+    op.create_table(
+        'token_metadata',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, server_default=sa.text('gen_random_uuid()')),
+        sa.Column('address', sa.String(255), nullable=False, unique=True, index=True),
+        sa.Column('symbol', sa.String(50), nullable=False),
+        sa.Column('decimals', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('resolved_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('token_metadata')
@@ -0,0 +1,59 @@
+"""Natural key on raw transfers
+
+Revision ID: 004_transfer_natural_key
+Revises: 003_token_metadata
+Create Date: 2024-02-20 00:00:00.000000
+
+ERC20 transfers ingested from receipts before the parser stored the
+block-level logIndex carry the log's position within its receipt instead,
+so re-ingesting those blocks would not match them and would store every
+transfer twice. They cannot be rewritten without the receipts: delete them
+by passing the time the block-level log index was deployed,
+
+    alembic -x evm_log_index_since=2024-02-15T00:00:00 upgrade head
+
+then re-ingest the affected block ranges with POST /admin/backfill and run
+scripts/rebuild_metrics.py. Without the argument they are kept, and those
+ranges must not be re-ingested.
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004_transfer_natural_key'
+down_revision = '003_token_metadata'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    legacy_before = context.get_x_argument(as_dictionary=True).get("evm_log_index_since")
+    if legacy_before:
+        # Native transfers have no log index and are unaffected
+        op.execute(sa.text(
+            "DELETE FROM raw_transfers WHERE chain = 'EVM' AND log_index IS NOT NULL AND created_at < :before"
+        ).bindparams(before=legacy_before))
+    
+    # Drop duplicates from re-processed blocks, keeping the first row written
+    op.execute("""
+        DELETE FROM raw_transfers a
+        USING raw_transfers b
+        WHERE a.chain = b.chain
+          AND a.tx_hash = b.tx_hash
+          AND COALESCE(a.log_index, -1) = COALESCE(b.log_index, -1)
+          AND a.direction = b.direction
+          AND (a.created_at, a.id) > (b.created_at, b.id)
+    """)
+    
+    # Native transfers and BTC transactions have no log index
+    op.create_index(
+        'uq_raw_transfers_natural_key',
+        'raw_transfers',
+        ['chain', 'tx_hash', sa.text('COALESCE(log_index, -1)'), 'direction'],
+        unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_raw_transfers_natural_key', table_name='raw_transfers')
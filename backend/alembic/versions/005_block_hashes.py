@@ -0,0 +1,35 @@
+"""Recent block hashes for reorg detection
+
+Revision ID: 005_block_hashes
+Revises: 004_transfer_natural_key
+Create Date: 2024-02-27 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '005_block_hashes'
+down_revision = '004_transfer_natural_key'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Last ingested blocks per chain, checked for parent-hash continuity
+    op.create_table(
+        'block_hashes',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, server_default=sa.text('gen_random_uuid()')),
+        sa.Column('chain', sa.String(10), nullable=False),
+        sa.Column('height', sa.Integer(), nullable=False),
+        sa.Column('hash', sa.String(100), nullable=False),
+        sa.Column('parent_hash', sa.String(100), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+    )
+    op.create_index('uq_block_hashes_chain_height', 'block_hashes', ['chain', 'height'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_block_hashes_chain_height', table_name='block_hashes')
+    op.drop_table('block_hashes')
@@ -0,0 +1,127 @@
+"""Partition raw transfers by month
+
+Revision ID: 006_partition_raw_transfers
+Revises: 005_block_hashes
+Create Date: 2024-03-05 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '006_partition_raw_transfers'
+down_revision = '005_block_hashes'
+branch_labels = None
+depends_on = None
+
+# Months of empty partitions created past the current one (partition_maintenance_task keeps this up)
+PREMAKE_MONTHS = 3
+
+COLUMNS = (
+    "id, timestamp, chain, tx_hash, block_number, log_index, from_address, to_address, "
+    "asset_symbol, asset_address, amount, direction, exchange_from_id, exchange_to_id, created_at"
+)
+
+
+def _columns():
+    return [
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False, server_default=sa.text('gen_random_uuid()')),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.Column('chain', sa.String(10), nullable=False),
+        sa.Column('tx_hash', sa.String(255), nullable=False),
+        sa.Column('block_number', sa.Integer(), nullable=False),
+        sa.Column('log_index', sa.Integer(), nullable=True),
+        sa.Column('from_address', sa.String(255), nullable=False),
+        sa.Column('to_address', sa.String(255), nullable=False),
+        sa.Column('asset_symbol', sa.String(50), nullable=False),
+        sa.Column('asset_address', sa.String(255), nullable=True),
+        sa.Column('amount', sa.Numeric(36, 18), nullable=False),
+        sa.Column('direction', sa.String(20), nullable=False),
+        sa.Column('exchange_from_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('exchanges.id'), nullable=True),
+        sa.Column('exchange_to_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('exchanges.id'), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+    ]
+
+
+def _rename_old_table():
+    """Move the current table and its index names out of the way"""
+    op.rename_table('raw_transfers', 'raw_transfers_old')
+    op.execute("""
+        DO $$
+        DECLARE index_name text;
+        BEGIN
+            FOR index_name IN SELECT indexname FROM pg_indexes WHERE tablename = 'raw_transfers_old' LOOP
+                EXECUTE format('ALTER INDEX %I RENAME TO %I', index_name, index_name || '_old');
+            END LOOP;
+        END $$;
+    """)
+
+
+def upgrade() -> None:
+    _rename_old_table()
+    
+    # The partition key has to be part of every unique constraint, including the primary key
+    op.create_table(
+        'raw_transfers',
+        *_columns(),
+        sa.PrimaryKeyConstraint('id', 'timestamp', name='raw_transfers_pkey'),
+        postgresql_partition_by='RANGE (timestamp)'
+    )
+    
+    # One partition per month from the oldest transfer on
+    op.execute(f"""
+        DO $$
+        DECLARE month timestamp;
+        BEGIN
+            month := date_trunc('month', COALESCE((SELECT min(timestamp) FROM raw_transfers_old), now()));
+            WHILE month <= date_trunc('month', now()) + interval '{PREMAKE_MONTHS} months' LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF raw_transfers FOR VALUES FROM (%L) TO (%L)',
+                    'raw_transfers_' || to_char(month, 'YYYY_MM'), month, month + interval '1 month'
+                );
+                month := month + interval '1 month';
+            END LOOP;
+        END $$;
+    """)
+    
+    op.execute(f"INSERT INTO raw_transfers ({COLUMNS}) SELECT {COLUMNS} FROM raw_transfers_old")
+    op.drop_table('raw_transfers_old')
+    
+    # Built after the copy. Lookups by address, direction or exchange go through flow_metrics,
+    # so the single-column indexes on those are not carried over.
+    op.create_index(
+        'uq_raw_transfers_natural_key',
+        'raw_transfers',
+        ['chain', 'tx_hash', sa.text('COALESCE(log_index, -1)'), 'direction', 'timestamp'],
+        unique=True
+    )
+    op.create_index('ix_raw_transfers_timestamp', 'raw_transfers', ['timestamp'])
+    op.create_index('idx_raw_transfers_chain_block', 'raw_transfers', ['chain', 'block_number'])
+    op.create_index('idx_raw_transfers_asset_timestamp', 'raw_transfers', ['asset_symbol', 'timestamp'])
+
+
+def downgrade() -> None:
+    _rename_old_table()
+    
+    op.create_table(
+        'raw_transfers',
+        *_columns(),
+        sa.PrimaryKeyConstraint('id', name='raw_transfers_pkey')
+    )
+    op.execute(f"INSERT INTO raw_transfers ({COLUMNS}) SELECT {COLUMNS} FROM raw_transfers_old")
+    op.drop_table('raw_transfers_old')
+    
+    for column in (
+        'timestamp', 'chain', 'tx_hash', 'block_number', 'from_address', 'to_address',
+        'asset_symbol', 'direction', 'exchange_from_id', 'exchange_to_id',
+    ):
+        op.create_index(f'ix_raw_transfers_{column}', 'raw_transfers', [column])
+    op.create_index('idx_raw_transfers_chain_block', 'raw_transfers', ['chain', 'block_number'])
+    op.create_index('idx_raw_transfers_asset_timestamp', 'raw_transfers', ['asset_symbol', 'timestamp'])
+    op.create_index(
+        'uq_raw_transfers_natural_key',
+        'raw_transfers',
+        ['chain', 'tx_hash', sa.text('COALESCE(log_index, -1)'), 'direction'],
+        unique=True
+    )
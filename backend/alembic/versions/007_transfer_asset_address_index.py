@@ -0,0 +1,28 @@
+"""Index raw transfers by token address and symbol
+
+Revision ID: 007_transfer_asset_address_index
+Revises: 006_partition_raw_transfers
+Create Date: 2024-03-08 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007_transfer_asset_address_index'
+down_revision = '006_partition_raw_transfers'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Placeholder fixups of newly resolved tokens look up transfers by address and placeholder symbol
+    op.create_index(
+        'idx_raw_transfers_asset_address_symbol',
+        'raw_transfers',
+        ['asset_address', 'asset_symbol']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_raw_transfers_asset_address_symbol', table_name='raw_transfers')
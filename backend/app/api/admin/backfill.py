@@ -0,0 +1,100 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from typing import Optional
+from app.db.session import get_db
+from app.core.dependencies import get_current_admin
+from app.db.models import BackfillJob, User, Chain
+from app.ingestion.backfill import BackfillService
+
+router = APIRouter()
+
+
+class BackfillCreate(BaseModel):
+    chain: str
+    start_block: int
+    end_block: int
+    range_size: Optional[int] = None
+
+
+def _job_to_dict(job: BackfillJob, service: BackfillService) -> dict:
+    return {
+        "id": str(job.id),
+        "chain": job.chain.value,
+        "start_block": job.start_block,
+        "end_block": job.end_block,
+        "range_size": job.range_size,
+        "status": job.status.value,
+        "created_at": job.created_at.isoformat(),
+        "completed_at": job.completed_at.isoformat() if job.completed_at else None,
+        "progress": service.get_progress(job)
+    }
+
+
+@router.post("/backfill")
+async def create_backfill(
+    backfill: BackfillCreate,
+    current_user: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Create a backfill job, ranges are picked up by the worker's backfill dispatcher"""
+    try:
+        chain_enum = Chain(backfill.chain.upper())
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Chain must be EVM or BTC"
+        )
+    
+    service = BackfillService(db)
+    try:
+        job = service.create_job(chain_enum, backfill.start_block, backfill.end_block, backfill.range_size)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return _job_to_dict(job, service)
+
+
+@router.get("/backfill")
+async def list_backfills(
+    current_user: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """List backfill jobs with progress"""
+    service = BackfillService(db)
+    jobs = db.query(BackfillJob).order_by(BackfillJob.created_at.desc()).limit(100).all()
+    return [_job_to_dict(job, service) for job in jobs]
+
+
+@router.get("/backfill/{job_id}")
+async def get_backfill(
+    job_id: str,
+    current_user: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Get a backfill job with its ranges"""
+    job = db.query(BackfillJob).filter(BackfillJob.id == job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Backfill job not found"
+        )
+    
+    result = _job_to_dict(job, BackfillService(db))
+    result["ranges"] = [
+        {
+            "id": str(r.id),
+            "start_block": r.start_block,
+            "end_block": r.end_block,
+            "checkpoint": r.checkpoint,
+            "status": r.status.value,
+            "attempts": r.attempts,
+            "last_error": r.last_error,
+            "updated_at": r.updated_at.isoformat()
+        }
+        for r in sorted(job.ranges, key=lambda r: r.start_block)
+    ]
+    return result
@@ -1,8 +1,9 @@
 from fastapi import APIRouter
-from app.api.admin import exchanges, addresses, sync
+from app.api.admin import exchanges, addresses, sync, backfill
 
 admin_router = APIRouter(prefix="/admin", tags=["admin"])
 
 admin_router.include_router(exchanges.router)
 admin_router.include_router(addresses.router)
 admin_router.include_router(sync.router)
+admin_router.include_router(backfill.router)
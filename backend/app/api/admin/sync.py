@@ -72,18 +72,21 @@ async def reset_sync_state(
 
 @router.post("/jobs/resync")
 async def trigger_resync(
+    catch_up: bool = False,
     current_user: User = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    """Trigger a resync job (enqueue ingestion tasks)"""
+    """Trigger a resync job (enqueue ingestion tasks, catch_up runs until near the tip)"""
     try:
+        import json
         import redis
         from app.core.config import settings
         
         # Connect to Redis and enqueue tasks
         r = redis.from_url(settings.REDIS_URL)
-        r.lpush("celery", '{"id": "evm-resync", "task": "evm_sync_task", "args": [], "kwargs": {}}')
-        r.lpush("celery", '{"id": "btc-resync", "task": "btc_sync_task", "args": [], "kwargs": {}}')
+        kwargs = json.dumps({"catch_up": catch_up})
+        r.lpush("celery", f'{{"id": "evm-resync", "task": "evm_sync_task", "args": [], "kwargs": {kwargs}}}')
+        r.lpush("celery", f'{{"id": "btc-resync", "task": "btc_sync_task", "args": [], "kwargs": {kwargs}}}')
         
         return {"message": "Resync jobs enqueued"}
     except Exception as e:
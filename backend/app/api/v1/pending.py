@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.core.config import settings
+from app.core.dependencies import get_current_user
+from app.db.models import Chain, User
+from app.services.pending_flows import get_pending_store
+
+router = APIRouter()
+
+
+@router.get("/flows/pending")
+async def list_pending_flows(
+    chain: Chain = Query(Chain.EVM),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(get_current_user)
+):
+    """Unconfirmed transactions touching labeled addresses, most recently seen first"""
+    if not settings.PENDING_FLOWS_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pending flows are not enabled"
+        )
+    store = get_pending_store()
+    return {
+        "chain": chain.value,
+        "stats": store.stats(chain.value),
+        "flows": store.list(chain.value, limit)
+    }
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1 import auth, exchanges, alerts, unsubscribe, health
+from app.api.v1 import auth, exchanges, alerts, unsubscribe, health, pending
 
 api_router = APIRouter()
 
@@ -8,3 +8,4 @@ api_router.include_router(exchanges.router, tags=["exchanges"])
 api_router.include_router(alerts.router, tags=["alerts"])
 api_router.include_router(unsubscribe.router, tags=["unsubscribe"])
 api_router.include_router(health.router, tags=["health"])
+api_router.include_router(pending.router, tags=["pending"])
@@ -23,16 +23,102 @@ class Settings(BaseSettings):
     RESEND_API_KEY: str
     EMAIL_FROM: str
     
+    # HTTP transport shared by chain clients
+    HTTP_POOL_SIZE: int = 20  # Keep-alive connections per worker process
+    HTTP_TIMEOUT_SECONDS: float = 30
+    HTTP_MAX_RETRIES: int = 3  # Retries for connection errors, timeouts, 429 and 5xx
+    HTTP_RETRY_BACKOFF_SECONDS: float = 0.5  # Base of the jittered exponential backoff
+    HTTP_RETRY_BACKOFF_MAX_SECONDS: float = 10
+    HTTP2_ENABLED: bool = False  # Requires the h2 package
+    
+    # RPC endpoint routing (applies when several endpoints are configured)
+    RPC_HEALTH_WINDOW: int = 200  # Latency samples kept per endpoint
+    RPC_HEDGE_PERCENTILE: float = 95  # Send a hedged request once a call is slower than this percentile
+    RPC_HEDGE_MIN_DELAY_MS: int = 50  # Never hedge sooner than this
+    RPC_MAX_HEAD_LAG: int = 3  # Endpoints this many blocks behind the best head are skipped for tip queries
+    RPC_HEAD_REFRESH_SECONDS: int = 60  # Re-query every endpoint's head this often
+    
     # EVM
     EVM_RPC_URL: str
+    EVM_RPC_URLS: str = ""  # Comma-separated endpoints, overrides EVM_RPC_URL when set
+    EVM_RPC_BATCH_SIZE: int = 100  # Max calls per JSON-RPC batch request
+    EVM_RECEIPTS_MODE: str = "AUTO"  # AUTO, BLOCK (eth_getBlockReceipts), BATCH or PER_TX
+    EVM_ERC20_MODE: str = "RECEIPTS"  # RECEIPTS (scan every receipt) or LOGS (eth_getLogs on labeled addresses)
+    EVM_LOGS_ADDRESS_CHUNK_SIZE: int = 500  # Max labeled addresses per eth_getLogs topic filter
+    EVM_PIPELINE_ENABLED: bool = False  # Fetch blocks concurrently in threads ahead of the writer
+    EVM_PIPELINE_CONCURRENCY: int = 8  # Max blocks being fetched at once
+    EVM_PIPELINE_PREFETCH: int = 32  # Max blocks fetched ahead of the writer
+    EVM_SYNC_WINDOW_MAX: int = 500  # Upper bound of the adaptive blocks-per-batch window
+    EVM_SYNC_TARGET_BLOCK_MS: int = 1000  # Window shrinks when a block takes longer than this
+    EVM_CATCHUP_TARGET_LAG: int = 5  # Catch-up runs stop within this many blocks of the tip
+    EVM_WS_URL: str = ""  # WebSocket endpoint for the newHeads subscriber (wss://...), beat polling stays as fallback
+    EVM_WS_HEAD_TIMEOUT_SECONDS: int = 60  # Reconnect when no head arrives for this long
+    EVM_WS_RECONNECT_MAX_SECONDS: int = 60  # Upper bound of the reconnect backoff
+    EVM_WS_RETRY_SECONDS: float = 3  # Wait before retrying a head while the beat sync holds the lock
+    EVM_CONFIRMATIONS: int = 0  # Blocks behind the tip before a block is ingested (0 ingests the tip, reorgs are rolled back)
+    EVM_REORG_MAX_DEPTH: int = 128  # Recent block hashes kept for fork detection, deeper reorgs cannot be undone exactly
+    TOKEN_CACHE_SIZE: int = 50000  # Token metadata entries kept in memory per worker
+    TOKEN_RESOLVE_BATCH_SIZE: int = 200  # Max new tokens resolved per sync run
     
     # Bitcoin
     BTC_MODE: str = "CORE_RPC"  # CORE_RPC or EXPLORER
     BTC_RPC_URL: str = ""
+    BTC_RPC_URLS: str = ""  # Comma-separated endpoints, overrides BTC_RPC_URL when set
     BTC_RPC_USER: str = ""
     BTC_RPC_PASS: str = ""
     BTC_EXPLORER_BASE_URL: str = ""
     BTC_EXPLORER_API_KEY: str = ""
+    BTC_EXPLORER_RATE_LIMIT: float = 10  # Requests per second allowed by the explorer provider (per process)
+    BTC_EXPLORER_BURST: int = 20
+    BTC_EXPLORER_CONCURRENCY: int = 8  # Parallel block transaction page requests
+    BTC_NETWORK: str = "mainnet"  # mainnet, testnet, signet or regtest (address encoding)
+    BTC_BLOCK_FORMAT: str = "JSON"  # JSON or RAW (serialized blocks decoded in-process)
+    BTC_FILTER_PRESCAN: bool = False  # Skip blocks whose BIP158 filter matches no labeled script (CORE_RPC, needs -blockfilterindex)
+    BTC_BLOCK_VERBOSITY: int = 0  # getblock verbosity, 0 detects it from the node version (3 on Core 23.0+, else 2)
+    BTC_OUTPOINT_INDEX_MODE: str = "OFF"  # OFF, LABELED (outputs to labeled addresses) or FULL (every output)
+    BTC_OUTPOINT_INDEX_PATH: str = "data/btc_outpoints.sqlite3"
+    BTC_OUTPOINT_PRUNE_DEPTH: int = 100  # Spent outputs are kept this many blocks for re-processing
+    BTC_OUTPOINT_SCAN_TIMEOUT_SECONDS: float = 1800  # scantxoutset seeding a LABELED index reads the whole UTXO set
+    BTC_SYNC_WINDOW_MAX: int = 50  # Upper bound of the adaptive blocks-per-batch window
+    BTC_SYNC_TARGET_BLOCK_MS: int = 10000  # Window shrinks when a block takes longer than this
+    BTC_CATCHUP_TARGET_LAG: int = 1  # Catch-up runs stop within this many blocks of the tip
+    BTC_ZMQ_URL: str = ""  # Bitcoin Core -zmqpubhashblock endpoint (e.g. tcp://127.0.0.1:28332) for the push listener
+    BTC_ZMQ_DEBOUNCE_SECONDS: float = 2  # Sync starts once no new block was announced for this long
+    BTC_ZMQ_MAX_DELAY_SECONDS: float = 10  # ...or this long after the first announcement of a burst
+    BTC_CONFIRMATIONS: int = 0  # Blocks behind the tip before a block is ingested
+    BTC_REORG_MAX_DEPTH: int = 24  # Recent block hashes kept for fork detection
+    
+    # Pending (mempool) flows
+    PENDING_FLOWS_ENABLED: bool = False  # Syncs confirm pending flows in Redis as their transactions are ingested
+    PENDING_FLOW_TTL_SECONDS: int = 3600  # Unconfirmed flows expire after this long (dropped/replaced transactions)
+    PENDING_MAX_BACKLOG: int = 20000  # Pending tx hashes queued for lookup before the oldest are dropped
+    EVM_PENDING_WS_URL: str = ""  # newPendingTransactions endpoint, defaults to EVM_WS_URL
+    EVM_PENDING_FETCH_CONCURRENCY: int = 4  # Parallel eth_getTransactionByHash batches when the node only sends hashes
+    BTC_ZMQ_RAWTX_URL: str = ""  # Bitcoin Core -zmqpubrawtx endpoint (e.g. tcp://127.0.0.1:28333)
+    ADDRESS_INDEX_REFRESH_SECONDS: int = 60  # How often long-running watchers check the labeled address index
+    
+    # Sync
+    SYNC_CATCHUP_TIME_BUDGET_SECONDS: int = 600  # Max duration of a catch-up run
+    ADDRESS_INDEX_TTL_SECONDS: int = 300  # Labeled address index is rebuilt at least this often (catches edits)
+    ADDRESS_INDEX_XOR_FILTER: bool = False  # Xor filter in front of the exact lookup (slow to build in Python)
+    ADDRESS_INDEX_SET_MAX: int = 100000  # Up to this many addresses parsers also get a plain set/dict (faster, more memory)
+    TRANSFER_WRITE_METHOD: str = "COPY"  # COPY (PostgreSQL with psycopg2) or INSERT (multi-row INSERT ... VALUES)
+    TRANSFER_INSERT_BATCH_SIZE: int = 1000  # Rows per INSERT statement
+    SYNC_COMMIT_BLOCKS: int = 50  # Blocks committed per transaction (1 commits every block)
+    SYNC_COMMIT_MS: int = 1000  # A group is committed early once this long has passed since its first block
+    
+    # Storage
+    TRANSFER_PARTITION_PREMAKE_MONTHS: int = 3  # Monthly raw_transfers partitions created ahead of the current one
+    TRANSFER_RETENTION_MONTHS: int = 0  # Partitions older than this many months are detached (0 keeps everything)
+    TRANSFER_RETENTION_DROP: bool = False  # Drop detached partitions instead of keeping them as standalone tables
+    METRICS_AGGREGATE_LOOKBACK_HOURS: int = 48  # Periodic aggregation recomputes buckets from this far back
+    
+    # Backfill
+    BACKFILL_EVM_RANGE_SIZE: int = 1000  # Blocks per backfill range job
+    BACKFILL_BTC_RANGE_SIZE: int = 50
+    BACKFILL_MAX_ATTEMPTS: int = 5  # Range is marked failed after this many attempts
+    BACKFILL_RANGE_TIMEOUT_SECONDS: int = 1800  # Queued/running ranges older than this are re-dispatched
+    BACKFILL_DISPATCH_LIMIT: int = 50  # Max ranges enqueued per dispatch run
     
     # Admin
     ADMIN_EMAIL: str
@@ -44,6 +130,16 @@ class Settings(BaseSettings):
     def cors_origins_list(self) -> List[str]:
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
     
+    @property
+    def evm_rpc_urls_list(self) -> List[str]:
+        urls = [url.strip() for url in self.EVM_RPC_URLS.split(",") if url.strip()]
+        return urls or [self.EVM_RPC_URL]
+    
+    @property
+    def btc_rpc_urls_list(self) -> List[str]:
+        urls = [url.strip() for url in self.BTC_RPC_URLS.split(",") if url.strip()]
+        return urls or [self.BTC_RPC_URL]
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Integer, Numeric, Text, Enum as SQLEnum
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Index, Integer, Numeric, Text, Enum as SQLEnum, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -37,6 +37,20 @@ class TransferDirection(str, enum.Enum):
     UNKNOWN = "unknown"
 
 
+class BackfillStatus(str, enum.Enum):
+    PENDING = "pending"
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class TokenMetadataStatus(str, enum.Enum):
+    RESOLVED = "resolved"
+    FAILED = "failed"  # Not an ERC20 or metadata calls reverted, placeholder kept
+    PENDING = "pending"  # Transfers stored with placeholder metadata, not resolved yet
+
+
 class User(Base):
     __tablename__ = "users"
     
@@ -116,27 +130,104 @@ class SyncState(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
 
-class RawTransfer(Base):
-    __tablename__ = "raw_transfers"
+class BlockHash(Base):
+    __tablename__ = "block_hashes"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    chain = Column(SQLEnum(Chain), nullable=False)
+    height = Column(Integer, nullable=False)  # Block number (EVM) or height (BTC)
+    hash = Column(String(100), nullable=False)
+    parent_hash = Column(String(100), nullable=True)  # Unknown for BTC blocks skipped by the filter prescan
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        # Only the last *_REORG_MAX_DEPTH blocks of each chain are kept
+        Index("uq_block_hashes_chain_height", "chain", "height", unique=True),
+    )
+
+
+class BackfillJob(Base):
+    __tablename__ = "backfill_jobs"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    timestamp = Column(DateTime, nullable=False, index=True)
     chain = Column(SQLEnum(Chain), nullable=False, index=True)
-    tx_hash = Column(String(255), nullable=False, index=True)
-    block_number = Column(Integer, nullable=False, index=True)
+    start_block = Column(Integer, nullable=False)  # Block number (EVM) or height (BTC), inclusive
+    end_block = Column(Integer, nullable=False)  # Inclusive
+    range_size = Column(Integer, nullable=False)
+    status = Column(SQLEnum(BackfillStatus), default=BackfillStatus.PENDING, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    completed_at = Column(DateTime, nullable=True)
+    
+    ranges = relationship("BackfillRange", back_populates="job", cascade="all, delete-orphan")
+
+
+class BackfillRange(Base):
+    __tablename__ = "backfill_ranges"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    job_id = Column(UUID(as_uuid=True), ForeignKey("backfill_jobs.id"), nullable=False, index=True)
+    start_block = Column(Integer, nullable=False)  # Inclusive
+    end_block = Column(Integer, nullable=False)  # Inclusive
+    checkpoint = Column(Integer, nullable=True)  # Last block fully committed
+    status = Column(SQLEnum(BackfillStatus), default=BackfillStatus.PENDING, nullable=False, index=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    queued_at = Column(DateTime, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    job = relationship("BackfillJob", back_populates="ranges")
+
+
+class RawTransfer(Base):
+    __tablename__ = "raw_transfers"
+    
+    # Server defaults too, bulk writes leave id and created_at to the database
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, server_default=func.gen_random_uuid())
+    timestamp = Column(DateTime, primary_key=True, index=True)  # Partition key, part of every unique index
+    chain = Column(SQLEnum(Chain), nullable=False)
+    tx_hash = Column(String(255), nullable=False)
+    block_number = Column(Integer, nullable=False)
     log_index = Column(Integer, nullable=True)
-    from_address = Column(String(255), nullable=False, index=True)
-    to_address = Column(String(255), nullable=False, index=True)
-    asset_symbol = Column(String(50), nullable=False, index=True)
+    from_address = Column(String(255), nullable=False)
+    to_address = Column(String(255), nullable=False)
+    asset_symbol = Column(String(50), nullable=False)
     asset_address = Column(String(255), nullable=True)  # For ERC20, null for native
     amount = Column(Numeric(36, 18), nullable=False)
-    direction = Column(SQLEnum(TransferDirection), nullable=False, index=True)
-    exchange_from_id = Column(UUID(as_uuid=True), ForeignKey("exchanges.id"), nullable=True, index=True)
-    exchange_to_id = Column(UUID(as_uuid=True), ForeignKey("exchanges.id"), nullable=True, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    direction = Column(SQLEnum(TransferDirection), nullable=False)
+    exchange_from_id = Column(UUID(as_uuid=True), ForeignKey("exchanges.id"), nullable=True)
+    exchange_to_id = Column(UUID(as_uuid=True), ForeignKey("exchanges.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now(), nullable=False)
     
     exchange_from = relationship("Exchange", foreign_keys=[exchange_from_id])
     exchange_to = relationship("Exchange", foreign_keys=[exchange_to_id])
+    
+    __table_args__ = (
+        # Natural key, re-processing a block never duplicates its transfers (writes use ON CONFLICT DO NOTHING)
+        Index(
+            "uq_raw_transfers_natural_key",
+            "chain", "tx_hash", func.coalesce(log_index, -1), "direction", "timestamp",
+            unique=True
+        ),
+        Index("idx_raw_transfers_chain_block", "chain", "block_number"),
+        Index("idx_raw_transfers_asset_timestamp", "asset_symbol", "timestamp"),
+        Index("idx_raw_transfers_asset_address_symbol", "asset_address", "asset_symbol"),
+        # Monthly range partitions (app.db.partitions)
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+
+class TokenMetadata(Base):
+    __tablename__ = "token_metadata"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    address = Column(String(255), unique=True, nullable=False, index=True)  # Lowercase contract address
+    symbol = Column(String(50), nullable=False)
+    decimals = Column(Integer, nullable=False)
+    status = Column(SQLEnum(TokenMetadataStatus), nullable=False)
+    resolved_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
 
 class FlowMetric(Base):
@@ -0,0 +1,150 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from datetime import date, datetime
+from typing import Iterable, List, Optional, Set
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "raw_transfers"
+PARTITION_NAME = re.compile(r"^raw_transfers_(\d{4})_(\d{2})$")
+
+PARTITIONED_SQL = text(
+    "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"
+)
+PARTITIONS_SQL = text(
+    "SELECT child.relname FROM pg_inherits "
+    "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+    "WHERE pg_inherits.inhparent = to_regclass(:table)"
+)
+LOCKED_SQL = text(
+    "SELECT EXISTS (SELECT 1 FROM pg_locks WHERE pid = pg_backend_pid() AND relation = to_regclass(:table))"
+)
+
+# Creating a partition waits for every open transaction on raw_transfers and blocks new readers meanwhile,
+# give up (and retry with the next run) rather than queue behind a long one
+CREATE_LOCK_TIMEOUT = "5s"
+
+# Months known to have a partition, shared by all sessions of the process so writes normally skip the catalog
+_known_months: Set[date] = set()
+_partitioned: Optional[bool] = None
+_lock = threading.Lock()
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_{month:%Y_%m}"
+
+
+class TransferPartitions:
+    """Monthly range partitions of raw_transfers on timestamp (PostgreSQL, see migration 006).
+    
+    Partitions are created ahead by partition_maintenance_task; writes of
+    older or later months (backfills) create theirs first, in a short
+    transaction of its own. Retention detaches whole months, which is instant compared
+    to deleting rows. A no-op on databases where the table is not
+    partitioned (e.g. SQLite).
+    """
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def enabled(self) -> bool:
+        global _partitioned
+        if _partitioned is None:
+            if self.db.get_bind().dialect.name != "postgresql":
+                _partitioned = False
+            else:
+                _partitioned = bool(self.db.execute(PARTITIONED_SQL, {"table": PARENT_TABLE}).scalar())
+        return _partitioned
+    
+    def existing(self) -> List[date]:
+        """Months with an attached partition"""
+        months = []
+        for (name,) in self.db.execute(PARTITIONS_SQL, {"table": PARENT_TABLE}):
+            match = PARTITION_NAME.match(name)
+            if match:
+                months.append(date(int(match.group(1)), int(match.group(2)), 1))
+        return sorted(months)
+    
+    def missing(self, months: Iterable[date]) -> Set[date]:
+        """Months without a partition, the catalog is only read for months not seen before"""
+        if not self.enabled():
+            return set()
+        missing = {month_start(month) for month in months} - _known_months
+        if missing:
+            existing = set(self.existing())
+            _known_months.update(existing)
+            missing -= existing
+        return missing
+    
+    def missing_for(self, timestamps: Iterable[datetime]) -> Set[date]:
+        """Months rows with these timestamps go to that have no partition"""
+        return self.missing({month_start(timestamp) for timestamp in timestamps})
+    
+    def ensure(self, months: Iterable[date]) -> int:
+        """Create missing partitions for the given months, returns how many were created.
+        
+        They are created and committed on a connection of their own. CREATE
+        ... PARTITION OF locks raw_transfers exclusively, so the session's
+        transaction must not have touched the table yet (it would wait on
+        itself); GroupCommit commits its open group first.
+        """
+        missing = self.missing(months)
+        if not missing:
+            return 0
+        if self.db.execute(LOCKED_SQL, {"table": PARENT_TABLE}).scalar():
+            raise RuntimeError(f"Partitions for {sorted(missing)} must be created before the transaction uses {PARENT_TABLE}")
+        
+        with _lock, self.db.get_bind().engine.begin() as conn:
+            conn.execute(text(f"SET LOCAL lock_timeout = '{CREATE_LOCK_TIMEOUT}'"))
+            for month in sorted(missing):
+                # IF NOT EXISTS: another worker may have created it since the catalog was read
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {PARENT_TABLE} "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+                ))
+                logger.info(f"Created partition {partition_name(month)}")
+        _known_months.update(missing)
+        return len(missing)
+    
+    def ensure_for(self, timestamps: Iterable[datetime]) -> int:
+        """Create the partitions rows with these timestamps go to"""
+        return self.ensure({month_start(timestamp) for timestamp in timestamps})
+    
+    def ensure_ahead(self, months_ahead: int) -> int:
+        """Create partitions from the current month through months_ahead later"""
+        current = month_start(datetime.utcnow())
+        return self.ensure(add_months(current, offset) for offset in range(months_ahead + 1))
+    
+    def detach_before(self, cutoff: date, drop: bool = False) -> List[str]:
+        """Detach (or drop) partitions of months before cutoff's month, and commit"""
+        if not self.enabled():
+            return []
+        cutoff = month_start(cutoff)
+        detached = []
+        for month in self.existing():
+            if month >= cutoff:
+                break
+            name = partition_name(month)
+            self.db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+            if drop:
+                self.db.execute(text(f"DROP TABLE {name}"))
+            else:
+                # Renamed so the month can be re-created if it is backfilled again
+                self.db.execute(text(f"ALTER TABLE {name} RENAME TO {name}_detached_{datetime.utcnow():%Y%m%d}"))
+            self.db.commit()
+            _known_months.discard(month)
+            logger.info(f"{'Dropped' if drop else 'Detached'} partition {name}")
+            detached.append(name)
+        return detached
@@ -0,0 +1,321 @@
+from array import array
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.ingestion.xor_filter import XorFilter
+from app.ingestion.btc.script import SCRIPT_KEY_WIDTH, address_to_script, key_script, script_key, script_to_address
+from app.ingestion.btc.block_filter import FilterQueries
+from app.db.models import LabeledAddress, Chain
+from app.core.config import settings
+import hashlib
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Rows read per round trip when building from the database
+BUILD_FETCH_SIZE = 10000
+
+# Built index per chain with its fingerprint and build time
+_indexes: Dict[str, Tuple[Any, float, "AddressIndex"]] = {}
+
+
+class AddressIndex(Mapping):
+    """Labeled addresses as sorted fixed-width keys with row-aligned exchange, cluster and label columns.
+    
+    Roughly key width + 13 bytes per address instead of a dict of dicts. A
+    prefix table narrows a lookup to a few rows, and an optional xor filter
+    rejects most absent keys before the exact lookup. Values are dicts
+    with exchange_id, cluster_id and label, built only on a hit.
+    """
+    
+    key_width = 20
+    
+    def __init__(self, rows: Iterable[Tuple[str, str, Optional[str], str]], xor_filter: bool = False):
+        keys = []
+        exchange_rows = array("I")
+        cluster_rows = array("I")
+        label_rows = bytearray()
+        exchange_ids: Dict[str, int] = {}
+        cluster_ids: Dict[Optional[str], int] = {None: 0}
+        labels: Dict[str, int] = {}
+        skipped = 0
+        
+        for address, exchange_id, cluster_id, label in rows:
+            key = self._key(address)
+            if key is None:
+                skipped += 1
+                continue
+            keys.append(key)
+            exchange_rows.append(exchange_ids.setdefault(exchange_id, len(exchange_ids)))
+            cluster_rows.append(cluster_ids.setdefault(cluster_id, len(cluster_ids)))
+            label_rows.append(labels.setdefault(label, len(labels)))
+        if skipped:
+            logger.warning(f"Skipped {skipped} labeled addresses that could not be encoded for {type(self).__name__}")
+        
+        # Sort rows by key, the first row wins for duplicate keys
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        sorted_keys = []
+        self._exchange_rows = array("I")
+        self._cluster_rows = array("I")
+        self._label_rows = bytearray()
+        for row in order:
+            key = keys[row]
+            if sorted_keys and sorted_keys[-1] == key:
+                continue
+            sorted_keys.append(key)
+            self._exchange_rows.append(exchange_rows[row])
+            self._cluster_rows.append(cluster_rows[row])
+            self._label_rows.append(label_rows[row])
+        del keys, order
+        
+        self._keys = b"".join(sorted_keys)
+        self._count = len(sorted_keys)
+        self._digest = None
+        self._exchange_ids = list(exchange_ids)
+        self._cluster_ids = list(cluster_ids)
+        self._labels = list(labels)
+        
+        # Row range per leading-bits prefix, about one row per bucket
+        self._prefix_bits = min(24, max(8, self._count.bit_length()))
+        self._prefix_shift = 24 - self._prefix_bits
+        counts = array("I", bytes(4 * ((1 << self._prefix_bits) + 1)))
+        for key in sorted_keys:
+            counts[(int.from_bytes(key[:3], "big") >> self._prefix_shift) + 1] += 1
+        for bucket in range(1, len(counts)):
+            counts[bucket] += counts[bucket - 1]
+        self._buckets = counts
+        
+        self._filter = XorFilter(sorted_keys) if xor_filter and sorted_keys else None
+    
+    def _key(self, address: str) -> Optional[bytes]:
+        """Fixed-width key of an address, None if it cannot be encoded"""
+        raise NotImplementedError
+    
+    def _address(self, key: bytes) -> str:
+        """Address a key was made from"""
+        raise NotImplementedError
+    
+    def find(self, key: bytes) -> int:
+        """Row of a key, -1 if absent"""
+        if self._filter is not None and key not in self._filter:
+            return -1
+        width = self.key_width
+        bucket = int.from_bytes(key[:3], "big") >> self._prefix_shift
+        lo = self._buckets[bucket]
+        hi = self._buckets[bucket + 1]
+        keys = self._keys
+        while lo < hi:
+            mid = (lo + hi) // 2
+            probe = keys[mid * width:(mid + 1) * width]
+            if probe == key:
+                return mid
+            if probe < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return -1
+    
+    def entry(self, row: int) -> Dict[str, Any]:
+        return {
+            "exchange_id": self._exchange_ids[self._exchange_rows[row]],
+            "cluster_id": self._cluster_ids[self._cluster_rows[row]],
+            "label": self._labels[self._label_rows[row]],
+        }
+    
+    def iter_keys(self) -> Iterator[bytes]:
+        width = self.key_width
+        keys = self._keys
+        for row in range(self._count):
+            yield keys[row * width:(row + 1) * width]
+    
+    def get(self, address: str, default=None) -> Optional[Dict[str, Any]]:
+        key = self._key(address) if isinstance(address, str) else None
+        if key is None:
+            return default
+        row = self.find(key)
+        return self.entry(row) if row >= 0 else default
+    
+    def __getitem__(self, address: str) -> Dict[str, Any]:
+        value = self.get(address)
+        if value is None:
+            raise KeyError(address)
+        return value
+    
+    def __contains__(self, address: object) -> bool:
+        key = self._key(address) if isinstance(address, str) else None
+        return key is not None and self.find(key) >= 0
+    
+    def __iter__(self) -> Iterator[str]:
+        for key in self.iter_keys():
+            yield self._address(key)
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def digest(self) -> str:
+        """Hash of the labeled key set, changes when an address is added or removed"""
+        if self._digest is None:
+            self._digest = hashlib.sha256(self._keys).hexdigest()
+        return self._digest
+    
+    @property
+    def size_bytes(self) -> int:
+        """Approximate memory of the arrays (lookup tables of distinct ids excluded)"""
+        size = len(self._keys) + len(self._label_rows) + len(self._buckets) * self._buckets.itemsize
+        size += (len(self._exchange_rows) + len(self._cluster_rows)) * 4
+        if self._filter is not None:
+            size += self._filter.size_bytes
+        return size
+
+
+class EVMAddressIndex(AddressIndex):
+    """EVM labeled addresses keyed by their 20 address bytes"""
+    
+    key_width = 20
+    
+    def __init__(self, rows: Iterable[Tuple[str, str, Optional[str], str]], xor_filter: bool = False):
+        super().__init__(rows, xor_filter)
+        self._topic_set = None
+    
+    def _key(self, address: str) -> Optional[bytes]:
+        try:
+            key = bytes.fromhex(address[2:])
+        except ValueError:
+            return None
+        return key if len(key) == 20 else None
+    
+    def _address(self, key: bytes) -> str:
+        return "0x" + key.hex()
+    
+    def topic_matcher(self):
+        """Container of indexed event topics (address left-padded to 32 bytes) for the parser fast path.
+        
+        Small indexes get a frozenset of topic strings, large ones check topics
+        against the index without materializing them.
+        """
+        if self._count > settings.ADDRESS_INDEX_SET_MAX:
+            return _TopicMatcher(self)
+        if self._topic_set is None:
+            self._topic_set = frozenset("0x" + "0" * 24 + key.hex() for key in self.iter_keys())
+        return self._topic_set
+
+
+class _TopicMatcher:
+    """Topic membership answered by an EVMAddressIndex"""
+    
+    __slots__ = ("index",)
+    
+    def __init__(self, index: EVMAddressIndex):
+        self.index = index
+    
+    def __contains__(self, topic: str) -> bool:
+        if len(topic) != 66 or not topic.startswith("0x000000000000000000000000"):
+            return False
+        try:
+            key = bytes.fromhex(topic[26:])
+        except ValueError:
+            return False
+        return self.index.find(key) >= 0
+
+
+class BTCAddressIndex(AddressIndex):
+    """BTC labeled addresses keyed by their scriptPubKey's hash or witness program (see script_key)"""
+    
+    key_width = SCRIPT_KEY_WIDTH
+    
+    def __init__(self, rows: Iterable[Tuple[str, str, Optional[str], str]], xor_filter: bool = False, network: str = None):
+        self.network = network or settings.BTC_NETWORK
+        super().__init__(rows, xor_filter)
+        self._script_map = None
+        self._filter_queries = None
+    
+    def _key(self, address: str) -> Optional[bytes]:
+        script = address_to_script(address)
+        return script_key(script) if script is not None else None
+    
+    def _address(self, key: bytes) -> str:
+        return script_to_address(key_script(key), self.network)
+    
+    def scripts(self) -> Iterator[bytes]:
+        """scriptPubKeys of the labeled addresses"""
+        for key in self.iter_keys():
+            yield key_script(key)
+    
+    def filter_queries(self) -> FilterQueries:
+        """The scripts prepared for BIP158 block filter lookups, built once per index"""
+        if self._filter_queries is None:
+            self._filter_queries = FilterQueries(self.scripts())
+        return self._filter_queries
+    
+    def script_matcher(self):
+        """Mapping of scriptPubKey bytes -> labeled address for the parsers (.get only).
+        
+        Small indexes get a plain dict, large ones look scripts up in the index.
+        """
+        if self._count > settings.ADDRESS_INDEX_SET_MAX:
+            return _ScriptMatcher(self)
+        if self._script_map is None:
+            self._script_map = {key_script(key): self._address(key) for key in self.iter_keys()}
+        return self._script_map
+
+
+class _ScriptMatcher:
+    """Script -> address lookups answered by a BTCAddressIndex"""
+    
+    __slots__ = ("index",)
+    
+    def __init__(self, index: BTCAddressIndex):
+        self.index = index
+    
+    def get(self, script: bytes, default=None) -> Optional[str]:
+        key = script_key(script)
+        if key is None or self.index.find(key) < 0:
+            return default
+        return self.index._address(key)
+
+
+INDEX_CLASSES = {
+    Chain.EVM.value: EVMAddressIndex,
+    Chain.BTC.value: BTCAddressIndex,
+}
+
+
+def get_address_index(db: Session, chain: Chain) -> AddressIndex:
+    """Active labeled addresses of a chain, rebuilt when they change or after ADDRESS_INDEX_TTL_SECONDS.
+    
+    Built once per worker process and shared by every sync in it. The
+    fingerprint (count and newest created_at) catches added and deactivated
+    addresses right away; edits in place are picked up by the TTL.
+    """
+    fingerprint = tuple(db.query(func.count(LabeledAddress.id), func.max(LabeledAddress.created_at)).filter(
+        LabeledAddress.chain == chain,
+        LabeledAddress.is_active == True
+    ).one())
+    
+    cached = _indexes.get(chain.value)
+    if cached is not None:
+        cached_fingerprint, built_at, index = cached
+        if cached_fingerprint == fingerprint and time.monotonic() - built_at < settings.ADDRESS_INDEX_TTL_SECONDS:
+            return index
+    
+    started = time.monotonic()
+    query = db.query(
+        LabeledAddress.address, LabeledAddress.exchange_id, LabeledAddress.cluster_id, LabeledAddress.label
+    ).filter(
+        LabeledAddress.chain == chain,
+        LabeledAddress.is_active == True
+    ).yield_per(BUILD_FETCH_SIZE)
+    rows = (
+        (address, str(exchange_id), str(cluster_id) if cluster_id else None, label.value)
+        for address, exchange_id, cluster_id, label in query
+    )
+    index = INDEX_CLASSES[chain.value](rows, xor_filter=settings.ADDRESS_INDEX_XOR_FILTER)
+    
+    _indexes[chain.value] = (fingerprint, time.monotonic(), index)
+    logger.info(
+        f"Built {chain.value} address index: {len(index)} addresses, "
+        f"{index.size_bytes / 1024 / 1024:.1f} MB in {time.monotonic() - started:.1f}s"
+    )
+    return index
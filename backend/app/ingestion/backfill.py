@@ -0,0 +1,253 @@
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import Session
+from typing import Dict, Any, List, Optional
+from app.db.models import BackfillJob, BackfillRange, BackfillStatus, Chain
+from app.ingestion.address_index import EVMAddressIndex
+from app.ingestion.evm.tokens import record_pending_tokens
+from app.ingestion.group_commit import GroupCommit, GroupCommitFailed
+from app.services.metrics import MetricsService
+from app.services.transfer_writer import RawTransferWriter
+from app.core.config import settings
+from datetime import datetime, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BackfillService:
+    """Historical backfill split into range jobs that run on many workers in parallel.
+    
+    Backfill never touches SyncState, so the live tip sync keeps running on its own.
+    Each range commits a checkpoint per block, so a retried range resumes where
+    the previous attempt stopped.
+    """
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def create_job(self, chain: Chain, start_block: int, end_block: int, range_size: int = None) -> BackfillJob:
+        """Create a backfill job for [start_block, end_block] split into pending ranges"""
+        if start_block < 0 or end_block < start_block:
+            raise ValueError("Invalid block range")
+        
+        if not range_size:
+            range_size = settings.BACKFILL_EVM_RANGE_SIZE if chain == Chain.EVM else settings.BACKFILL_BTC_RANGE_SIZE
+        range_size = max(1, range_size)
+        
+        job = BackfillJob(
+            chain=chain,
+            start_block=start_block,
+            end_block=end_block,
+            range_size=range_size,
+            status=BackfillStatus.PENDING
+        )
+        self.db.add(job)
+        
+        for range_start in range(start_block, end_block + 1, range_size):
+            job.ranges.append(BackfillRange(
+                start_block=range_start,
+                end_block=min(range_start + range_size - 1, end_block),
+                status=BackfillStatus.PENDING
+            ))
+        
+        self.db.commit()
+        self.db.refresh(job)
+        
+        logger.info(f"Created {chain.value} backfill job {job.id}: {start_block}-{end_block} in {len(job.ranges)} ranges")
+        return job
+    
+    def dispatchable_ranges(self, limit: int = None) -> List[str]:
+        """Mark ranges ready to run as queued and return their ids.
+        
+        Picks pending ranges, failed ranges with attempts left, and queued or
+        running ranges whose worker has not reported within the range timeout.
+        """
+        limit = limit or settings.BACKFILL_DISPATCH_LIMIT
+        stale_before = datetime.utcnow() - timedelta(seconds=settings.BACKFILL_RANGE_TIMEOUT_SECONDS)
+        
+        ranges = self.db.query(BackfillRange).filter(
+            or_(
+                BackfillRange.status == BackfillStatus.PENDING,
+                and_(
+                    BackfillRange.status == BackfillStatus.FAILED,
+                    BackfillRange.attempts < settings.BACKFILL_MAX_ATTEMPTS
+                ),
+                and_(
+                    BackfillRange.status.in_([BackfillStatus.QUEUED, BackfillStatus.RUNNING]),
+                    BackfillRange.updated_at < stale_before
+                ),
+            )
+        ).order_by(BackfillRange.start_block).limit(limit).with_for_update(skip_locked=True).all()
+        
+        now = datetime.utcnow()
+        for backfill_range in ranges:
+            backfill_range.status = BackfillStatus.QUEUED
+            backfill_range.queued_at = now
+            backfill_range.job.status = BackfillStatus.RUNNING
+        
+        self.db.commit()
+        
+        return [str(backfill_range.id) for backfill_range in ranges]
+    
+    def run_range(self, range_id: str) -> Dict[str, Any]:
+        """Process a range from its checkpoint to its end"""
+        backfill_range = self._claim_range(range_id)
+        if not backfill_range:
+            return {"range_id": range_id, "skipped": True}
+        
+        job = backfill_range.job
+        sync = self._get_sync(job.chain)
+        labeled_addresses = sync._get_labeled_addresses()
+        
+        start = backfill_range.checkpoint + 1 if backfill_range.checkpoint is not None else backfill_range.start_block
+        commits = GroupCommit(self.db, job.chain)
+        
+        try:
+            for chunk_start in range(start, backfill_range.end_block + 1, sync.window.max_size):
+                chunk_end = min(chunk_start + sync.window.max_size - 1, backfill_range.end_block)
+                logs_by_block = self._scan_logs(sync, chunk_start, chunk_end, labeled_addresses)
+                
+                for block_num in range(chunk_start, chunk_end + 1):
+                    if logs_by_block is not None:
+                        transfers = sync._process_block(block_num, labeled_addresses, logs_by_block.get(block_num, []))
+                    else:
+                        transfers = sync._process_block(block_num, labeled_addresses)
+                    if transfers is None:
+                        raise ValueError(f"Block {block_num} not available")
+                    # Historical ranges are far below the reorg depth, only the tip sync records block hashes
+                    sync.headers.pop(block_num, None)
+                    
+                    with commits.block(transfers) as group:
+                        group.block_rows = RawTransferWriter(self.db).write(transfers)
+                        if hasattr(sync, "token_cache"):
+                            record_pending_tokens(self.db, sync.token_cache, transfers)
+                        backfill_range.checkpoint = block_num
+            
+            # The last group, before the range is marked completed
+            if not commits.commit():
+                raise GroupCommitFailed(f"Backfill range {range_id} blocks rolled back")
+        
+        except Exception as e:
+            # Keeps the blocks saved before the failure, the retry resumes after them
+            if not commits.commit():
+                logger.error(f"Backfill range {range_id} rolled back its uncommitted blocks")
+            logger.error(f"Backfill range {range_id} failed after block {backfill_range.checkpoint}: {e}")
+            backfill_range.status = BackfillStatus.FAILED
+            backfill_range.last_error = str(e)
+            if backfill_range.attempts >= settings.BACKFILL_MAX_ATTEMPTS:
+                job.status = BackfillStatus.FAILED
+            self.db.commit()
+            self._refresh_metrics(commits)
+            return {
+                "range_id": range_id,
+                "processed": commits.committed_blocks,
+                "transfers": commits.committed_rows,
+                "checkpoint": backfill_range.checkpoint,
+                "error": str(e)
+            }
+        
+        backfill_range.status = BackfillStatus.COMPLETED
+        backfill_range.last_error = None
+        self.db.commit()
+        
+        if hasattr(sync, "resolve_tokens"):
+            sync.resolve_tokens()
+        
+        self._refresh_metrics(commits)
+        self._refresh_job(job)
+        
+        result = {
+            "range_id": range_id,
+            "processed": commits.committed_blocks,
+            "transfers": commits.committed_rows,
+            "checkpoint": backfill_range.checkpoint,
+            "job_status": job.status.value
+        }
+        if getattr(sync, "prescan", False):
+            result.update(sync.prescan_summary())
+        return result
+    
+    def refresh_jobs(self) -> int:
+        """Re-check running jobs for completion (covers ranges finishing concurrently)"""
+        jobs = self.db.query(BackfillJob).filter(BackfillJob.status == BackfillStatus.RUNNING).all()
+        for job in jobs:
+            self._refresh_job(job)
+        return len(jobs)
+    
+    def get_progress(self, job: BackfillJob) -> Dict[str, Any]:
+        """Summarize a job's range states and completed blocks"""
+        counts = {status.value: 0 for status in BackfillStatus}
+        blocks_done = 0
+        for backfill_range in job.ranges:
+            counts[backfill_range.status.value] += 1
+            if backfill_range.checkpoint is not None:
+                blocks_done += backfill_range.checkpoint - backfill_range.start_block + 1
+        
+        return {
+            "ranges": counts,
+            "blocks_done": blocks_done,
+            "blocks_total": job.end_block - job.start_block + 1
+        }
+    
+    def _refresh_metrics(self, commits: GroupCommit):
+        """Recompute the metric buckets of the transfers a range wrote, older than the periodic aggregation covers"""
+        if commits.first_timestamp is None:
+            return
+        try:
+            MetricsService(self.db).refresh_range(commits.first_timestamp, commits.last_timestamp)
+        except Exception as e:
+            logger.error(f"Failed to refresh metrics from {commits.first_timestamp} to {commits.last_timestamp}: {e}")
+            self.db.rollback()
+    
+    def _claim_range(self, range_id: str) -> Optional[BackfillRange]:
+        """Lock a queued range and mark it running, None if another worker has it"""
+        backfill_range = self.db.query(BackfillRange).filter(
+            BackfillRange.id == range_id
+        ).with_for_update(skip_locked=True).first()
+        
+        if not backfill_range or backfill_range.status not in (BackfillStatus.QUEUED, BackfillStatus.PENDING):
+            self.db.rollback()
+            return None
+        
+        backfill_range.status = BackfillStatus.RUNNING
+        backfill_range.attempts += 1
+        backfill_range.started_at = datetime.utcnow()
+        self.db.commit()
+        
+        return backfill_range
+    
+    def _refresh_job(self, job: BackfillJob):
+        """Mark a job completed once its completed ranges cover it without gaps"""
+        self.db.refresh(job)
+        ranges = sorted(job.ranges, key=lambda r: r.start_block)
+        
+        expected_start = job.start_block
+        for backfill_range in ranges:
+            if backfill_range.status != BackfillStatus.COMPLETED:
+                return
+            if backfill_range.start_block != expected_start or backfill_range.checkpoint != backfill_range.end_block:
+                return
+            expected_start = backfill_range.end_block + 1
+        
+        if expected_start != job.end_block + 1:
+            return
+        
+        job.status = BackfillStatus.COMPLETED
+        job.completed_at = datetime.utcnow()
+        self.db.commit()
+        logger.info(f"Backfill job {job.id} completed: {job.start_block}-{job.end_block}")
+    
+    @staticmethod
+    def _scan_logs(sync, start: int, end: int, labeled_addresses: EVMAddressIndex) -> Optional[Dict[int, List[Dict[str, Any]]]]:
+        """Run an EVM log scan over a chunk when the sync is in LOGS mode"""
+        if getattr(sync, "erc20_mode", None) != "LOGS":
+            return None
+        return sync._scan_transfer_logs(start, end, labeled_addresses)
+    
+    def _get_sync(self, chain: Chain):
+        """Get the chain sync service used to fetch and parse blocks"""
+        if chain == Chain.EVM:
+            from app.ingestion.evm.sync import EVMSync
+            return EVMSync(self.db)
+        from app.ingestion.btc.sync import BTCSync
+        return BTCSync(self.db, update_outpoints=False)
@@ -0,0 +1,195 @@
+import struct
+from typing import Dict, Iterable, List, Tuple
+
+# BIP158 basic filter parameters
+FILTER_P = 19
+FILTER_M = 784931
+
+MASK64 = 0xFFFFFFFFFFFFFFFF
+
+_uint64_pair = struct.Struct("<QQ")
+
+# Packed scripts get one 64-bit lane each, plus a byte for the carries of lane-wise additions
+_lane = struct.Struct("<Qx")
+LANE_BITS = _lane.size * 8
+
+
+def _rotl(value: int, bits: int) -> int:
+    return ((value << bits) | (value >> (64 - bits))) & MASK64
+
+
+def siphash24(k0: int, k1: int, data: bytes) -> int:
+    """SipHash-2-4 of data with the 128-bit key (k0, k1)"""
+    v0 = k0 ^ 0x736F6D6570736575
+    v1 = k1 ^ 0x646F72616E646F6D
+    v2 = k0 ^ 0x6C7967656E657261
+    v3 = k1 ^ 0x7465646279746573
+    
+    def rounds(v0, v1, v2, v3, count):
+        for _ in range(count):
+            v0 = (v0 + v1) & MASK64
+            v1 = _rotl(v1, 13) ^ v0
+            v0 = _rotl(v0, 32)
+            v2 = (v2 + v3) & MASK64
+            v3 = _rotl(v3, 16) ^ v2
+            v0 = (v0 + v3) & MASK64
+            v3 = _rotl(v3, 21) ^ v0
+            v2 = (v2 + v1) & MASK64
+            v1 = _rotl(v1, 17) ^ v2
+            v2 = _rotl(v2, 32)
+        return v0, v1, v2, v3
+    
+    length = len(data)
+    tail_start = length - length % 8
+    for offset in range(0, tail_start, 8):
+        word = int.from_bytes(data[offset:offset + 8], "little")
+        v3 ^= word
+        v0, v1, v2, v3 = rounds(v0, v1, v2, v3, 2)
+        v0 ^= word
+    
+    last = ((length & 0xFF) << 56) | int.from_bytes(data[tail_start:], "little")
+    v3 ^= last
+    v0, v1, v2, v3 = rounds(v0, v1, v2, v3, 2)
+    v0 ^= last
+    
+    v2 ^= 0xFF
+    v0, v1, v2, v3 = rounds(v0, v1, v2, v3, 4)
+    return v0 ^ v1 ^ v2 ^ v3
+
+
+def siphash_words(data: bytes) -> Tuple[int, ...]:
+    """The 64-bit message words SipHash consumes for data, the last one carrying the length byte"""
+    length = len(data)
+    tail_start = length - length % 8
+    words = [int.from_bytes(data[offset:offset + 8], "little") for offset in range(0, tail_start, 8)]
+    words.append(((length & 0xFF) << 56) | int.from_bytes(data[tail_start:], "little"))
+    return tuple(words)
+
+
+class _Lanes:
+    """Messages of the same word count packed side by side into Python ints, one lane each.
+    
+    Every SipHash step then runs on all of them in a single big-int operation:
+    additions are masked back to 64 bits per lane and rotations mask the bits
+    each lane keeps, so lanes never mix.
+    """
+    
+    def __init__(self, messages: List[Tuple[int, ...]]):
+        self.count = len(messages)
+        self.ones = ((1 << (LANE_BITS * self.count)) - 1) // ((1 << LANE_BITS) - 1)
+        self.low: Dict[int, int] = {bits: ((1 << bits) - 1) * self.ones for bits in (13, 16, 17, 21, 32, 43, 47, 48, 51, 64)}
+        self.words = [
+            int.from_bytes(b"".join(_lane.pack(message[i]) for message in messages), "little")
+            for i in range(len(messages[0]))
+        ]
+    
+    def _rounds(self, v0: int, v1: int, v2: int, v3: int, count: int) -> tuple:
+        low = self.low
+        mask = low[64]
+        for _ in range(count):
+            v0 = (v0 + v1) & mask
+            v1 = (((v1 & low[51]) << 13) | ((v1 >> 51) & low[13])) ^ v0
+            v0 = ((v0 & low[32]) << 32) | ((v0 >> 32) & low[32])
+            v2 = (v2 + v3) & mask
+            v3 = (((v3 & low[48]) << 16) | ((v3 >> 48) & low[16])) ^ v2
+            v0 = (v0 + v3) & mask
+            v3 = (((v3 & low[43]) << 21) | ((v3 >> 43) & low[21])) ^ v0
+            v2 = (v2 + v1) & mask
+            v1 = (((v1 & low[47]) << 17) | ((v1 >> 47) & low[17])) ^ v2
+            v2 = ((v2 & low[32]) << 32) | ((v2 >> 32) & low[32])
+        return v0, v1, v2, v3
+    
+    def siphash24(self, k0: int, k1: int) -> List[int]:
+        """SipHash-2-4 of every message with the key (k0, k1)"""
+        ones = self.ones
+        v0 = (k0 ^ 0x736F6D6570736575) * ones
+        v1 = (k1 ^ 0x646F72616E646F6D) * ones
+        v2 = (k0 ^ 0x6C7967656E657261) * ones
+        v3 = (k1 ^ 0x7465646279746573) * ones
+        for word in self.words:
+            v3 ^= word
+            v0, v1, v2, v3 = self._rounds(v0, v1, v2, v3, 2)
+            v0 ^= word
+        v2 ^= 0xFF * ones
+        v0, v1, v2, v3 = self._rounds(v0, v1, v2, v3, 4)
+        packed = v0 ^ v1 ^ v2 ^ v3
+        return [value for (value,) in _lane.iter_unpack(packed.to_bytes(self.count * _lane.size, "little"))]
+
+
+class FilterQueries:
+    """Scripts to look up in block filters, prepared once for all blocks.
+    
+    Each block's filter has its own SipHash key, so the scripts are hashed
+    again per block; they are split into message words and packed by word
+    count up front, which makes that one pass of big-int operations.
+    """
+    
+    def __init__(self, items: Iterable[bytes]):
+        by_length: Dict[int, List[Tuple[int, ...]]] = {}
+        for item in set(items):
+            words = siphash_words(item)
+            by_length.setdefault(len(words), []).append(words)
+        self._lanes = [_Lanes(messages) for messages in by_length.values()]
+    
+    def __len__(self) -> int:
+        return sum(lanes.count for lanes in self._lanes)
+    
+    def siphash24(self, k0: int, k1: int) -> List[int]:
+        return [value for lanes in self._lanes for value in lanes.siphash24(k0, k1)]
+
+
+def _read_varint(data: bytes) -> tuple:
+    prefix = data[0]
+    if prefix < 0xFD:
+        return prefix, 1
+    size = {0xFD: 2, 0xFE: 4, 0xFF: 8}[prefix]
+    return int.from_bytes(data[1:1 + size], "little"), 1 + size
+
+
+class BlockFilter:
+    """BIP158 basic block filter (Golomb-coded set of a block's output and spent scripts).
+    
+    A match may be a false positive (about 1 in 784931 per queried script);
+    no match means the block certainly neither pays nor spends those scripts.
+    """
+    
+    def __init__(self, filter_bytes: bytes, block_hash: str):
+        self.n, offset = _read_varint(filter_bytes) if filter_bytes else (0, 0)
+        self._encoded = filter_bytes[offset:]
+        # Key is the first 16 bytes of the block hash in internal byte order
+        self.k0, self.k1 = _uint64_pair.unpack(bytes.fromhex(block_hash)[::-1][:16])
+    
+    def _hashed(self, queries: FilterQueries) -> list:
+        """Queried scripts mapped into [0, N * M) like the filter's elements"""
+        modulus = self.n * FILTER_M
+        return sorted({(value * modulus) >> 64 for value in queries.siphash24(self.k0, self.k1)})
+    
+    def match_any(self, queries: FilterQueries) -> bool:
+        """Whether any of the scripts may be in the block"""
+        if self.n == 0 or not len(queries):
+            return False
+        queries = self._hashed(queries)
+        
+        # The whole bit stream in one string built in C, unary quotients are found with str.find
+        bits = format(int.from_bytes(self._encoded, "big"), f"0{len(self._encoded) * 8}b")
+        position = 0
+        value = 0
+        query_index = 0
+        for _ in range(self.n):
+            # Golomb-Rice: unary quotient terminated by 0, then P remainder bits
+            end = bits.find("0", position)
+            if end < 0:
+                break
+            quotient = end - position
+            remainder = int(bits[end + 1:end + 1 + FILTER_P], 2)
+            position = end + 1 + FILTER_P
+            value += (quotient << FILTER_P) | remainder
+            
+            while queries[query_index] < value:
+                query_index += 1
+                if query_index == len(queries):
+                    return False
+            if queries[query_index] == value:
+                return True
+        
+        return False
@@ -1,48 +1,89 @@
-import requests
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional, Union
 from app.core.config import settings
+from app.ingestion.transport import HTTPTransport, RPCError, get_transport
+from app.ingestion.endpoints import get_router
 
 logger = logging.getLogger(__name__)
 
+# Bitcoin Core answers RPC errors with HTTP 404/500 and a JSON body, so only
+# rate limiting and gateway errors are retried
+RETRY_STATUSES = (429, 502, 503, 504)
+
+# First Bitcoin Core version (23.0) whose getblock verbosity 3 includes input prevouts
+PREVOUT_MIN_VERSION = 230000
+
 
 class BitcoinCoreRPC:
     """Bitcoin Core RPC client"""
     
-    def __init__(self):
-        self.rpc_url = settings.BTC_RPC_URL
+    def __init__(self, transport: HTTPTransport = None):
+        self.router = get_router(settings.btc_rpc_urls_list, passthrough_errors=(RPCError,))
         self.rpc_user = settings.BTC_RPC_USER
         self.rpc_pass = settings.BTC_RPC_PASS
+        self.transport = transport or get_transport()
     
-    def _call(self, method: str, params: List[Any] = None) -> Any:
-        """Make Bitcoin Core RPC call"""
+    def _call(self, method: str, params: Union[List[Any], Callable[[str], List[Any]]] = None) -> Any:
+        """Make Bitcoin Core RPC call, params may depend on the node that serves it (a function of its URL)"""
         if params is None:
             params = []
         
+        def send(url: str) -> Any:
+            return self._send(url, method, params(url) if callable(params) else params)
+        
+        try:
+            if method == "getblockcount":
+                return self.router.call_tip(send, head_of=int)
+            return self.router.call(send)
+        except Exception as e:
+            logger.error(f"Bitcoin RPC call failed: {method} - {e}")
+            raise
+    
+    def _send(self, url: str, method: str, params: List[Any], timeout: float = None) -> Any:
+        """Send one RPC call to one endpoint"""
         payload = {
             "method": method,
             "params": params,
             "jsonrpc": "2.0",
             "id": 1
         }
-        
+        response = self.transport.post(
+            url,
+            json=payload,
+            auth=(self.rpc_user, self.rpc_pass),
+            timeout=timeout,
+            retry_statuses=RETRY_STATUSES,
+            raise_for_status=False
+        )
         try:
-            response = requests.post(
-                self.rpc_url,
-                json=payload,
-                auth=(self.rpc_user, self.rpc_pass),
-                timeout=30
-            )
-            response.raise_for_status()
             data = response.json()
-            
-            if "error" in data and data["error"]:
-                raise Exception(f"RPC Error: {data['error']}")
-            
-            return data.get("result")
-        except Exception as e:
-            logger.error(f"Bitcoin RPC call failed: {method} - {e}")
+        except ValueError:
+            response.raise_for_status()
             raise
+        
+        if "error" in data and data["error"]:
+            raise RPCError(data["error"], url)
+        response.raise_for_status()
+        
+        return data.get("result")
+    
+    def _prevout_verbosity(self, url: str) -> int:
+        """getblock verbosity of one node: 3 (inputs carry prevout) on Bitcoin Core 23.0+, else 2"""
+        verbosity = self.router.capability(url, "getblock_verbosity")
+        if verbosity is None:
+            try:
+                version = self._send(url, "getnetworkinfo", []).get("version", 0)
+            except Exception as e:
+                logger.warning(f"Could not detect Bitcoin Core version on {url}, using verbosity 2: {e}")
+                return 2
+            verbosity = 3 if version >= PREVOUT_MIN_VERSION else 2
+            self.router.set_capability(url, "getblock_verbosity", verbosity)
+            logger.info(f"Bitcoin Core {version} on {url}, using getblock verbosity {verbosity}")
+        return verbosity
+    
+    def get_network_info(self) -> Dict[str, Any]:
+        """Get node version and network state"""
+        return self._call("getnetworkinfo")
     
     def get_block_count(self) -> int:
         """Get latest block height"""
@@ -56,6 +97,27 @@ class BitcoinCoreRPC:
         """Get block by hash"""
         return self._call("getblock", [block_hash, verbosity])
     
+    def get_block_with_prevouts(self, block_hash: str) -> Dict[str, Any]:
+        """Get block by hash at the highest verbosity the serving node has, with input prevouts on Core 23.0+"""
+        return self._call("getblock", lambda url: [block_hash, self._prevout_verbosity(url)])
+    
+    def get_raw_block(self, block_hash: str) -> bytes:
+        """Get the serialized block (getblock verbosity 0)"""
+        return bytes.fromhex(self._call("getblock", [block_hash, 0]))
+    
+    def get_block_filter(self, block_hash: str, filter_type: str = "basic") -> Dict[str, Any]:
+        """Get the BIP158 filter of a block (needs -blockfilterindex=1)"""
+        return self._call("getblockfilter", [block_hash, filter_type])
+    
     def get_transaction(self, txid: str, verbose: bool = True) -> Dict[str, Any]:
         """Get transaction by ID"""
         return self._call("getrawtransaction", [txid, verbose])
+    
+    def scan_utxos(self, descriptors: List[str]) -> Dict[str, Any]:
+        """Unspent outputs matching the descriptors at the node's tip (scantxoutset, reads the whole UTXO set).
+        
+        Sent to the best endpoint only: a hedged duplicate would start a second scan on another node.
+        """
+        return self._send(
+            self.router.best_url, "scantxoutset", ["start", descriptors], timeout=settings.BTC_OUTPOINT_SCAN_TIMEOUT_SECONDS
+        )
@@ -1,20 +1,34 @@
-import requests
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional
 from app.core.config import settings
+from app.ingestion.transport import HTTPTransport, get_transport
+from app.ingestion.ratelimit import get_rate_limiter
 
 logger = logging.getLogger(__name__)
 
+# Esplora returns block transactions in fixed pages of 25
+TXS_PAGE_SIZE = 25
+
+SATS_PER_BTC = 100000000
+
+# Threads shared by all explorer clients for concurrent page requests
+_executor = ThreadPoolExecutor(max_workers=max(1, settings.BTC_EXPLORER_CONCURRENCY), thread_name_prefix="btc-explorer")
+
 
 class BitcoinExplorerAPI:
     """Bitcoin Explorer API client (e.g., Blockstream)"""
     
-    def __init__(self):
+    def __init__(self, transport: HTTPTransport = None):
         self.base_url = settings.BTC_EXPLORER_BASE_URL.rstrip("/")
         self.api_key = settings.BTC_EXPLORER_API_KEY
+        self.transport = transport or get_transport()
+        self.rate_limiter = get_rate_limiter(
+            f"btc-explorer:{self.base_url}", settings.BTC_EXPLORER_RATE_LIMIT, settings.BTC_EXPLORER_BURST
+        )
     
-    def _get(self, endpoint: str, params: Dict[str, Any] = None) -> Any:
-        """Make GET request to explorer API"""
+    def _get(self, endpoint: str, params: Dict[str, Any] = None, text: bool = False, raw: bool = False) -> Any:
+        """Make GET request to explorer API (text=True for plain-text endpoints, raw=True for bytes)"""
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
         headers = {}
         
@@ -22,9 +36,11 @@ class BitcoinExplorerAPI:
             headers["X-API-Key"] = self.api_key
         
         try:
-            response = requests.get(url, params=params, headers=headers, timeout=30)
-            response.raise_for_status()
-            return response.json()
+            self.rate_limiter.acquire()
+            response = self.transport.get(url, params=params, headers=headers)
+            if raw:
+                return response.content
+            return response.text.strip() if text else response.json()
         except Exception as e:
             logger.error(f"Explorer API call failed: {endpoint} - {e}")
             raise
@@ -33,7 +49,7 @@ class BitcoinExplorerAPI:
         """Get latest block height"""
         try:
             # Blockstream API: GET /blocks/tip/height
-            height = self._get("/blocks/tip/height")
+            height = self._get("/blocks/tip/height", text=True)
             return int(height)
         except Exception as e:
             logger.error(f"Failed to get tip height: {e}")
@@ -43,7 +59,7 @@ class BitcoinExplorerAPI:
         """Get block hash by height"""
         try:
             # Blockstream API: GET /block-height/{height}
-            hash_str = self._get(f"/block-height/{height}")
+            hash_str = self._get(f"/block-height/{height}", text=True)
             return hash_str
         except Exception as e:
             logger.error(f"Failed to get block hash: {e}")
@@ -58,11 +74,96 @@ class BitcoinExplorerAPI:
             logger.error(f"Failed to get block: {e}")
             raise
     
+    def get_raw_block(self, block_hash: str) -> bytes:
+        """Get the serialized block"""
+        # Blockstream API: GET /block/{hash}/raw
+        return self._get(f"/block/{block_hash}/raw", raw=True)
+    
+    def get_block_txids(self, block_hash: str) -> List[str]:
+        """Get all transaction ids of a block in block order"""
+        # Blockstream API: GET /block/{hash}/txids
+        return self._get(f"/block/{block_hash}/txids")
+    
+    def get_block_txs_page(self, block_hash: str, start_index: int) -> List[Dict[str, Any]]:
+        """Get up to 25 transactions of a block, with input prevouts, in Core RPC shape"""
+        # Blockstream API: GET /block/{hash}/txs/{start_index}
+        return [normalize_transaction(tx) for tx in self._get(f"/block/{block_hash}/txs/{start_index}")]
+    
+    def get_block_with_transactions(self, block_hash: str) -> Dict[str, Any]:
+        """Get a block header with all its transactions under "tx".
+        
+        Transaction pages are fetched concurrently under the provider rate
+        limit, so a block costs about tx_count / 25 requests instead of one
+        per transaction. Transactions missing from failed pages are fetched
+        one by one.
+        """
+        block = self.get_block(block_hash)
+        tx_count = block.get("tx_count")
+        
+        txids_future = _executor.submit(self.get_block_txids, block_hash)
+        if tx_count is None:
+            tx_count = len(txids_future.result())
+        
+        page_futures = {
+            start: _executor.submit(self.get_block_txs_page, block_hash, start)
+            for start in range(0, tx_count, TXS_PAGE_SIZE)
+        }
+        
+        txs_by_id = {}
+        for start, future in page_futures.items():
+            try:
+                for tx in future.result():
+                    txs_by_id[tx["txid"]] = tx
+            except Exception as e:
+                logger.warning(f"Failed to get txs page {start} of block {block_hash}: {e}")
+        
+        txids = txids_future.result()
+        missing = [txid for txid in txids if txid not in txs_by_id]
+        if missing:
+            logger.warning(f"Fetching {len(missing)} transactions of block {block_hash} individually")
+            for txid, tx in zip(missing, _executor.map(self.get_transaction, missing)):
+                txs_by_id[txid] = tx
+        
+        block["tx"] = [txs_by_id[txid] for txid in txids]
+        return block
+    
     def get_transaction(self, txid: str) -> Dict[str, Any]:
-        """Get transaction by ID"""
+        """Get transaction by ID, in Core RPC shape"""
         try:
             # Blockstream API: GET /tx/{txid}
-            return self._get(f"/tx/{txid}")
+            return normalize_transaction(self._get(f"/tx/{txid}"))
         except Exception as e:
             logger.error(f"Failed to get transaction: {e}")
             raise
+
+
+def _normalize_output(output: Dict[str, Any], n: Optional[int] = None) -> Dict[str, Any]:
+    """Esplora output (value in sats) -> Core RPC output (value in BTC)"""
+    script_pubkey = {"hex": output.get("scriptpubkey"), "type": output.get("scriptpubkey_type")}
+    if output.get("scriptpubkey_address"):
+        script_pubkey["address"] = output["scriptpubkey_address"]
+    
+    normalized = {"value": output.get("value", 0) / SATS_PER_BTC, "scriptPubKey": script_pubkey}
+    if n is not None:
+        normalized["n"] = n
+    return normalized
+
+
+def normalize_transaction(tx: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert an Esplora transaction to the Core RPC shape the BTC parser reads"""
+    vin = []
+    for input_tx in tx.get("vin", []):
+        if input_tx.get("is_coinbase"):
+            vin.append({"coinbase": input_tx.get("scriptsig", ""), "sequence": input_tx.get("sequence")})
+            continue
+        
+        normalized = {"txid": input_tx.get("txid"), "vout": input_tx.get("vout"), "sequence": input_tx.get("sequence")}
+        if input_tx.get("prevout"):
+            normalized["prevout"] = _normalize_output(input_tx["prevout"])
+        vin.append(normalized)
+    
+    return {
+        "txid": tx["txid"],
+        "vin": vin,
+        "vout": [_normalize_output(output, n) for n, output in enumerate(tx.get("vout", []))],
+    }
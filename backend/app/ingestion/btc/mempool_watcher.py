@@ -0,0 +1,117 @@
+from typing import Callable, Optional
+from app.core.config import settings
+from app.db.models import Chain
+from app.ingestion.address_index import BTCAddressIndex, get_address_index
+from app.ingestion.btc.sync import BTCSync
+from app.services.pending_flows import PendingFlowStore, get_pending_store
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+RAWTX_TOPIC = b"rawtx"
+
+# Seconds between throughput log lines
+STATS_INTERVAL = 60
+
+# Messages ZMQ buffers for a slow reader before dropping (Bitcoin Core's default send queue is 1000)
+RECEIVE_HIGH_WATER_MARK = 100000
+
+
+class MempoolWatcher:
+    """Match transactions from Bitcoin Core's -zmqpubrawtx against labeled scripts and record them as pending flows.
+    
+    Transactions are decoded in place and only their output scripts are
+    looked up, so one thread keeps up with thousands of transactions per
+    second. rawtx also announces transactions of newly connected blocks;
+    those are confirmed by the sync shortly after.
+    """
+    
+    def __init__(self, store: PendingFlowStore = None, url: str = None):
+        self.url = url or settings.BTC_ZMQ_RAWTX_URL
+        self.store = store or get_pending_store()
+        self.labeled: Optional[BTCAddressIndex] = None
+        self.last_sequence: Optional[int] = None
+        self.stats = {"seen": 0, "matched": 0, "missed": 0, "invalid": 0}
+    
+    def run(self, stop: Callable[[], bool] = lambda: False):
+        """Watch until stop() returns True"""
+        import zmq
+        
+        self.refresh_labeled()
+        refresher = threading.Thread(target=self._refresh_loop, args=(stop,), daemon=True)
+        refresher.start()
+        
+        socket = zmq.Context.instance().socket(zmq.SUB)
+        socket.setsockopt(zmq.SUBSCRIBE, RAWTX_TOPIC)
+        socket.setsockopt(zmq.RCVHWM, RECEIVE_HIGH_WATER_MARK)
+        socket.setsockopt(zmq.HEARTBEAT_IVL, 30000)
+        socket.setsockopt(zmq.HEARTBEAT_TIMEOUT, 60000)
+        socket.connect(self.url)
+        logger.info(f"Watching BTC mempool transactions on {self.url}")
+        
+        last = dict(self.stats)
+        last_at = time.monotonic()
+        try:
+            while not stop():
+                if socket.poll(250):
+                    # Drain whatever is queued before checking stop again
+                    while True:
+                        try:
+                            parts = socket.recv_multipart(zmq.NOBLOCK)
+                        except zmq.Again:
+                            break
+                        self.handle(parts)
+                
+                now = time.monotonic()
+                if now - last_at >= STATS_INTERVAL:
+                    logger.info(
+                        f"BTC mempool: {(self.stats['seen'] - last['seen']) / (now - last_at):.0f} tx/s, "
+                        f"{self.stats['matched'] - last['matched']} matched, "
+                        f"{self.stats['missed'] - last['missed']} sequence gaps"
+                    )
+                    last, last_at = dict(self.stats), now
+        finally:
+            socket.close(linger=0)
+    
+    def handle(self, parts: list):
+        """Match one rawtx message [topic, serialized tx, 4-byte sequence]"""
+        if len(parts) < 2 or parts[0] != RAWTX_TOPIC or self.labeled is None:
+            return
+        if len(parts) >= 3 and len(parts[2]) == 4:
+            sequence = int.from_bytes(parts[2], "little")
+            if self.last_sequence is not None and sequence != (self.last_sequence + 1) & 0xFFFFFFFF:
+                # Dropped by the node's or our queue, pending flows are best effort
+                self.stats["missed"] += 1
+            self.last_sequence = sequence
+        
+        self.stats["seen"] += 1
+        try:
+            flow = BTCSync.parse_pending_transaction(parts[1], self.labeled)
+        except Exception as e:
+            self.stats["invalid"] += 1
+            logger.debug(f"Could not decode rawtx message: {e}")
+            return
+        if flow:
+            self.stats["matched"] += 1
+            try:
+                self.store.add(Chain.BTC.value, flow)
+            except Exception as e:
+                logger.warning(f"Failed to store pending flow {flow['tx_hash']}: {e}")
+    
+    def refresh_labeled(self):
+        """Pick up labeled address changes (the index is only rebuilt when they changed)"""
+        from app.db.session import SessionLocal
+        db = SessionLocal()
+        try:
+            self.labeled = get_address_index(db, Chain.BTC)
+        except Exception as e:
+            logger.error(f"Failed to load BTC labeled addresses: {e}")
+        finally:
+            db.close()
+    
+    def _refresh_loop(self, stop: Callable[[], bool]):
+        while not stop():
+            time.sleep(settings.ADDRESS_INDEX_REFRESH_SECONDS)
+            self.refresh_labeled()
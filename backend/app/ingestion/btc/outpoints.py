@@ -0,0 +1,176 @@
+from typing import Dict, Any, List, Optional, Tuple
+from app.core.config import settings
+from decimal import Decimal
+import logging
+import os
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+OUTPOINT_INDEX_MODES = ("OFF", "LABELED", "FULL")
+
+SATS_PER_BTC = Decimal(100000000)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outpoints (
+    txid TEXT NOT NULL,
+    vout INTEGER NOT NULL,
+    address TEXT NOT NULL,
+    value_sats INTEGER NOT NULL,
+    spent_height INTEGER,
+    PRIMARY KEY (txid, vout)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_outpoints_spent_height ON outpoints (spent_height) WHERE spent_height IS NOT NULL;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def to_sats(value: Any) -> int:
+    """Convert a Core RPC output value (BTC) to satoshis"""
+    return int((Decimal(str(value)) * SATS_PER_BTC).to_integral_value())
+
+
+class OutpointIndex:
+    """Local on-disk map of (txid, vout) -> (address, value) for resolving BTC inputs.
+    
+    Filled from ingested blocks. Spending an output only marks it with the
+    spending height; rows are deleted once that height is prune_depth blocks
+    deep, so re-processing a recent block (retry or reorg) still resolves
+    its inputs.
+    
+    A LABELED index is complete for the labeled set it was seeded with
+    (reset) from start_height on: misses of later blocks mean "not labeled"
+    only while blocks keep being applied in order (see BTCSync).
+    """
+    
+    def __init__(self, path: str, prune_depth: int = None):
+        self.path = path
+        self.prune_depth = prune_depth or settings.BTC_OUTPOINT_PRUNE_DEPTH
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+    
+    def get(self, txid: str, vout: int) -> Optional[Tuple[str, int]]:
+        """Get (address, value_sats) of an output, None if it is not indexed"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT address, value_sats FROM outpoints WHERE txid = ? AND vout = ?", (txid, vout)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+    
+    def apply_block(
+        self,
+        height: int,
+        created: List[Tuple[str, int, str, int]],
+        spent: List[Tuple[str, int]]
+    ):
+        """Record a block's new outputs (txid, vout, address, value_sats) and spent outpoints in one transaction"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO outpoints (txid, vout, address, value_sats, spent_height) VALUES (?, ?, ?, ?, NULL)",
+                created
+            )
+            self._conn.executemany(
+                "UPDATE outpoints SET spent_height = ? WHERE txid = ? AND vout = ? AND spent_height IS NULL",
+                [(height, txid, vout) for txid, vout in spent]
+            )
+            self._conn.execute(
+                "DELETE FROM outpoints WHERE spent_height IS NOT NULL AND spent_height <= ?",
+                (height - self.prune_depth,)
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_height', ?)", (str(height),)
+            )
+    
+    def reset(self, start_height: int, last_height: int, labels: str, created: List[Tuple[str, int, str, int]]):
+        """Replace the index with outputs (txid, vout, address, value_sats) unspent at start_height, seeded for labels"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM outpoints")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO outpoints (txid, vout, address, value_sats, spent_height) VALUES (?, ?, ?, ?, NULL)",
+                created
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [("start_height", str(start_height)), ("last_height", str(last_height)), ("labels", labels)]
+            )
+    
+    def coverage(self) -> Tuple[Optional[int], Optional[str]]:
+        """(start height, labeled set digest) the index was seeded with, (None, None) if it never was"""
+        with self._lock:
+            meta = dict(self._conn.execute("SELECT key, value FROM meta WHERE key IN ('start_height', 'labels')"))
+        start = meta.get("start_height")
+        return (int(start) if start is not None else None), meta.get("labels")
+    
+    def rewind(self, height: int) -> int:
+        """Undo spends by blocks above height (reorg), returns how many outputs are unspent again.
+        
+        Outputs created above height are kept: a re-mined transaction has the
+        same outpoints, and orphaned ones are never spent.
+        """
+        with self._lock, self._conn:
+            unspent = self._conn.execute(
+                "UPDATE outpoints SET spent_height = NULL WHERE spent_height > ?", (height,)
+            ).rowcount
+            self._conn.execute(
+                "UPDATE meta SET value = ? WHERE key = 'last_height' AND CAST(value AS INTEGER) > ?", (str(height), height)
+            )
+            # Seeded from a UTXO set the reorg replaced, it needs seeding again
+            self._conn.execute(
+                "DELETE FROM meta WHERE key = 'start_height' AND CAST(value AS INTEGER) > ?", (height,)
+            )
+        return unspent
+    
+    def last_height(self) -> Optional[int]:
+        """Highest block applied to the index"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'last_height'").fetchone()
+        return int(row[0]) if row else None
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            unspent, spent = self._conn.execute(
+                "SELECT COUNT(*) - COUNT(spent_height), COUNT(spent_height) FROM outpoints"
+            ).fetchone()
+        return {
+            "path": self.path,
+            "unspent": unspent,
+            "spent_pending_prune": spent,
+            "start_height": self.coverage()[0],
+            "last_height": self.last_height(),
+        }
+    
+    def close(self):
+        self._conn.close()
+
+
+_index: Optional[OutpointIndex] = None
+_index_pid: Optional[int] = None
+_index_lock = threading.Lock()
+
+
+def get_outpoint_index() -> Optional[OutpointIndex]:
+    """Get the process-wide outpoint index, None when BTC_OUTPOINT_INDEX_MODE is OFF"""
+    global _index, _index_pid
+    mode = settings.BTC_OUTPOINT_INDEX_MODE.upper()
+    if mode not in OUTPOINT_INDEX_MODES:
+        raise ValueError(f"Invalid BTC_OUTPOINT_INDEX_MODE: {settings.BTC_OUTPOINT_INDEX_MODE}")
+    if mode == "OFF":
+        return None
+    
+    with _index_lock:
+        # sqlite connections must not be shared across fork
+        if _index is None or _index_pid != os.getpid():
+            _index = OutpointIndex(settings.BTC_OUTPOINT_INDEX_PATH)
+            _index_pid = os.getpid()
+        return _index
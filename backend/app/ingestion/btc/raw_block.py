@@ -0,0 +1,128 @@
+import hashlib
+import struct
+from typing import Iterator, List, Tuple
+
+_uint32 = struct.Struct("<I")
+_uint64 = struct.Struct("<Q")
+
+# Previous output of a coinbase input
+NULL_TXID = b"\x00" * 32
+COINBASE_VOUT = 0xFFFFFFFF
+
+
+def read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    """Read a CompactSize integer, returns (value, new position)"""
+    prefix = data[pos]
+    if prefix < 0xFD:
+        return prefix, pos + 1
+    if prefix == 0xFD:
+        return data[pos + 1] | (data[pos + 2] << 8), pos + 3
+    if prefix == 0xFE:
+        return _uint32.unpack_from(data, pos + 1)[0], pos + 5
+    return _uint64.unpack_from(data, pos + 1)[0], pos + 9
+
+
+class RawTransaction:
+    """One transaction of a serialized block, decoded only as far as the parser needs.
+    
+    inputs holds (previous txid bytes in internal order, vout) and outputs
+    holds (value in sats, scriptPubKey bytes). The txid is hashed on demand.
+    """
+    
+    __slots__ = ("inputs", "outputs", "_data", "_txid_ranges", "_txid")
+    
+    def __init__(self, data: bytes, inputs: List[Tuple[bytes, int]], outputs: List[Tuple[int, bytes]], txid_ranges):
+        self.inputs = inputs
+        self.outputs = outputs
+        self._data = data
+        self._txid_ranges = txid_ranges
+        self._txid = None
+    
+    @property
+    def txid(self) -> str:
+        """Hash of the serialization without witness data, in display (reversed) hex"""
+        if self._txid is None:
+            hasher = hashlib.sha256()
+            view = memoryview(self._data)
+            for start, end in self._txid_ranges:
+                hasher.update(view[start:end])
+            self._txid = hashlib.sha256(hasher.digest()).digest()[::-1].hex()
+        return self._txid
+    
+    @property
+    def is_coinbase(self) -> bool:
+        return len(self.inputs) == 1 and self.inputs[0][0] == NULL_TXID and self.inputs[0][1] == COINBASE_VOUT
+
+
+class RawBlock:
+    """Serialized block (getblock verbosity 0 or Esplora /block/{hash}/raw) read in place"""
+    
+    def __init__(self, data: bytes):
+        self.data = data
+        self.version = _uint32.unpack_from(data, 0)[0]
+        self.prev_hash = data[4:36][::-1].hex()
+        self.timestamp = _uint32.unpack_from(data, 68)[0]
+        self.tx_count, self._tx_start = read_varint(data, 80)
+    
+    @property
+    def hash(self) -> str:
+        return hashlib.sha256(hashlib.sha256(self.data[:80]).digest()).digest()[::-1].hex()
+    
+    def transactions(self) -> Iterator[RawTransaction]:
+        """Decode transactions one at a time"""
+        data = self.data
+        pos = self._tx_start
+        for _ in range(self.tx_count):
+            tx, pos = self._read_transaction(data, pos)
+            yield tx
+    
+    @staticmethod
+    def _read_transaction(data: bytes, pos: int) -> Tuple[RawTransaction, int]:
+        start = pos
+        pos += 4  # version
+        
+        # Segwit marker (0x00) and flag (0x01) sit between version and inputs
+        segwit = data[pos] == 0 and data[pos + 1] == 1
+        if segwit:
+            pos += 2
+        io_start = pos
+        
+        input_count, pos = read_varint(data, pos)
+        inputs = []
+        for _ in range(input_count):
+            prev_txid = data[pos:pos + 32]
+            vout = _uint32.unpack_from(data, pos + 32)[0]
+            script_length, pos = read_varint(data, pos + 36)
+            pos += script_length + 4  # scriptSig and sequence
+            inputs.append((prev_txid, vout))
+        
+        output_count, pos = read_varint(data, pos)
+        outputs = []
+        for _ in range(output_count):
+            value = _uint64.unpack_from(data, pos)[0]
+            script_length, pos = read_varint(data, pos + 8)
+            outputs.append((value, data[pos:pos + script_length]))
+            pos += script_length
+        io_end = pos
+        
+        if segwit:
+            for _ in range(input_count):
+                item_count, pos = read_varint(data, pos)
+                for _ in range(item_count):
+                    item_length, pos = read_varint(data, pos)
+                    pos += item_length
+        
+        lock_start = pos
+        pos += 4
+        if segwit:
+            txid_ranges = ((start, start + 4), (io_start, io_end), (lock_start, pos))
+        else:
+            txid_ranges = ((start, pos),)
+        
+        return RawTransaction(data, inputs, outputs, txid_ranges), pos
+
+
+def parse_transaction(data: bytes) -> RawTransaction:
+    """Decode a single serialized transaction (e.g. a ZMQ rawtx message)"""
+    tx, _ = RawBlock._read_transaction(data, 0)
+    return tx
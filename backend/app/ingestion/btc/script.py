@@ -0,0 +1,202 @@
+import hashlib
+from typing import Optional, Tuple
+
+# Address prefixes per network: (P2PKH version, P2SH version, bech32 HRP)
+NETWORKS = {
+    "mainnet": (0x00, 0x05, "bc"),
+    "testnet": (0x6F, 0xC4, "tb"),
+    "signet": (0x6F, 0xC4, "tb"),
+    "regtest": (0x6F, 0xC4, "bcrt"),
+}
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+BASE58_INDEX = {ch: i for i, ch in enumerate(BASE58_ALPHABET)}
+
+BECH32_CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+BECH32_INDEX = {ch: i for i, ch in enumerate(BECH32_CHARSET)}
+BECH32_CONST = 1
+BECH32M_CONST = 0x2BC830A3
+
+OP_DUP = 0x76
+OP_HASH160 = 0xA9
+OP_EQUAL = 0x87
+OP_EQUALVERIFY = 0x88
+OP_CHECKSIG = 0xAC
+OP_0 = 0x00
+OP_1 = 0x51
+
+
+def _double_sha256(data: bytes) -> bytes:
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+
+def base58check_encode(payload: bytes) -> str:
+    data = payload + _double_sha256(payload)[:4]
+    number = int.from_bytes(data, "big")
+    encoded = ""
+    while number:
+        number, remainder = divmod(number, 58)
+        encoded = BASE58_ALPHABET[remainder] + encoded
+    leading_zeros = len(data) - len(data.lstrip(b"\x00"))
+    return "1" * leading_zeros + encoded
+
+
+def base58check_decode(address: str) -> Optional[bytes]:
+    """Decode a Base58Check string to its payload, None if invalid"""
+    number = 0
+    for ch in address:
+        if ch not in BASE58_INDEX:
+            return None
+        number = number * 58 + BASE58_INDEX[ch]
+    leading_zeros = len(address) - len(address.lstrip("1"))
+    body = number.to_bytes((number.bit_length() + 7) // 8, "big") if number else b""
+    data = b"\x00" * leading_zeros + body
+    if len(data) < 5:
+        return None
+    payload, checksum = data[:-4], data[-4:]
+    if _double_sha256(payload)[:4] != checksum:
+        return None
+    return payload
+
+
+def _bech32_polymod(values) -> int:
+    generator = (0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3)
+    checksum = 1
+    for value in values:
+        top = checksum >> 25
+        checksum = (checksum & 0x1FFFFFF) << 5 ^ value
+        for i in range(5):
+            checksum ^= generator[i] if (top >> i) & 1 else 0
+    return checksum
+
+
+def _bech32_hrp_expand(hrp: str):
+    return [ord(ch) >> 5 for ch in hrp] + [0] + [ord(ch) & 31 for ch in hrp]
+
+
+def _convert_bits(data, from_bits: int, to_bits: int, pad: bool) -> Optional[list]:
+    accumulator, bits, result = 0, 0, []
+    max_value = (1 << to_bits) - 1
+    for value in data:
+        if value < 0 or value >> from_bits:
+            return None
+        accumulator = (accumulator << from_bits) | value
+        bits += from_bits
+        while bits >= to_bits:
+            bits -= to_bits
+            result.append((accumulator >> bits) & max_value)
+    if pad:
+        if bits:
+            result.append((accumulator << (to_bits - bits)) & max_value)
+    elif bits >= from_bits or ((accumulator << (to_bits - bits)) & max_value):
+        return None
+    return result
+
+
+def segwit_encode(hrp: str, witness_version: int, program: bytes) -> str:
+    """Encode a segwit address (bech32 for v0, bech32m for v1+)"""
+    const = BECH32_CONST if witness_version == 0 else BECH32M_CONST
+    data = [witness_version] + _convert_bits(program, 8, 5, True)
+    polymod = _bech32_polymod(_bech32_hrp_expand(hrp) + data + [0] * 6) ^ const
+    checksum = [(polymod >> 5 * (5 - i)) & 31 for i in range(6)]
+    return hrp + "1" + "".join(BECH32_CHARSET[d] for d in data + checksum)
+
+
+def segwit_decode(address: str) -> Optional[Tuple[str, int, bytes]]:
+    """Decode a segwit address to (hrp, witness version, program), None if invalid"""
+    if address.lower() != address and address.upper() != address:
+        return None
+    address = address.lower()
+    separator = address.rfind("1")
+    if separator < 1 or separator + 7 > len(address) or len(address) > 90:
+        return None
+    hrp = address[:separator]
+    try:
+        data = [BECH32_INDEX[ch] for ch in address[separator + 1:]]
+    except KeyError:
+        return None
+    
+    const = _bech32_polymod(_bech32_hrp_expand(hrp) + data)
+    witness_version = data[0]
+    if const != (BECH32_CONST if witness_version == 0 else BECH32M_CONST):
+        return None
+    
+    program = _convert_bits(data[1:-6], 5, 8, False)
+    if program is None or not 2 <= len(program) <= 40 or witness_version > 16:
+        return None
+    if witness_version == 0 and len(program) not in (20, 32):
+        return None
+    return hrp, witness_version, bytes(program)
+
+
+def address_to_script(address: str) -> Optional[bytes]:
+    """scriptPubKey paying an address (P2PKH, P2SH or segwit on any network), None if unrecognized"""
+    decoded = segwit_decode(address)
+    if decoded:
+        _, witness_version, program = decoded
+        opcode = OP_0 if witness_version == 0 else OP_1 + witness_version - 1
+        return bytes([opcode, len(program)]) + program
+    
+    payload = base58check_decode(address)
+    if payload is None or len(payload) != 21:
+        return None
+    version, hash160 = payload[0], payload[1:]
+    if version in (0x00, 0x6F):
+        return bytes([OP_DUP, OP_HASH160, 20]) + hash160 + bytes([OP_EQUALVERIFY, OP_CHECKSIG])
+    if version in (0x05, 0xC4):
+        return bytes([OP_HASH160, 20]) + hash160 + bytes([OP_EQUAL])
+    return None
+
+
+def script_to_address(script: bytes, network: str = "mainnet") -> Optional[str]:
+    """Address of a P2PKH, P2SH, P2WPKH, P2WSH or P2TR scriptPubKey, None for other scripts"""
+    p2pkh_version, p2sh_version, hrp = NETWORKS[network]
+    length = len(script)
+    
+    if length == 25 and script[0] == OP_DUP and script[1] == OP_HASH160 and script[2] == 20 \
+            and script[23] == OP_EQUALVERIFY and script[24] == OP_CHECKSIG:
+        return base58check_encode(bytes([p2pkh_version]) + script[3:23])
+    if length == 23 and script[0] == OP_HASH160 and script[1] == 20 and script[22] == OP_EQUAL:
+        return base58check_encode(bytes([p2sh_version]) + script[2:22])
+    if 4 <= length <= 42 and script[1] == length - 2:
+        if script[0] == OP_0 and length in (22, 34):
+            return segwit_encode(hrp, 0, script[2:])
+        if OP_1 <= script[0] <= OP_1 + 15:
+            return segwit_encode(hrp, script[0] - OP_1 + 1, script[2:])
+    return None
+
+
+# Fixed-width script key: program (hash160, witness program) zero-padded to 32 bytes, then a type tag.
+# Witness tags are version * 2 + (1 for 32-byte programs), legacy types use the two tags below.
+SCRIPT_KEY_WIDTH = 33
+TAG_P2PKH = 0xF0
+TAG_P2SH = 0xF1
+
+
+def script_key(script: bytes) -> Optional[bytes]:
+    """Fixed-width key of a standard scriptPubKey, None for scripts without one (bare multisig, OP_RETURN...)"""
+    length = len(script)
+    if length == 25 and script[0] == OP_DUP and script[1] == OP_HASH160 and script[2] == 20 \
+            and script[23] == OP_EQUALVERIFY and script[24] == OP_CHECKSIG:
+        return script[3:23] + b"\x00" * 12 + bytes([TAG_P2PKH])
+    if length == 23 and script[0] == OP_HASH160 and script[1] == 20 and script[22] == OP_EQUAL:
+        return script[2:22] + b"\x00" * 12 + bytes([TAG_P2SH])
+    if length == 22 and script[1] == 20 and (script[0] == OP_0 or OP_1 <= script[0] <= OP_1 + 15):
+        witness_version = script[0] - OP_1 + 1 if script[0] else 0
+        return script[2:] + b"\x00" * 12 + bytes([witness_version * 2])
+    if length == 34 and script[1] == 32 and (script[0] == OP_0 or OP_1 <= script[0] <= OP_1 + 15):
+        witness_version = script[0] - OP_1 + 1 if script[0] else 0
+        return script[2:] + bytes([witness_version * 2 + 1])
+    return None
+
+
+def key_script(key: bytes) -> bytes:
+    """scriptPubKey a script key was made from"""
+    tag = key[32]
+    if tag == TAG_P2PKH:
+        return bytes([OP_DUP, OP_HASH160, 20]) + key[:20] + bytes([OP_EQUALVERIFY, OP_CHECKSIG])
+    if tag == TAG_P2SH:
+        return bytes([OP_HASH160, 20]) + key[:20] + bytes([OP_EQUAL])
+    witness_version, long_program = divmod(tag, 2)
+    opcode = OP_0 if witness_version == 0 else OP_1 + witness_version - 1
+    return bytes([opcode, 32]) + key[:32] if long_program else bytes([opcode, 20]) + key[:20]
@@ -1,24 +1,60 @@
 from sqlalchemy.orm import Session
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from app.ingestion.btc.core_rpc import BitcoinCoreRPC
 from app.ingestion.btc.explorer_api import BitcoinExplorerAPI
-from app.db.models import LabeledAddress, SyncState, RawTransfer, Chain
+from app.ingestion.btc.outpoints import get_outpoint_index, to_sats, SATS_PER_BTC
+from app.ingestion.btc.raw_block import RawBlock, parse_transaction
+from app.ingestion.btc.script import script_to_address
+from app.ingestion.btc.block_filter import BlockFilter
+from app.ingestion.address_index import BTCAddressIndex, get_address_index
+from app.ingestion.window import get_window
+from app.ingestion.reorg import ReorgGuard, ReorgDetected
+from app.ingestion.group_commit import GroupCommit, GroupCommitFailed
+from app.services.transfer_writer import RawTransferWriter
+from app.services.metrics import MetricsService
+from app.db.models import SyncState, Chain
 from app.core.config import settings
 from datetime import datetime
 from decimal import Decimal
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
-BATCH_SIZE = 5  # Smaller batch for BTC
+BATCH_SIZE = 5  # Smaller batch for BTC, the adaptive window never goes below it
+
+# JSON decodes getblock verbosity 2/3 (or explorer pages), RAW reads the serialized block in place
+BLOCK_FORMATS = ("JSON", "RAW")
 
 
 class BTCSync:
     """Bitcoin sync service with adapter pattern"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, update_outpoints: bool = True):
         self.db = db
         self.adapter = self._get_adapter()
+        self.outpoints = get_outpoint_index()
+        self.outpoint_mode = settings.BTC_OUTPOINT_INDEX_MODE.upper()
+        # Only the in-order tip sync writes the index, out-of-order backfill ranges just read it
+        self.update_outpoints = update_outpoints
+        self.block_format = settings.BTC_BLOCK_FORMAT.upper()
+        if self.block_format not in BLOCK_FORMATS:
+            raise ValueError(f"Invalid BTC_BLOCK_FORMAT: {settings.BTC_BLOCK_FORMAT}")
+        self.window = get_window(
+            Chain.BTC.value, BATCH_SIZE, settings.BTC_SYNC_WINDOW_MAX, settings.BTC_SYNC_TARGET_BLOCK_MS
+        )
+        self.prescan = self._prescan_enabled()
+        self.prescan_stats = {"checked": 0, "skipped": 0}
+        self.reorg_guard = ReorgGuard(
+            db, Chain.BTC, self.adapter.get_block_hash, settings.BTC_REORG_MAX_DEPTH, on_rollback=self._rewind_outpoints
+        )
+        # (hash, parent hash) of fetched blocks until they are saved
+        self.headers: Dict[int, Tuple[str, Optional[str]]] = {}
+        # (created outputs, spent outpoints) of parsed blocks, written to the outpoint index once their block is committed
+        self.staged_outpoints: Dict[int, Tuple[Dict[Tuple[str, int], Tuple[str, int]], List[Tuple[str, int]]]] = {}
+        # Blocks above this height may treat a LABELED index miss as "not labeled", None asks the node
+        self.index_start: Optional[int] = None
+        self.commits = GroupCommit(db, Chain.BTC)
     
     def _get_adapter(self):
         """Get BTC adapter based on mode"""
@@ -29,8 +65,13 @@ class BTCSync:
         else:
             raise ValueError(f"Invalid BTC_MODE: {settings.BTC_MODE}")
     
-    def sync(self) -> Dict[str, Any]:
-        """Sync Bitcoin - process new blocks"""
+    def sync(self, catch_up: bool = False) -> Dict[str, Any]:
+        """Sync Bitcoin - process new blocks.
+        
+        A normal run processes one batch window. In catch-up mode batches are
+        repeated until the sync is within BTC_CATCHUP_TARGET_LAG blocks of the
+        tip or SYNC_CATCHUP_TIME_BUDGET_SECONDS have passed.
+        """
         # Get sync state
         sync_state = self.db.query(SyncState).filter(SyncState.chain == Chain.BTC).first()
         if not sync_state:
@@ -44,68 +85,223 @@ class BTCSync:
             logger.info("No labeled addresses found for BTC")
             return {"processed": 0, "transfers": 0, "last_height": sync_state.last_processed_height}
         
+        started = time.monotonic()
+        processed_count = 0
+        transfer_count = 0
+        
+        while True:
+            result = self._sync_batch(sync_state, labeled_addresses)
+            # Failed batches still report the blocks committed before the failure
+            processed_count += result.get("processed", 0)
+            transfer_count += result.get("transfers", 0)
+            if "error" in result:
+                if processed_count == 0:
+                    return result
+                break
+            
+            if not catch_up or result["processed"] == 0:
+                break
+            if result["lag"] <= settings.BTC_CATCHUP_TARGET_LAG:
+                break
+            if time.monotonic() - started >= settings.SYNC_CATCHUP_TIME_BUDGET_SECONDS:
+                logger.info(f"BTC catch-up time budget reached, lag {result['lag']} blocks")
+                break
+        
+        self._refresh_metrics()
+        
+        result = {
+            "processed": processed_count,
+            "transfers": transfer_count,
+            "last_height": sync_state.last_processed_height,
+            "lag": result.get("lag"),
+            "window": self.window.size,
+        }
+        if self.prescan:
+            result.update(self.prescan_summary())
+            logger.info(f"BTC filter prescan skipped {result['filter_skipped']} of {result['filter_checked']} blocks")
+        return result
+    
+    def prescan_summary(self) -> Dict[str, Any]:
+        """Blocks checked and skipped by the filter prescan since this sync was created"""
+        checked = self.prescan_stats["checked"]
+        skipped = self.prescan_stats["skipped"]
+        return {
+            "filter_checked": checked,
+            "filter_skipped": skipped,
+            "filter_skip_rate": round(skipped / checked, 4) if checked else None,
+        }
+    
+    def _refresh_metrics(self):
+        """Recompute metric buckets this sync wrote that the periodic aggregation no longer covers (catch-up after an outage)"""
+        if self.commits.first_timestamp is None:
+            return
+        try:
+            MetricsService(self.db).refresh_stale(self.commits.first_timestamp, self.commits.last_timestamp)
+        except Exception as e:
+            logger.error(f"Failed to refresh metrics from {self.commits.first_timestamp}: {e}")
+            self.db.rollback()
+    
+    def _sync_batch(self, sync_state: SyncState, labeled_addresses: BTCAddressIndex) -> Dict[str, Any]:
+        """Process one batch window of blocks and adapt the window to lag and latency"""
         # Get latest height
         try:
-            if settings.BTC_MODE == "CORE_RPC":
-                latest_height = self.adapter.get_block_count()
-            else:
-                latest_height = self.adapter.get_tip_height()
+            latest_height = self._get_latest_height() - settings.BTC_CONFIRMATIONS
         except Exception as e:
             logger.error(f"Failed to get latest height: {e}")
             return {"error": str(e)}
         
+        # Undo blocks the chain has replaced since the last run before building on them
+        try:
+            self.reorg_guard.verify(sync_state)
+        except Exception as e:
+            logger.error(f"BTC reorg check failed: {e}")
+            self.db.rollback()
+            return {"error": str(e)}
+        
+        # Left over from blocks of the last batch that were not committed
+        self.staged_outpoints.clear()
+        self._check_outpoint_index(sync_state, labeled_addresses)
+        
         # Determine start height
         start_height = sync_state.last_processed_height + 1 if sync_state.last_processed_height else latest_height - BATCH_SIZE
         
         if start_height > latest_height:
             logger.info(f"No new blocks to process. Latest: {latest_height}, Last processed: {sync_state.last_processed_height}")
-            return {"processed": 0, "transfers": 0, "last_height": sync_state.last_processed_height}
+            return {"processed": 0, "transfers": 0, "lag": 0}
         
         # Process blocks
-        end_height = min(start_height + BATCH_SIZE - 1, latest_height)
-        processed_count = 0
-        transfer_count = 0
+        end_height = min(start_height + self.window.size - 1, latest_height)
+        committed_blocks, committed_rows = self.commits.committed_blocks, self.commits.committed_rows
+        batch_started = time.monotonic()
+        commit_failed = False
         
         for height in range(start_height, end_height + 1):
             try:
-                # Get block
-                if settings.BTC_MODE == "CORE_RPC":
-                    block_hash = self.adapter.get_block_hash(height)
-                    block = self.adapter.get_block(block_hash, verbosity=2)
-                else:
-                    block_hash = self.adapter.get_block_hash(height)
-                    block = self.adapter.get_block(block_hash)
-                
-                if not block:
+                transfers = self._process_block(height, labeled_addresses)
+                if transfers is None:
                     continue
                 
-                # Parse block for transfers
-                transfers = self._parse_block(block, labeled_addresses, height)
-                
-                # Save transfers
-                for transfer_data in transfers:
-                    transfer = RawTransfer(**transfer_data)
-                    self.db.add(transfer)
-                    transfer_count += 1
-                
-                processed_count += 1
-                
-                # Update sync state
-                sync_state.last_processed_height = height
-                self.db.commit()
+                self._save_block(sync_state, height, transfers)
                 
+            except ReorgDetected as e:
+                logger.warning(f"BTC reorg detected: {e}")
+                break
+            except GroupCommitFailed as e:
+                logger.error(str(e))
+                commit_failed = True
+                break
             except Exception as e:
                 logger.error(f"Failed to process block {height}: {e}")
-                self.db.rollback()
                 break
         
-        return {
-            "processed": processed_count,
-            "transfers": transfer_count,
-            "last_height": sync_state.last_processed_height
-        }
+        # Blocks still in the open group, and the good blocks before a failed one
+        if not self.commits.commit():
+            commit_failed = True
+        processed_count = self.commits.committed_blocks - committed_blocks
+        transfer_count = self.commits.committed_rows - committed_rows
+        
+        if self.reorg_guard.fork_detected:
+            try:
+                self.reorg_guard.rollback(sync_state)
+            except Exception as e:
+                logger.error(f"BTC reorg rollback failed, retrying next run: {e}")
+                self.db.rollback()
+        
+        last_height = sync_state.last_processed_height
+        lag = latest_height - last_height if last_height is not None else latest_height - start_height + 1
+        self.window.update(lag, processed_count, time.monotonic() - batch_started)
+        
+        if commit_failed:
+            # Sync state was rolled back to the last committed block, the next run resumes there
+            return {"error": "Failed to commit BTC blocks", "processed": processed_count, "transfers": transfer_count}
+        return {"processed": processed_count, "transfers": transfer_count, "lag": lag}
+    
+    def _get_latest_height(self) -> int:
+        """Get the chain tip height from the adapter"""
+        if settings.BTC_MODE == "CORE_RPC":
+            return self.adapter.get_block_count()
+        return self.adapter.get_tip_height()
+    
+    def _process_block(self, height: int, labeled_addresses: BTCAddressIndex) -> Optional[List[Dict[str, Any]]]:
+        """Fetch a block and parse transfers (None if block not available)"""
+        block_hash = self.adapter.get_block_hash(height)
+        
+        if self.prescan and not self._filter_may_match(block_hash, labeled_addresses):
+            # Parent unknown without the header, verify() still compares the hash with the node's
+            self.headers[height] = (block_hash, None)
+            # Neither pays nor spends labeled scripts, the index only has to advance past it
+            self._stage_outpoints(height, {}, [])
+            return []
+        
+        if self.block_format == "RAW":
+            raw = self.adapter.get_raw_block(block_hash)
+            if not raw:
+                return None
+            self.headers[height] = (block_hash, raw[4:36][::-1].hex())
+            return self._parse_raw_block(raw, labeled_addresses, height)
+        
+        # Get block
+        if settings.BTC_MODE == "CORE_RPC" and settings.BTC_BLOCK_VERBOSITY:
+            block = self.adapter.get_block(block_hash, verbosity=settings.BTC_BLOCK_VERBOSITY)
+        elif settings.BTC_MODE == "CORE_RPC":
+            # Verbosity detected per node, the endpoints may run different versions
+            block = self.adapter.get_block_with_prevouts(block_hash)
+        else:
+            block = self.adapter.get_block_with_transactions(block_hash)
+        
+        if not block:
+            return None
+        self.headers[height] = (block_hash, block.get("previousblockhash"))
+        
+        # Parse block for transfers
+        return self._parse_block(block, labeled_addresses, height)
+    
+    def _filter_may_match(self, block_hash: str, labeled_addresses: BTCAddressIndex) -> bool:
+        """Test the block's BIP158 filter against the labeled scripts (False means the block can be skipped)"""
+        self.prescan_stats["checked"] += 1
+        try:
+            block_filter = BlockFilter(bytes.fromhex(self.adapter.get_block_filter(block_hash)["filter"]), block_hash)
+        except Exception as e:
+            # No filter (e.g. blockfilterindex still building), process the block in full
+            logger.warning(f"Failed to get block filter for {block_hash}: {e}")
+            return True
+        
+        if block_filter.match_any(labeled_addresses.filter_queries()):
+            return True
+        self.prescan_stats["skipped"] += 1
+        return False
+    
+    def _prescan_enabled(self) -> bool:
+        """Whether blocks are pre-checked against BIP158 filters before being fetched"""
+        if not settings.BTC_FILTER_PRESCAN:
+            return False
+        if settings.BTC_MODE != "CORE_RPC":
+            logger.warning("BTC_FILTER_PRESCAN needs BTC_MODE=CORE_RPC, prescan disabled")
+            return False
+        if self.outpoints and self.outpoint_mode == "FULL" and self.update_outpoints:
+            # A full index needs every block's outputs and spends
+            logger.warning("BTC_FILTER_PRESCAN is not compatible with a FULL outpoint index, prescan disabled")
+            return False
+        return True
+    
+    def _save_block(self, sync_state: SyncState, height: int, transfers: List[Dict[str, Any]]) -> int:
+        """Persist a block's transfers and advance the sync state in the open commit group, returns new transfer rows"""
+        with self.commits.block(transfers) as group:
+            header = self.headers.pop(height, None)
+            if header is not None:
+                self.reorg_guard.record(height, *header)
+            
+            written = RawTransferWriter(self.db).write(transfers)
+            group.block_rows = written
+            
+            # Committed together with the block's transfers
+            sync_state.last_processed_height = height
+            
+            if height in self.staged_outpoints:
+                group.after_commit(lambda: self._apply_outpoints(height))
+        return written
     
-    def _parse_block(self, block: Dict[str, Any], labeled_addresses: Dict[str, Dict], height: int) -> List[Dict[str, Any]]:
+    def _parse_block(self, block: Dict[str, Any], labeled_addresses: BTCAddressIndex, height: int) -> List[Dict[str, Any]]:
         """Parse Bitcoin block and extract transfers involving labeled addresses"""
         transfers = []
         
@@ -118,20 +314,24 @@ class BTCSync:
             timestamp = datetime.fromtimestamp(block.get("timestamp", 0))
             tx_list = block.get("tx", [])
         
+        # Previous transactions fetched for inputs without an embedded prevout
+        prev_txs = {}
+        
+        # Outpoint index changes, also used to resolve inputs spending outputs of this block
+        created_outputs = {}
+        spent_outpoints = []
+        
+        labeled_scripts = labeled_addresses.script_matcher()
+        
         # Process transactions
         for tx in tx_list:
-            txid = tx.get("txid") or tx.get("hash")
+            txid = tx if isinstance(tx, str) else (tx.get("txid") or tx.get("hash"))
             if not txid:
                 continue
             
             # Get full transaction details
-            try:
-                if settings.BTC_MODE == "CORE_RPC":
-                    full_tx = self.adapter.get_transaction(txid, verbose=True)
-                else:
-                    full_tx = self.adapter.get_transaction(txid)
-            except Exception as e:
-                logger.warning(f"Failed to get full tx {txid}: {e}")
+            full_tx = self._get_full_transaction(tx, txid)
+            if full_tx is None:
                 continue
             
             # Parse inputs and outputs
@@ -143,43 +343,38 @@ class BTCSync:
             address_to_exchange = {}
             
             # Check outputs
-            for output in vout:
+            for position, output in enumerate(vout):
                 script_pubkey = output.get("scriptPubKey", {})
-                addresses = script_pubkey.get("addresses", [])
-                if not addresses:
-                    # Try single address field
-                    addr = script_pubkey.get("address")
-                    if addr:
-                        addresses = [addr]
+                labeled_outputs = self._labeled_addresses_of(script_pubkey, labeled_addresses, labeled_scripts)
+                for addr in labeled_outputs:
+                    involved_addresses.add(addr)
+                    address_to_exchange[addr] = labeled_addresses[addr]
                 
-                for addr in addresses:
-                    if addr in labeled_addresses:
-                        involved_addresses.add(addr)
-                        address_to_exchange[addr] = labeled_addresses[addr]
+                if self.outpoints:
+                    if labeled_outputs:
+                        address = labeled_outputs[0]
+                    elif self.outpoint_mode == "FULL":
+                        addresses = script_pubkey.get("addresses") or [script_pubkey.get("address")]
+                        address = addresses[0] if len(addresses) == 1 else None
+                    else:
+                        address = None
+                    if address:
+                        created_outputs[(txid, output.get("n", position))] = (address, to_sats(output.get("value", 0)))
             
             # Check inputs (previous outputs)
             for input_tx in vin:
-                prev_txid = input_tx.get("txid")
-                vout_index = input_tx.get("vout")
+                if self.outpoints and input_tx.get("txid") and input_tx.get("vout") is not None:
+                    spent_outpoints.append((input_tx["txid"], input_tx["vout"]))
                 
-                if prev_txid and vout_index is not None:
-                    try:
-                        prev_tx = self.adapter.get_transaction(prev_txid)
-                        prev_output = prev_tx.get("vout", [])[vout_index] if vout_index < len(prev_tx.get("vout", [])) else None
-                        if prev_output:
-                            script_pubkey = prev_output.get("scriptPubKey", {})
-                            addresses = script_pubkey.get("addresses", [])
-                            if not addresses:
-                                addr = script_pubkey.get("address")
-                                if addr:
-                                    addresses = [addr]
-                            
-                            for addr in addresses:
-                                if addr in labeled_addresses:
-                                    involved_addresses.add(addr)
-                                    address_to_exchange[addr] = labeled_addresses[addr]
-                    except Exception as e:
-                        logger.debug(f"Could not fetch prev tx {prev_txid}: {e}")
+                prev_output = input_tx.get("prevout")
+                if prev_output is None:
+                    prev_output = self._resolve_prev_output(input_tx, prev_txs, created_outputs, height)
+                
+                if prev_output:
+                    script_pubkey = prev_output.get("scriptPubKey", {})
+                    for addr in self._labeled_addresses_of(script_pubkey, labeled_addresses, labeled_scripts):
+                        involved_addresses.add(addr)
+                        address_to_exchange[addr] = labeled_addresses[addr]
             
             # If transaction involves labeled addresses, record it
             if involved_addresses:
@@ -191,54 +386,288 @@ class BTCSync:
                         total_value += Decimal(value)
                 
                 if total_value > 0:
-                    # Determine direction (simplified - in production, track more precisely)
-                    direction = "unknown"
-                    exchange_from_id = None
-                    exchange_to_id = None
-                    
-                    # For MVP, if any labeled address is involved, record as deposit/withdraw
-                    # More sophisticated logic can be added later
-                    if len(involved_addresses) == 1:
-                        addr = list(involved_addresses)[0]
-                        exchange_info = address_to_exchange[addr]
-                        # Assume it's a deposit if it appears in outputs
-                        direction = "deposit"
-                        exchange_to_id = exchange_info["exchange_id"]
-                    else:
-                        # Multiple addresses - could be internal or exchange-to-exchange
-                        direction = "internal"
+                    transfers.append(self._build_transfer(
+                        txid, involved_addresses, address_to_exchange, total_value, timestamp, height
+                    ))
+        
+        self._stage_outpoints(height, created_outputs, spent_outpoints)
+        
+        return transfers
+    
+    @staticmethod
+    def _labeled_addresses_of(script_pubkey: Dict[str, Any], labeled_addresses: BTCAddressIndex, labeled_scripts) -> List[str]:
+        """Labeled addresses a decoded scriptPubKey pays, matched on the script hex when present"""
+        script_hex = script_pubkey.get("hex")
+        if script_hex:
+            addr = labeled_scripts.get(bytes.fromhex(script_hex))
+            return [addr] if addr else []
+        addresses = script_pubkey.get("addresses") or [script_pubkey.get("address")]
+        return [addr for addr in addresses if addr in labeled_addresses]
+    
+    def _parse_raw_block(self, raw: bytes, labeled_addresses: BTCAddressIndex, height: int) -> List[Dict[str, Any]]:
+        """Parse a serialized block, matching output scripts against labeled scripts without decoding to JSON"""
+        transfers = []
+        block = RawBlock(raw)
+        timestamp = datetime.fromtimestamp(block.timestamp)
+        labeled_scripts = labeled_addresses.script_matcher()
+        index_all = self.outpoints is not None and self.outpoint_mode == "FULL"
+        
+        prev_txs = {}
+        created_outputs = {}
+        spent_outpoints = []
+        
+        for tx in block.transactions():
+            involved_addresses = set()
+            
+            # Check outputs, only labeled scripts (or every script for a full index) become addresses
+            for n, (value_sats, script) in enumerate(tx.outputs):
+                addr = labeled_scripts.get(script)
+                if addr:
+                    involved_addresses.add(addr)
+                if self.outpoints:
+                    if addr is None and index_all:
+                        addr = script_to_address(script, settings.BTC_NETWORK)
+                    if addr:
+                        created_outputs[(tx.txid, n)] = (addr, value_sats)
+            
+            # Check inputs (previous outputs), the serialized block carries no prevouts
+            if not tx.is_coinbase:
+                for prev_txid, vout_index in tx.inputs:
+                    input_tx = {"txid": prev_txid[::-1].hex(), "vout": vout_index}
+                    if self.outpoints:
+                        spent_outpoints.append((input_tx["txid"], vout_index))
                     
-                    transfers.append({
-                        "timestamp": timestamp,
-                        "chain": "BTC",
-                        "tx_hash": txid,
-                        "block_number": height,
-                        "log_index": None,
-                        "from_address": "",  # BTC doesn't have explicit from
-                        "to_address": list(involved_addresses)[0] if involved_addresses else "",
-                        "asset_symbol": "BTC",
-                        "asset_address": None,
-                        "amount": total_value,
-                        "direction": direction,
-                        "exchange_from_id": exchange_from_id,
-                        "exchange_to_id": exchange_to_id,
-                    })
+                    prev_output = self._resolve_prev_output(input_tx, prev_txs, created_outputs, height)
+                    if prev_output:
+                        script_pubkey = prev_output.get("scriptPubKey", {})
+                        for addr in script_pubkey.get("addresses") or [script_pubkey.get("address")]:
+                            if addr in labeled_addresses:
+                                involved_addresses.add(addr)
+            
+            if involved_addresses:
+                total_value = Decimal(sum(value_sats for value_sats, _ in tx.outputs)) / SATS_PER_BTC
+                if total_value > 0:
+                    address_to_exchange = {addr: labeled_addresses[addr] for addr in involved_addresses}
+                    transfers.append(self._build_transfer(
+                        tx.txid, involved_addresses, address_to_exchange, total_value, timestamp, height
+                    ))
+        
+        self._stage_outpoints(height, created_outputs, spent_outpoints)
         
         return transfers
     
-    def _get_labeled_addresses(self) -> Dict[str, Dict[str, Any]]:
-        """Get labeled addresses as dict for fast lookup"""
-        addresses = self.db.query(LabeledAddress).filter(
-            LabeledAddress.chain == Chain.BTC,
-            LabeledAddress.is_active == True
-        ).all()
-        
-        result = {}
-        for addr in addresses:
-            result[addr.address] = {
-                "exchange_id": str(addr.exchange_id),
-                "cluster_id": str(addr.cluster_id) if addr.cluster_id else None,
-                "label": addr.label.value
-            }
+    @staticmethod
+    def parse_pending_transaction(raw: bytes, labeled_addresses: BTCAddressIndex) -> Optional[Dict[str, Any]]:
+        """Transfer a mempool transaction makes to labeled addresses, None if it pays none.
         
-        return result
+        Only outputs are matched (as in _parse_raw_block); the inputs of an
+        unconfirmed transaction are not resolved.
+        """
+        tx = parse_transaction(raw)
+        labeled_scripts = labeled_addresses.script_matcher()
+        involved_addresses = set()
+        for _, script in tx.outputs:
+            addr = labeled_scripts.get(script)
+            if addr:
+                involved_addresses.add(addr)
+        if not involved_addresses:
+            return None
+        
+        total_value = Decimal(sum(value_sats for value_sats, _ in tx.outputs)) / SATS_PER_BTC
+        address_to_exchange = {addr: labeled_addresses[addr] for addr in involved_addresses}
+        return BTCSync._build_transfer(tx.txid, involved_addresses, address_to_exchange, total_value, datetime.now(), None)
+    
+    @staticmethod
+    def _build_transfer(
+        txid: str,
+        involved_addresses: set,
+        address_to_exchange: Dict[str, Dict],
+        total_value: Decimal,
+        timestamp: datetime,
+        height: Optional[int]
+    ) -> Dict[str, Any]:
+        """Transfer record for a transaction touching labeled addresses"""
+        # Determine direction (simplified - in production, track more precisely)
+        direction = "unknown"
+        exchange_from_id = None
+        exchange_to_id = None
+        
+        # For MVP, if any labeled address is involved, record as deposit/withdraw
+        # More sophisticated logic can be added later
+        if len(involved_addresses) == 1:
+            addr = list(involved_addresses)[0]
+            exchange_info = address_to_exchange[addr]
+            # Assume it's a deposit if it appears in outputs
+            direction = "deposit"
+            exchange_to_id = exchange_info["exchange_id"]
+        else:
+            # Multiple addresses - could be internal or exchange-to-exchange
+            direction = "internal"
+        
+        return {
+            "timestamp": timestamp,
+            "chain": "BTC",
+            "tx_hash": txid,
+            "block_number": height,
+            "log_index": None,
+            "from_address": "",  # BTC doesn't have explicit from
+            "to_address": list(involved_addresses)[0] if involved_addresses else "",
+            "asset_symbol": "BTC",
+            "asset_address": None,
+            "amount": total_value,
+            "direction": direction,
+            "exchange_from_id": exchange_from_id,
+            "exchange_to_id": exchange_to_id,
+        }
+    
+    def _stage_outpoints(self, height: int, created_outputs: Dict[Tuple[str, int], Tuple[str, int]], spent_outpoints: List[Tuple[str, int]]):
+        """Keep a block's created and spent outputs until the block is committed.
+        
+        Keyed by height, so a block parsed again (retry, reorg) replaces its
+        earlier changes instead of adding to them.
+        """
+        if self.outpoints and self.update_outpoints:
+            self.staged_outpoints[height] = (created_outputs, spent_outpoints)
+    
+    def _apply_outpoints(self, height: int):
+        """Write a committed block's staged outputs to the outpoint index"""
+        staged = self.staged_outpoints.pop(height, None)
+        if staged is None:
+            return
+        created_outputs, spent_outpoints = staged
+        created = [(txid, n, address, value) for (txid, n), (address, value) in created_outputs.items()]
+        self.outpoints.apply_block(height, created, spent_outpoints)
+    
+    def _get_full_transaction(self, tx: Any, txid: str) -> Optional[Dict[str, Any]]:
+        """Transaction with inputs and outputs, fetched only if the block did not embed it.
+        
+        getblock with verbosity 2 already returns decoded transactions, so only
+        blocks listing bare txids (verbosity 1, explorer headers) cost a call per tx.
+        """
+        if isinstance(tx, dict) and "vin" in tx and "vout" in tx:
+            return tx
+        
+        try:
+            if settings.BTC_MODE == "CORE_RPC":
+                return self.adapter.get_transaction(txid, verbose=True)
+            return self.adapter.get_transaction(txid)
+        except Exception as e:
+            logger.warning(f"Failed to get full tx {txid}: {e}")
+            return None
+    
+    def _resolve_prev_output(
+        self,
+        input_tx: Dict[str, Any],
+        prev_txs: Dict[str, Dict[str, Any]],
+        created_outputs: Dict[Tuple[str, int], Tuple[str, int]],
+        height: int
+    ) -> Optional[Dict[str, Any]]:
+        """Find the output an input spends: this block, staged blocks, the outpoint index, then the node.
+        
+        In LABELED index mode only labeled outputs are indexed, so a miss means
+        the input is not labeled and the node is not asked, for blocks above
+        index_start (see _check_outpoint_index). Otherwise, e.g. in backfill
+        ranges below the tip, misses are looked up on the node.
+        """
+        prev_txid = input_tx.get("txid")
+        vout_index = input_tx.get("vout")
+        if not prev_txid or vout_index is None:
+            # Coinbase input
+            return None
+        
+        if self.outpoints:
+            indexed = (
+                created_outputs.get((prev_txid, vout_index))
+                or self._staged_output(prev_txid, vout_index)
+                or self.outpoints.get(prev_txid, vout_index)
+            )
+            if indexed:
+                address, value_sats = indexed
+                return {"value": Decimal(value_sats) / SATS_PER_BTC, "scriptPubKey": {"address": address}}
+            if self.outpoint_mode == "LABELED" and self.index_start is not None and height > self.index_start:
+                return None
+        
+        return self._fetch_prev_output(input_tx, prev_txs)
+    
+    def _check_outpoint_index(self, sync_state: SyncState, labeled_addresses: BTCAddressIndex):
+        """Set index_start when the LABELED index covers the chain, seeding it from the node's UTXO set if not.
+        
+        The index covers the chain when it was applied up to the checkpoint
+        and seeded for the current labeled set. A fresh or wiped index, one
+        written by another worker's sync and a label change all fail that
+        check; until the seeding succeeds, misses are looked up on the node.
+        """
+        self.index_start = None
+        if not (self.outpoints and self.outpoint_mode == "LABELED" and self.update_outpoints):
+            return
+        checkpoint = sync_state.last_processed_height
+        if checkpoint is None:
+            return
+        
+        digest = labeled_addresses.digest()
+        start, labels = self.outpoints.coverage()
+        if start is not None and labels == digest and self.outpoints.last_height() == checkpoint:
+            self.index_start = start
+            return
+        if settings.BTC_MODE != "CORE_RPC":
+            return
+        
+        logger.info(f"Seeding the outpoint index for {len(labeled_addresses)} labeled addresses at block {checkpoint}")
+        try:
+            scan = self.adapter.scan_utxos([f"raw({script.hex()})" for script in labeled_addresses.scripts()])
+        except Exception as e:
+            logger.warning(f"Failed to seed the outpoint index, resolving inputs on the node: {e}")
+            return
+        if scan["height"] < checkpoint:
+            # Outputs of the blocks in between would be missing
+            logger.warning(f"UTXO scan at block {scan['height']} is behind the checkpoint {checkpoint}, retrying next run")
+            return
+        
+        matcher = labeled_addresses.script_matcher()
+        created = []
+        for utxo in scan.get("unspents", []):
+            address = matcher.get(bytes.fromhex(utxo["scriptPubKey"]))
+            if address:
+                created.append((utxo["txid"], utxo["vout"], address, to_sats(utxo["amount"])))
+        self.outpoints.reset(scan["height"], checkpoint, digest, created)
+        self.index_start = scan["height"]
+        logger.info(f"Outpoint index seeded with {len(created)} unspent outputs at block {scan['height']}")
+    
+    def _rewind_outpoints(self, height: int):
+        """Undo the outpoint index spends of blocks a reorg removed"""
+        self.staged_outpoints.clear()
+        if self.outpoints and self.update_outpoints:
+            unspent = self.outpoints.rewind(height)
+            logger.info(f"Outpoint index rewound to block {height}, {unspent} outputs unspent again")
+    
+    def _staged_output(self, txid: str, vout: int) -> Optional[Tuple[str, int]]:
+        """Output created by a block of the open commit group, not in the outpoint index yet"""
+        for created_outputs, _ in self.staged_outpoints.values():
+            output = created_outputs.get((txid, vout))
+            if output:
+                return output
+        return None
+    
+    def _fetch_prev_output(self, input_tx: Dict[str, Any], prev_txs: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Look up the output an input spends (needs txindex on the node, one call per parent tx)"""
+        prev_txid = input_tx.get("txid")
+        vout_index = input_tx.get("vout")
+        if not prev_txid or vout_index is None:
+            # Coinbase input
+            return None
+        
+        try:
+            prev_tx = prev_txs.get(prev_txid)
+            if prev_tx is None:
+                prev_tx = self.adapter.get_transaction(prev_txid)
+                prev_txs[prev_txid] = prev_tx
+        except Exception as e:
+            logger.debug(f"Could not fetch prev tx {prev_txid}: {e}")
+            return None
+        
+        prev_vout = prev_tx.get("vout", [])
+        return prev_vout[vout_index] if vout_index < len(prev_vout) else None
+    
+    def _get_labeled_addresses(self) -> BTCAddressIndex:
+        """Get the labeled address index for fast lookup"""
+        return get_address_index(self.db, Chain.BTC)
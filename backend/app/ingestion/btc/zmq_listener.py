@@ -0,0 +1,120 @@
+from typing import Any, Callable, Optional
+from app.core.config import settings
+import logging
+import struct
+import time
+
+logger = logging.getLogger(__name__)
+
+# Bitcoin Core publishes [topic, 32-byte block hash, 4-byte little-endian sequence]
+HASHBLOCK_TOPIC = b"hashblock"
+
+# How long a poll waits for a message, bounds how late debounce deadlines fire
+POLL_INTERVAL_MS = 250
+
+
+class BlockNotificationListener:
+    """Trigger a BTC sync when Bitcoin Core announces a new block over ZMQ (-zmqpubhashblock).
+    
+    Notifications are debounced: a sync is dispatched once no new block has
+    arrived for BTC_ZMQ_DEBOUNCE_SECONDS (or BTC_ZMQ_MAX_DELAY_SECONDS after
+    the first one of a burst). While a dispatched sync is still running
+    further blocks only mark the listener dirty, and one more sync follows it.
+    The beat schedule keeps running as a safety net for missed messages.
+    """
+    
+    def __init__(self, dispatch: Callable[[], Any], url: str = None):
+        """dispatch enqueues a sync and returns its AsyncResult (or None)"""
+        self.dispatch = dispatch
+        self.url = url or settings.BTC_ZMQ_URL
+        self.debounce = settings.BTC_ZMQ_DEBOUNCE_SECONDS
+        self.max_delay = settings.BTC_ZMQ_MAX_DELAY_SECONDS
+        self.first_pending: Optional[float] = None
+        self.last_pending: Optional[float] = None
+        self.running = None
+        self.running_since: Optional[float] = None
+        self.not_before = 0.0
+        self.last_sequence: Optional[int] = None
+        self.stats = {"notifications": 0, "dispatched": 0, "missed": 0}
+    
+    def run(self, stop: Callable[[], bool] = lambda: False):
+        """Listen until stop() returns True"""
+        import zmq
+        
+        context = zmq.Context.instance()
+        socket = context.socket(zmq.SUB)
+        socket.setsockopt(zmq.SUBSCRIBE, HASHBLOCK_TOPIC)
+        socket.setsockopt(zmq.RCVHWM, 0)
+        # Silent connections (e.g. node restarted) are detected by heartbeats and reconnected by ZMQ
+        socket.setsockopt(zmq.HEARTBEAT_IVL, 30000)
+        socket.setsockopt(zmq.HEARTBEAT_TIMEOUT, 60000)
+        socket.connect(self.url)
+        logger.info(f"Listening for BTC block notifications on {self.url}")
+        
+        poller = zmq.Poller()
+        poller.register(socket, zmq.POLLIN)
+        try:
+            while not stop():
+                if poller.poll(POLL_INTERVAL_MS):
+                    self.on_message(socket.recv_multipart())
+                self.tick()
+        finally:
+            socket.close(linger=0)
+    
+    def on_message(self, parts: list):
+        """Record a hashblock notification"""
+        if len(parts) < 2 or parts[0] != HASHBLOCK_TOPIC:
+            return
+        block_hash = parts[1].hex()
+        if len(parts) >= 3 and len(parts[2]) == 4:
+            sequence = struct.unpack("<I", parts[2])[0]
+            if self.last_sequence is not None and sequence != (self.last_sequence + 1) & 0xFFFFFFFF:
+                # The sync catches up from its own checkpoint, missed messages only cost latency
+                self.stats["missed"] += 1
+                logger.warning(f"BTC ZMQ notifications missed between sequence {self.last_sequence} and {sequence}")
+            self.last_sequence = sequence
+        
+        self.stats["notifications"] += 1
+        now = time.monotonic()
+        if self.first_pending is None:
+            self.first_pending = now
+        self.last_pending = now
+        logger.debug(f"BTC block notification {block_hash}")
+    
+    def tick(self):
+        """Dispatch a sync when the pending notifications have settled and no triggered sync is running"""
+        if self.running is not None:
+            if not self.running.ready():
+                # A worker lost mid-run never reports back, stop waiting after the catch-up budget
+                if time.monotonic() - self.running_since < settings.SYNC_CATCHUP_TIME_BUDGET_SECONDS * 2:
+                    return
+                logger.warning("Dispatched BTC sync did not finish in time, no longer waiting for it")
+            skipped = self._was_skipped(self.running)
+            self.running = None
+            if skipped:
+                # Another sync held the lock and may have started before the block arrived, retry later
+                now = time.monotonic()
+                self.first_pending = self.first_pending or now
+                self.last_pending = self.last_pending or now
+                self.not_before = now + self.max_delay
+        
+        now = time.monotonic()
+        if self.first_pending is None or now < self.not_before:
+            return
+        if now - self.last_pending < self.debounce and now - self.first_pending < self.max_delay:
+            return
+        
+        self.first_pending = None
+        self.last_pending = None
+        self.running = self.dispatch()
+        self.running_since = now
+        self.stats["dispatched"] += 1
+        logger.info(f"BTC sync dispatched after block notification ({self.stats['notifications']} received)")
+    
+    @staticmethod
+    def _was_skipped(result) -> bool:
+        try:
+            value = result.result
+        except Exception:
+            return False
+        return isinstance(value, dict) and bool(value.get("skipped"))
@@ -0,0 +1,246 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Smoothing factor for the latency and error-rate moving averages
+EWMA_ALPHA = 0.2
+
+# Score multiplier per unit of error rate, an endpoint failing half its calls scores 6x worse
+ERROR_PENALTY = 10
+
+# Threads shared by all routers for hedged and head-refresh requests
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="rpc-hedge")
+
+
+class EndpointStats:
+    """Rolling health of one RPC endpoint"""
+    
+    def __init__(self, url: str, window: int):
+        self.url = url
+        self.latencies = deque(maxlen=window)
+        self.latency_ewma: Optional[float] = None
+        self.error_rate = 0.0
+        self.head: Optional[int] = None
+        self.head_at: Optional[float] = None
+        # Features learned from the node's answers, e.g. a method it does not support
+        self.capabilities: Dict[str, Any] = {}
+        self.lock = threading.Lock()
+    
+    def record_success(self, latency: float):
+        with self.lock:
+            self.latencies.append(latency)
+            self.latency_ewma = latency if self.latency_ewma is None else (
+                EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.latency_ewma
+            )
+            self.error_rate = (1 - EWMA_ALPHA) * self.error_rate
+    
+    def record_error(self):
+        with self.lock:
+            self.error_rate = EWMA_ALPHA + (1 - EWMA_ALPHA) * self.error_rate
+    
+    def record_head(self, head: int):
+        with self.lock:
+            self.head = head
+            self.head_at = time.monotonic()
+    
+    def score(self) -> float:
+        """Lower is better; endpoints without samples score 0 so they get tried"""
+        if self.latency_ewma is None:
+            return 0.0
+        return self.latency_ewma * (1 + ERROR_PENALTY * self.error_rate)
+    
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        with self.lock:
+            if not self.latencies:
+                return None
+            ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return ordered[index]
+
+
+class EndpointRouter:
+    """Route RPC calls across several endpoints of the same chain.
+    
+    Calls go to the best-scored endpoint. When it has not answered within its
+    own latency percentile, a hedged duplicate goes to the next best endpoint
+    and the first successful answer wins. Tip queries skip endpoints whose
+    reported head is more than max_head_lag behind the highest known head.
+    Exceptions listed in passthrough_errors are answers from a healthy node
+    (e.g. JSON-RPC errors) and are raised without failing over. Capabilities
+    are recorded per endpoint, keyed by the URL that answered.
+    """
+    
+    def __init__(
+        self,
+        urls: List[str],
+        passthrough_errors: Tuple[Type[Exception], ...] = (),
+        max_head_lag: int = None,
+        hedge_percentile: float = None,
+        hedge_min_delay: float = None,
+        head_refresh_seconds: float = None,
+        window: int = None
+    ):
+        if not urls:
+            raise ValueError("At least one RPC endpoint is required")
+        window = window or settings.RPC_HEALTH_WINDOW
+        self.endpoints = [EndpointStats(url, window) for url in urls]
+        self.by_url = {endpoint.url: endpoint for endpoint in self.endpoints}
+        self.passthrough_errors = passthrough_errors
+        self.max_head_lag = settings.RPC_MAX_HEAD_LAG if max_head_lag is None else max_head_lag
+        self.hedge_percentile = hedge_percentile or settings.RPC_HEDGE_PERCENTILE
+        self.hedge_min_delay = (settings.RPC_HEDGE_MIN_DELAY_MS / 1000) if hedge_min_delay is None else hedge_min_delay
+        self.head_refresh_seconds = head_refresh_seconds or settings.RPC_HEAD_REFRESH_SECONDS
+    
+    @property
+    def best_url(self) -> str:
+        return self._ranked()[0].url
+    
+    def call(self, fn: Callable[[str], Any], min_head: int = None, requires: str = None) -> Any:
+        """Run fn(url) on the best endpoint, hedging and failing over to the others.
+        
+        min_head prefers endpoints known to have reached that block. Endpoints
+        known to lack the capability requires are skipped, unless all do.
+        """
+        candidates = self._ranked(min_head=min_head)
+        if requires is not None:
+            candidates = [e for e in candidates if e.capabilities.get(requires) is not False] or candidates
+        return self._call_ranked(fn, candidates)
+    
+    def capability(self, url: str, name: str) -> Any:
+        """What was recorded about a capability of one endpoint, None if unknown"""
+        return self.by_url[url].capabilities.get(name)
+    
+    def set_capability(self, url: str, name: str, value: Any):
+        self.by_url[url].capabilities[name] = value
+    
+    def supports(self, name: str) -> bool:
+        """Whether any endpoint is not known to lack a capability"""
+        return any(e.capabilities.get(name) is not False for e in self.endpoints)
+    
+    def call_tip(self, fn: Callable[[str], Any], head_of: Callable[[Any], int]) -> Any:
+        """Run a chain-tip query, recording heads and skipping lagging endpoints"""
+        if len(self.endpoints) > 1 and self._heads_stale():
+            return self._refresh_heads(fn, head_of)
+        
+        candidates = [e for e in self._ranked() if not self._is_lagging(e)]
+        result = self._call_ranked(fn, candidates or self._ranked(), head_of=head_of)
+        return result
+    
+    def health(self) -> List[Dict[str, Any]]:
+        """Current stats per endpoint"""
+        return [
+            {
+                "url": e.url,
+                "score": e.score(),
+                "latency_ms": e.latency_ewma * 1000 if e.latency_ewma is not None else None,
+                "error_rate": e.error_rate,
+                "head": e.head,
+                "lagging": self._is_lagging(e),
+            }
+            for e in self.endpoints
+        ]
+    
+    def _ranked(self, min_head: int = None) -> List[EndpointStats]:
+        ranked = sorted(self.endpoints, key=lambda e: e.score())
+        if min_head is not None:
+            # Endpoints known to be behind min_head go last rather than being dropped
+            ranked.sort(key=lambda e: e.head is not None and e.head < min_head)
+        return ranked
+    
+    def _max_head(self) -> Optional[int]:
+        heads = [e.head for e in self.endpoints if e.head is not None]
+        return max(heads) if heads else None
+    
+    def _is_lagging(self, endpoint: EndpointStats) -> bool:
+        max_head = self._max_head()
+        if endpoint.head is None or max_head is None:
+            return False
+        return max_head - endpoint.head > self.max_head_lag
+    
+    def _heads_stale(self) -> bool:
+        now = time.monotonic()
+        return any(e.head_at is None or now - e.head_at > self.head_refresh_seconds for e in self.endpoints)
+    
+    def _timed(self, endpoint: EndpointStats, fn: Callable[[str], Any], head_of: Callable[[Any], int] = None) -> Any:
+        """Run fn against one endpoint and record the outcome"""
+        started = time.monotonic()
+        try:
+            result = fn(endpoint.url)
+        except self.passthrough_errors:
+            endpoint.record_success(time.monotonic() - started)
+            raise
+        except Exception:
+            endpoint.record_error()
+            raise
+        endpoint.record_success(time.monotonic() - started)
+        if head_of is not None:
+            endpoint.record_head(head_of(result))
+        return result
+    
+    def _call_ranked(self, fn: Callable[[str], Any], candidates: List[EndpointStats], head_of: Callable[[Any], int] = None) -> Any:
+        if len(candidates) == 1:
+            return self._timed(candidates[0], fn, head_of)
+        
+        remaining = list(candidates)
+        pending = {}
+        last_error = None
+        
+        while remaining or pending:
+            if remaining:
+                endpoint = remaining.pop(0)
+                pending[_executor.submit(self._timed, endpoint, fn, head_of)] = endpoint
+                # Hedge after the endpoint's own tail latency, fail over right away on error
+                hedge_delay = endpoint.latency_percentile(self.hedge_percentile)
+                timeout = max(hedge_delay, self.hedge_min_delay) if hedge_delay is not None and remaining else None
+            else:
+                timeout = None
+            
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                endpoint = pending.pop(future)
+                try:
+                    return future.result()
+                except self.passthrough_errors:
+                    raise
+                except Exception as e:
+                    logger.warning(f"RPC endpoint {endpoint.url} failed: {e}")
+                    last_error = e
+        
+        raise last_error
+    
+    def _refresh_heads(self, fn: Callable[[str], Any], head_of: Callable[[Any], int]) -> Any:
+        """Query every endpoint's tip in parallel, return the best non-lagging answer"""
+        futures = {_executor.submit(self._timed, e, fn, head_of): e for e in self.endpoints}
+        results = {}
+        last_error = None
+        for future, endpoint in futures.items():
+            try:
+                results[endpoint.url] = future.result()
+            except Exception as e:
+                last_error = e
+        
+        for endpoint in self._ranked():
+            if endpoint.url in results and not self._is_lagging(endpoint):
+                return results[endpoint.url]
+        raise last_error
+
+
+_routers: Dict[Tuple[str, ...], EndpointRouter] = {}
+_routers_lock = threading.Lock()
+
+
+def get_router(urls: List[str], passthrough_errors: Tuple[Type[Exception], ...] = ()) -> EndpointRouter:
+    """Get the process-wide router for a set of endpoints so health stats survive between runs"""
+    key = tuple(urls)
+    with _routers_lock:
+        router = _routers.get(key)
+        if router is None:
+            router = EndpointRouter(urls, passthrough_errors=passthrough_errors)
+            _routers[key] = router
+        return router
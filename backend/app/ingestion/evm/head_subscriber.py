@@ -0,0 +1,127 @@
+import asyncio
+import json
+import logging
+import random
+from typing import Any, Callable, Dict, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HeadSubscriber:
+    """Follow new EVM blocks with eth_subscribe("newHeads") over WebSocket and run a sync per new head.
+    
+    Heads that arrive while a sync is running are coalesced into one more
+    run, which catches up from the sync checkpoint, so missed or skipped
+    heads (gaps, reconnects) are filled by the sync itself. The connection
+    is re-established with jittered backoff, and also when no head arrives
+    for EVM_WS_HEAD_TIMEOUT_SECONDS.
+    """
+    
+    def __init__(self, on_head: Callable[[int], Any], url: str = None):
+        """on_head runs a sync (in a worker thread) for a head number and returns its result"""
+        self.on_head = on_head
+        self.url = url or settings.EVM_WS_URL
+        self.latest_head: Optional[int] = None
+        self.synced_head: Optional[int] = None  # last_block reported by the latest sync
+        self.head_event: Optional[asyncio.Event] = None
+        self.backoff = 1.0
+        self.stats = {"heads": 0, "gaps": 0, "reconnects": 0, "syncs": 0}
+    
+    async def run(self, stop: asyncio.Event):
+        """Subscribe and sync until stop is set"""
+        self.head_event = asyncio.Event()
+        syncer = asyncio.create_task(self._sync_loop(stop))
+        try:
+            while not stop.is_set():
+                try:
+                    await self._listen(stop)
+                except Exception as e:
+                    logger.warning(f"EVM newHeads subscription lost: {e}")
+                if stop.is_set():
+                    break
+                
+                self.stats["reconnects"] += 1
+                delay = min(self.backoff, settings.EVM_WS_RECONNECT_MAX_SECONDS) * random.uniform(0.5, 1.0)
+                self.backoff *= 2
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            stop.set()
+            self.head_event.set()
+            await syncer
+    
+    async def _listen(self, stop: asyncio.Event):
+        """One connection: subscribe, then record heads until stopped, silent or disconnected"""
+        import websockets
+        
+        async with websockets.connect(self.url, ping_interval=20, max_size=2 ** 22) as ws:
+            await ws.send(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "eth_subscribe", "params": ["newHeads"]}))
+            reply = json.loads(await asyncio.wait_for(ws.recv(), timeout=settings.EVM_WS_HEAD_TIMEOUT_SECONDS))
+            if "error" in reply:
+                raise RuntimeError(f"eth_subscribe failed: {reply['error']}")
+            subscription = reply.get("result")
+            logger.info(f"Subscribed to EVM newHeads on {self.url} ({subscription})")
+            self.backoff = 1.0
+            
+            # Heads may have been missed while disconnected, let the sync catch up right away
+            self.head_event.set()
+            
+            while not stop.is_set():
+                receive = asyncio.ensure_future(ws.recv())
+                stopped = asyncio.ensure_future(stop.wait())
+                done, _ = await asyncio.wait(
+                    {receive, stopped}, timeout=settings.EVM_WS_HEAD_TIMEOUT_SECONDS, return_when=asyncio.FIRST_COMPLETED
+                )
+                stopped.cancel()
+                if receive not in done:
+                    receive.cancel()
+                    if stop.is_set():
+                        return
+                    raise TimeoutError(f"no head for {settings.EVM_WS_HEAD_TIMEOUT_SECONDS}s")
+                
+                message = json.loads(receive.result())
+                params = message.get("params") or {}
+                if message.get("method") == "eth_subscription" and params.get("subscription") == subscription:
+                    self._record_head(params.get("result") or {})
+    
+    def _record_head(self, head: Dict[str, Any]):
+        number = head.get("number")
+        if not number:
+            return
+        number = int(number, 16)
+        self.stats["heads"] += 1
+        if self.latest_head is not None and number > self.latest_head + 1:
+            self.stats["gaps"] += 1
+            logger.info(f"{number - self.latest_head - 1} EVM heads before {number} not announced, the sync will fill them")
+        if self.latest_head is None or number > self.latest_head:
+            self.latest_head = number
+        self.head_event.set()
+    
+    async def _sync_loop(self, stop: asyncio.Event):
+        """Run one sync at a time, coalescing heads that arrive meanwhile"""
+        while True:
+            await self.head_event.wait()
+            if stop.is_set():
+                return
+            self.head_event.clear()
+            
+            head = self.latest_head
+            try:
+                result = await asyncio.to_thread(self.on_head, head)
+            except Exception as e:
+                logger.error(f"EVM sync for head {head} failed: {e}")
+                result = None
+            self.stats["syncs"] += 1
+            
+            if isinstance(result, dict) and result.get("skipped"):
+                # The beat sync holds the lock, try again shortly
+                await asyncio.sleep(settings.EVM_WS_RETRY_SECONDS)
+                self.head_event.set()
+            elif isinstance(result, dict):
+                self.synced_head = result.get("last_block", self.synced_head)
+                if result.get("processed") and (result.get("lag") or 0) > 0:
+                    # One window was not enough (e.g. after a long disconnect), keep going
+                    self.head_event.set()
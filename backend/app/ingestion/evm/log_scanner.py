@@ -0,0 +1,83 @@
+from typing import List, Dict, Any, Iterable
+from app.ingestion.evm.rpc_client import EVMRPCClient, RPCError
+from app.ingestion.evm.parser import TRANSFER_EVENT_SIGNATURE
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Messages providers use when a log query matches too many results or spans too many blocks
+# (geth/Infura, Alchemy, BSC, Ankr, QuickNode), kept specific so e.g. rate limits are not mistaken for them
+TOO_MANY_RESULTS_MARKERS = (
+    "query returned more than",
+    "response size exceeded",
+    "exceed maximum block range",
+    "block range is too wide",
+    "block range too large",
+    "range is too large",
+)
+
+# EIP-1474 "limit exceeded", which Infura also uses for rate limiting
+TOO_MANY_RESULTS_CODE = -32005
+RATE_LIMIT_MARKERS = ("rate limit", "request count", "too many requests")
+
+
+class EVMLogScanner:
+    """Scan ERC20 Transfer logs to or from labeled addresses with eth_getLogs"""
+    
+    def __init__(self, rpc_client: EVMRPCClient, address_chunk_size: int = None):
+        self.rpc_client = rpc_client
+        self.address_chunk_size = max(1, address_chunk_size or settings.EVM_LOGS_ADDRESS_CHUNK_SIZE)
+    
+    def scan_transfers(self, from_block: int, to_block: int, addresses: Iterable[str]) -> List[Dict[str, Any]]:
+        """Get Transfer logs in [from_block, to_block] where either side is one of the addresses"""
+        address_topics = sorted(self._address_topic(addr) for addr in addresses)
+        
+        logs_by_key = {}
+        for i in range(0, len(address_topics), self.address_chunk_size):
+            chunk = address_topics[i:i + self.address_chunk_size]
+            # Topics are ANDed across positions, so the from-side and to-side need separate queries
+            for topics in ([TRANSFER_EVENT_SIGNATURE, chunk], [TRANSFER_EVENT_SIGNATURE, None, chunk]):
+                for log in self._get_logs_adaptive(from_block, to_block, topics):
+                    if log.get("removed"):
+                        continue
+                    key = (log["transactionHash"], log["logIndex"])
+                    logs_by_key[key] = log
+        
+        return sorted(
+            logs_by_key.values(),
+            key=lambda log: (int(log["blockNumber"], 16), int(log["logIndex"], 16))
+        )
+    
+    def _get_logs_adaptive(self, from_block: int, to_block: int, topics: List[Any]) -> List[Dict[str, Any]]:
+        """Query logs, halving the block range while the node reports too many results"""
+        ranges = [(from_block, to_block)]
+        logs = []
+        
+        while ranges:
+            start, end = ranges.pop()
+            try:
+                logs.extend(self.rpc_client.get_logs(start, end, topics))
+            except RPCError as e:
+                if not self._is_too_many_results(e) or start == end:
+                    raise
+                mid = (start + end) // 2
+                logger.debug(f"Splitting eth_getLogs range {start}-{end} at {mid}: {e.message}")
+                # Pop order keeps the lower half first
+                ranges.append((mid + 1, end))
+                ranges.append((start, mid))
+        
+        return logs
+    
+    @staticmethod
+    def _is_too_many_results(error: RPCError) -> bool:
+        """Check whether an RPC error asks for a smaller query (other errors are raised, not split)"""
+        message = error.message.lower()
+        if any(marker in message for marker in TOO_MANY_RESULTS_MARKERS):
+            return True
+        return error.code == TOO_MANY_RESULTS_CODE and not any(marker in message for marker in RATE_LIMIT_MARKERS)
+    
+    @staticmethod
+    def _address_topic(address: str) -> str:
+        """Encode an address as a 32-byte indexed topic"""
+        return "0x" + "0" * 24 + address.lower()[-40:]
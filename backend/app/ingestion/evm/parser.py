@@ -1,7 +1,9 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Container
 from decimal import Decimal
 from datetime import datetime
 from web3 import Web3
+from app.ingestion.address_index import EVMAddressIndex
+from app.ingestion.evm.tokens import TokenMetadataCache, placeholder_symbol, DEFAULT_DECIMALS
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,12 +11,15 @@ logger = logging.getLogger(__name__)
 # ERC20 Transfer event signature
 TRANSFER_EVENT_SIGNATURE = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
 
+# ERC20 transfer(address,uint256) and transferFrom(address,address,uint256) call selectors
+TRANSFER_SELECTOR = "0xa9059cbb"
+TRANSFER_FROM_SELECTOR = "0x23b872dd"
 
 class EVMParser:
     """Parse EVM blocks and extract transfers"""
     
     @staticmethod
-    def parse_block(block: Dict[str, Any], labeled_addresses: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def parse_block(block: Dict[str, Any], labeled_addresses: EVMAddressIndex) -> List[Dict[str, Any]]:
         """Parse a block and extract transfers involving labeled addresses"""
         transfers = []
         
@@ -63,66 +68,192 @@ class EVMParser:
         return transfers
     
     @staticmethod
-    def parse_receipt_logs(receipt: Dict[str, Any], block: Dict[str, Any], labeled_addresses: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def parse_receipt_logs(
+        receipt: Dict[str, Any],
+        block: Dict[str, Any],
+        labeled_addresses: EVMAddressIndex,
+        token_cache: Optional[TokenMetadataCache] = None
+    ) -> List[Dict[str, Any]]:
         """Parse transaction receipt logs for ERC20 Transfer events"""
         transfers = []
         
         if not receipt or "logs" not in receipt:
             return transfers
         
+        labeled_topics = labeled_addresses.topic_matcher()
+        tx_hash = receipt["transactionHash"]
+        timestamp = None
+        block_number = None
+        
+        for position, log in enumerate(receipt["logs"]):
+            if not EVMParser._matches_labeled_transfer(log, labeled_topics):
+                continue
+            
+            if timestamp is None:
+                timestamp = datetime.fromtimestamp(int(block["timestamp"], 16))
+                block_number = int(block["number"], 16)
+            
+            # Prefer the block-level log index so receipt and log-scan ingestion agree
+            log_index = int(log["logIndex"], 16) if log.get("logIndex") else position
+            transfer = EVMParser._decode_transfer_log(
+                log, tx_hash, log_index, timestamp, block_number, labeled_addresses, token_cache
+            )
+            if transfer:
+                transfers.append(transfer)
+        
+        return transfers
+    
+    @staticmethod
+    def parse_logs(
+        logs: List[Dict[str, Any]],
+        block: Dict[str, Any],
+        labeled_addresses: EVMAddressIndex,
+        token_cache: Optional[TokenMetadataCache] = None
+    ) -> List[Dict[str, Any]]:
+        """Parse eth_getLogs results belonging to one block for ERC20 Transfer events"""
+        transfers = []
+        
+        labeled_topics = labeled_addresses.topic_matcher()
         timestamp = datetime.fromtimestamp(int(block["timestamp"], 16))
         block_number = int(block["number"], 16)
-        tx_hash = receipt["transactionHash"]
         
-        for log_index, log in enumerate(receipt["logs"]):
-            # Check if this is a Transfer event
-            if log.get("topics") and len(log["topics"]) >= 3:
-                if log["topics"][0].lower() == TRANSFER_EVENT_SIGNATURE.lower():
-                    # Decode Transfer event: Transfer(address indexed from, address indexed to, uint256 value)
-                    from_addr = "0x" + log["topics"][1][-40:].lower()
-                    to_addr = "0x" + log["topics"][2][-40:].lower()
-                    amount_hex = log.get("data", "0x0")
-                    amount = Decimal(int(amount_hex, 16))
-                    
-                    # Get token address
-                    token_address = log["address"].lower()
-                    
-                    # Get token decimals (simplified - in production, cache this)
-                    # For MVP, assume 18 decimals for most tokens
-                    decimals = 18
-                    amount_decimal = amount / Decimal(10**decimals)
-                    
-                    # Check if transfer involves labeled address
-                    from_exchange = labeled_addresses.get(from_addr)
-                    to_exchange = labeled_addresses.get(to_addr)
-                    
-                    if from_exchange or to_exchange:
-                        # Get token symbol (simplified - in production, cache this)
-                        # For MVP, use contract address as identifier
-                        asset_symbol = f"ERC20_{token_address[:8]}"
-                        
-                        direction = EVMParser._determine_direction(
-                            from_exchange, to_exchange, from_addr, to_addr
-                        )
-                        
-                        transfers.append({
-                            "timestamp": timestamp,
-                            "chain": "EVM",
-                            "tx_hash": tx_hash,
-                            "block_number": block_number,
-                            "log_index": log_index,
-                            "from_address": from_addr,
-                            "to_address": to_addr,
-                            "asset_symbol": asset_symbol,
-                            "asset_address": token_address,
-                            "amount": amount_decimal,
-                            "direction": direction,
-                            "exchange_from_id": from_exchange["exchange_id"] if from_exchange else None,
-                            "exchange_to_id": to_exchange["exchange_id"] if to_exchange else None,
-                        })
+        for log in logs:
+            if not EVMParser._matches_labeled_transfer(log, labeled_topics):
+                continue
+            
+            transfer = EVMParser._decode_transfer_log(
+                log, log["transactionHash"], int(log["logIndex"], 16), timestamp, block_number,
+                labeled_addresses, token_cache
+            )
+            if transfer:
+                transfers.append(transfer)
         
         return transfers
     
+    @staticmethod
+    def parse_pending_transaction(
+        tx: Dict[str, Any],
+        labeled_addresses: EVMAddressIndex,
+        token_cache: Optional[TokenMetadataCache] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Transfer a pending transaction would make to or from a labeled address, None if it touches none.
+        
+        Covers native value and direct ERC20 transfer/transferFrom calls; token
+        movements inside other contracts only show up once their logs exist.
+        """
+        to_addr = tx.get("to")
+        if not to_addr:
+            return None
+        from_addr = tx["from"].lower()
+        to_addr = to_addr.lower()
+        data = tx.get("input") or tx.get("data") or "0x"
+        
+        asset_address = None
+        if data.startswith(TRANSFER_SELECTOR) and len(data) >= 138:
+            asset_address = to_addr
+            to_addr = "0x" + data[34:74]
+            raw_amount = int(data[74:138], 16)
+        elif data.startswith(TRANSFER_FROM_SELECTOR) and len(data) >= 202:
+            asset_address = to_addr
+            from_addr = "0x" + data[34:74]
+            to_addr = "0x" + data[98:138]
+            raw_amount = int(data[138:202], 16)
+        else:
+            raw_amount = int(tx.get("value") or "0x0", 16)
+            if raw_amount == 0:
+                return None
+        
+        from_exchange = labeled_addresses.get(from_addr)
+        to_exchange = labeled_addresses.get(to_addr)
+        if not (from_exchange or to_exchange):
+            return None
+        
+        if asset_address is None:
+            asset_symbol, decimals = "ETH", 18
+        else:
+            metadata = token_cache.lookup(asset_address) if token_cache else None
+            asset_symbol, decimals = metadata or (placeholder_symbol(asset_address), DEFAULT_DECIMALS)
+        
+        return {
+            "chain": "EVM",
+            "tx_hash": tx["hash"],
+            "from_address": from_addr,
+            "to_address": to_addr,
+            "asset_symbol": asset_symbol,
+            "asset_address": asset_address,
+            "amount": Decimal(raw_amount) / Decimal(10**decimals),
+            "direction": EVMParser._determine_direction(from_exchange, to_exchange, from_addr, to_addr),
+            "exchange_from_id": from_exchange["exchange_id"] if from_exchange else None,
+            "exchange_to_id": to_exchange["exchange_id"] if to_exchange else None,
+        }
+    
+    @staticmethod
+    def _matches_labeled_transfer(log: Dict[str, Any], labeled_topics: Container[str]) -> bool:
+        """Cheap pre-check on the raw topics, no string building or decoding.
+        
+        Nodes return topics as lowercase hex, so they are compared as-is.
+        """
+        topics = log.get("topics")
+        if not topics or len(topics) < 3 or topics[0] != TRANSFER_EVENT_SIGNATURE:
+            return False
+        return topics[1] in labeled_topics or topics[2] in labeled_topics
+    
+    @staticmethod
+    def _decode_transfer_log(
+        log: Dict[str, Any],
+        tx_hash: str,
+        log_index: int,
+        timestamp: datetime,
+        block_number: int,
+        labeled_addresses: EVMAddressIndex,
+        token_cache: Optional[TokenMetadataCache] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Decode a Transfer log that passed _matches_labeled_transfer.
+        
+        Token metadata comes from token_cache; unknown tokens are queued there
+        and recorded with placeholder metadata until they are resolved.
+        """
+        # Decode Transfer event: Transfer(address indexed from, address indexed to, uint256 value)
+        from_addr = "0x" + log["topics"][1][-40:]
+        to_addr = "0x" + log["topics"][2][-40:]
+        
+        from_exchange = labeled_addresses.get(from_addr)
+        to_exchange = labeled_addresses.get(to_addr)
+        
+        if not (from_exchange or to_exchange):
+            return None
+        
+        amount = Decimal(int(log.get("data") or "0x0", 16))
+        
+        # Get token metadata, never blocks on the network
+        token_address = log["address"].lower()
+        metadata = token_cache.lookup(token_address) if token_cache else None
+        if metadata:
+            asset_symbol, decimals = metadata
+        else:
+            asset_symbol, decimals = placeholder_symbol(token_address), DEFAULT_DECIMALS
+        amount_decimal = amount / Decimal(10**decimals)
+        
+        direction = EVMParser._determine_direction(
+            from_exchange, to_exchange, from_addr, to_addr
+        )
+        
+        return {
+            "timestamp": timestamp,
+            "chain": "EVM",
+            "tx_hash": tx_hash,
+            "block_number": block_number,
+            "log_index": log_index,
+            "from_address": from_addr,
+            "to_address": to_addr,
+            "asset_symbol": asset_symbol,
+            "asset_address": token_address,
+            "amount": amount_decimal,
+            "direction": direction,
+            "exchange_from_id": from_exchange["exchange_id"] if from_exchange else None,
+            "exchange_to_id": to_exchange["exchange_id"] if to_exchange else None,
+        }
+    
     @staticmethod
     def _determine_direction(
         from_exchange: Optional[Dict],
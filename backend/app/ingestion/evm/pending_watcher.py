@@ -0,0 +1,201 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Optional
+from app.core.config import settings
+from app.db.models import Chain, TokenMetadata, TokenMetadataStatus
+from app.ingestion.address_index import EVMAddressIndex, get_address_index
+from app.ingestion.evm.parser import EVMParser
+from app.ingestion.evm.rpc_client import EVMRPCClient
+from app.ingestion.evm.tokens import get_token_cache
+from app.ingestion.transport import RPCError
+from app.services.pending_flows import PendingFlowStore, get_pending_store
+
+logger = logging.getLogger(__name__)
+
+# Seconds between throughput log lines
+STATS_INTERVAL = 60
+
+
+class PendingTransactionWatcher:
+    """Match pending EVM transactions against labeled addresses and record them as pending flows.
+    
+    Subscribes to newPendingTransactions with full transaction objects
+    (geth 1.11+, Erigon, Reth). Nodes that only send hashes get them looked
+    up in eth_getTransactionByHash batches; when lookups fall behind, the
+    oldest hashes are dropped (PENDING_MAX_BACKLOG) instead of lagging.
+    """
+    
+    def __init__(self, store: PendingFlowStore = None, url: str = None, rpc_client: EVMRPCClient = None):
+        self.url = url or settings.EVM_PENDING_WS_URL or settings.EVM_WS_URL
+        self.store = store or get_pending_store()
+        self.rpc_client = rpc_client
+        self.token_cache = None
+        self.labeled: Optional[EVMAddressIndex] = None
+        self.backlog: deque = deque()
+        self.backlog_event: Optional[asyncio.Event] = None
+        self.backoff = 1.0
+        self.stats = {"seen": 0, "matched": 0, "fetched": 0, "dropped": 0}
+    
+    async def run(self, stop: asyncio.Event):
+        """Watch until stop is set"""
+        self.backlog_event = asyncio.Event()
+        await self._refresh_labeled()
+        helpers = [asyncio.create_task(self._refresh_loop(stop)), asyncio.create_task(self._stats_loop(stop))]
+        helpers += [
+            asyncio.create_task(self._fetch_loop(stop)) for _ in range(settings.EVM_PENDING_FETCH_CONCURRENCY)
+        ]
+        try:
+            while not stop.is_set():
+                try:
+                    await self._listen(stop)
+                except Exception as e:
+                    logger.warning(f"EVM pending transaction subscription lost: {e}")
+                if stop.is_set():
+                    break
+                delay = min(self.backoff, settings.EVM_WS_RECONNECT_MAX_SECONDS) * random.uniform(0.5, 1.0)
+                self.backoff *= 2
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            stop.set()
+            self.backlog_event.set()
+            await asyncio.gather(*helpers, return_exceptions=True)
+    
+    async def _listen(self, stop: asyncio.Event):
+        """One connection: subscribe (full objects if the node allows) and match until stopped or disconnected"""
+        import websockets
+        
+        async with websockets.connect(self.url, ping_interval=20, max_size=2 ** 24) as ws:
+            subscription = await self._subscribe(ws, ["newPendingTransactions", True])
+            if subscription is None:
+                subscription = await self._subscribe(ws, ["newPendingTransactions"])
+                if subscription is None:
+                    raise RuntimeError("node does not support newPendingTransactions")
+                logger.info(f"Node sends pending transaction hashes only, looking them up ({self.url})")
+            logger.info(f"Subscribed to EVM pending transactions on {self.url}")
+            self.backoff = 1.0
+            
+            # Closing the socket on stop ends the receive loop, which stays a plain async for at high rates
+            closer = asyncio.create_task(self._close_on_stop(ws, stop))
+            try:
+                async for raw in ws:
+                    message = json.loads(raw)
+                    params = message.get("params")
+                    if params and params.get("subscription") == subscription:
+                        self.handle(params.get("result"))
+            finally:
+                closer.cancel()
+    
+    @staticmethod
+    async def _close_on_stop(ws, stop: asyncio.Event):
+        await stop.wait()
+        await ws.close()
+    
+    @staticmethod
+    async def _subscribe(ws, params: list) -> Optional[str]:
+        """Subscription id, None if the node rejected the parameters"""
+        await ws.send(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "eth_subscribe", "params": params}))
+        while True:
+            reply = json.loads(await asyncio.wait_for(ws.recv(), timeout=30))
+            if reply.get("id") == 1:
+                return None if "error" in reply else reply.get("result")
+    
+    def handle(self, tx: Any):
+        """Match one notification (transaction object), or queue it for lookup (hash)"""
+        if isinstance(tx, str):
+            self.backlog.append(tx)
+            if len(self.backlog) > settings.PENDING_MAX_BACKLOG:
+                self.backlog.popleft()
+                self.stats["dropped"] += 1
+            self.backlog_event.set()
+            return
+        if not isinstance(tx, dict) or self.labeled is None:
+            return
+        
+        self.stats["seen"] += 1
+        flow = EVMParser.parse_pending_transaction(tx, self.labeled, self.token_cache)
+        if flow:
+            self.stats["matched"] += 1
+            try:
+                self.store.add(Chain.EVM.value, flow)
+            except Exception as e:
+                logger.warning(f"Failed to store pending flow {flow['tx_hash']}: {e}")
+    
+    async def _fetch_loop(self, stop: asyncio.Event):
+        """Look up queued hashes in batches"""
+        while not stop.is_set():
+            if not self.backlog:
+                self.backlog_event.clear()
+                await self.backlog_event.wait()
+                continue
+            
+            batch = [self.backlog.popleft() for _ in range(min(settings.EVM_RPC_BATCH_SIZE, len(self.backlog)))]
+            if self.rpc_client is None:
+                self.rpc_client = EVMRPCClient()
+            try:
+                results = await asyncio.to_thread(
+                    self.rpc_client.batch_call, [("eth_getTransactionByHash", [tx_hash]) for tx_hash in batch]
+                )
+            except Exception as e:
+                logger.warning(f"Pending transaction lookup failed for {len(batch)} hashes: {e}")
+                continue
+            for tx in results:
+                # Already mined or dropped transactions come back as null
+                if tx and not isinstance(tx, RPCError):
+                    self.stats["fetched"] += 1
+                    self.handle(tx)
+    
+    async def _refresh_labeled(self):
+        """Pick up labeled address changes (the index is only rebuilt when they changed) and tokens resolved by the sync"""
+        def load():
+            from app.db.session import SessionLocal
+            db = SessionLocal()
+            try:
+                token_cache = get_token_cache(db)
+                # Misses are only looked up in the database here, the sync resolves them over RPC once mined
+                missing = token_cache.take_pending(settings.TOKEN_RESOLVE_BATCH_SIZE)
+                if missing:
+                    for address, symbol, decimals in db.query(
+                        TokenMetadata.address, TokenMetadata.symbol, TokenMetadata.decimals
+                    ).filter(
+                        TokenMetadata.address.in_(missing),
+                        TokenMetadata.status != TokenMetadataStatus.PENDING
+                    ):
+                        token_cache.put(address, symbol, decimals)
+                return get_address_index(db, Chain.EVM), token_cache
+            finally:
+                db.close()
+        
+        try:
+            self.labeled, self.token_cache = await asyncio.to_thread(load)
+        except Exception as e:
+            logger.error(f"Failed to load EVM labeled addresses: {e}")
+    
+    async def _refresh_loop(self, stop: asyncio.Event):
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.ADDRESS_INDEX_REFRESH_SECONDS)
+            except asyncio.TimeoutError:
+                await self._refresh_labeled()
+    
+    async def _stats_loop(self, stop: asyncio.Event):
+        last = dict(self.stats)
+        last_at = time.monotonic()
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=STATS_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            now = time.monotonic()
+            rate = (self.stats["seen"] - last["seen"]) / (now - last_at)
+            logger.info(
+                f"EVM pending: {rate:.0f} tx/s, {self.stats['matched'] - last['matched']} matched, "
+                f"{self.stats['dropped'] - last['dropped']} dropped, backlog {len(self.backlog)}"
+            )
+            last, last_at = dict(self.stats), now
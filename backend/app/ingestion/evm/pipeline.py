@@ -0,0 +1,117 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List
+from app.core.config import settings
+from app.db.models import SyncState
+from app.ingestion.address_index import EVMAddressIndex
+from app.ingestion.evm import sync as evm_sync
+from app.ingestion.reorg import ReorgDetected
+from app.ingestion.group_commit import GroupCommitFailed
+
+logger = logging.getLogger(__name__)
+
+
+class EVMPipeline:
+    """Pipelined block ingestion for EVMSync.
+    
+    Up to EVM_PIPELINE_CONCURRENCY blocks are fetched at once, at most
+    EVM_PIPELINE_PREFETCH blocks ahead of the writer. Fetches run the sync's
+    own EVMSync._fetch_block in a thread pool, so they share its receipts
+    strategy, the pooled transport (retries) and the endpoint router
+    (failover, hedging). A single writer
+    saves blocks strictly in order (committed in groups by EVMSync.commits),
+    so last_processed_block only ever advances over blocks whose transfers
+    are committed.
+    """
+    
+    def __init__(self, sync: "evm_sync.EVMSync", concurrency: int = None, prefetch: int = None):
+        self.sync = sync
+        self.concurrency = max(1, concurrency or settings.EVM_PIPELINE_CONCURRENCY)
+        self.prefetch = max(self.concurrency, prefetch or settings.EVM_PIPELINE_PREFETCH)
+    
+    def run(
+        self,
+        start_block: int,
+        end_block: int,
+        sync_state: SyncState,
+        labeled_addresses: EVMAddressIndex,
+        logs_by_block: Optional[Dict[int, List[Dict[str, Any]]]] = None
+    ) -> None:
+        """Process [start_block, end_block], progress is counted by the sync's commit group.
+        
+        Raises GroupCommitFailed when a group of saved blocks could not be committed.
+        """
+        return asyncio.run(self._run(start_block, end_block, sync_state, labeled_addresses, logs_by_block))
+    
+    async def _run(
+        self,
+        start_block: int,
+        end_block: int,
+        sync_state: SyncState,
+        labeled_addresses: EVMAddressIndex,
+        logs_by_block: Optional[Dict[int, List[Dict[str, Any]]]]
+    ) -> None:
+        fetcher = ThreadPoolExecutor(max_workers=self.concurrency)
+        # The session is only ever touched by this one writer thread, one block at a time
+        writer = ThreadPoolExecutor(max_workers=1)
+        loop = asyncio.get_running_loop()
+        
+        in_flight: Dict[int, asyncio.Task] = {}
+        next_block = start_block
+        
+        try:
+            for block_num in range(start_block, end_block + 1):
+                # Keep the prefetch window full
+                while next_block <= end_block and next_block < block_num + self.prefetch:
+                    block_logs = logs_by_block.get(next_block, []) if logs_by_block is not None else None
+                    in_flight[next_block] = asyncio.create_task(
+                        self._fetch_and_parse(fetcher, next_block, labeled_addresses, block_logs)
+                    )
+                    next_block += 1
+                
+                try:
+                    transfers = await in_flight.pop(block_num)
+                    if transfers is None:
+                        # Block not available yet, later blocks must wait for the next run
+                        break
+                    
+                    await loop.run_in_executor(
+                        writer, self.sync._save_block, sync_state, block_num, transfers
+                    )
+                
+                except ReorgDetected as e:
+                    logger.warning(f"EVM reorg detected: {e}")
+                    break
+                except GroupCommitFailed:
+                    raise
+                except Exception as e:
+                    # The blocks saved before this one are committed by the sync
+                    logger.error(f"Failed to process block {block_num}: {e}")
+                    break
+        finally:
+            for task in in_flight.values():
+                task.cancel()
+            await asyncio.gather(*in_flight.values(), return_exceptions=True)
+            # Queued fetches are dropped, the ones already running finish
+            fetcher.shutdown(wait=True, cancel_futures=True)
+            writer.shutdown(wait=True)
+    
+    async def _fetch_and_parse(
+        self,
+        fetcher: ThreadPoolExecutor,
+        block_num: int,
+        labeled_addresses: EVMAddressIndex,
+        block_logs: Optional[List[Dict[str, Any]]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Fetch a block and its receipts and parse transfers (None if block not available)"""
+        loop = asyncio.get_running_loop()
+        fetched = await loop.run_in_executor(
+            fetcher, self.sync._fetch_block, block_num, block_logs is None
+        )
+        if fetched is None:
+            return None
+        
+        # Parsing runs on the event loop, the fetch thread is free for the next block
+        block, receipts = fetched
+        return self.sync._parse_block(block, receipts, labeled_addresses, block_logs)
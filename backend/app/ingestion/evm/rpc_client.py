@@ -1,7 +1,8 @@
-import requests
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from app.core.config import settings
+from app.ingestion.transport import HTTPTransport, RPCError, get_transport
+from app.ingestion.endpoints import get_router
 
 logger = logging.getLogger(__name__)
 
@@ -9,10 +10,18 @@ logger = logging.getLogger(__name__)
 class EVMRPCClient:
     """EVM JSON-RPC client"""
     
-    def __init__(self, rpc_url: str = None):
-        self.rpc_url = rpc_url or settings.EVM_RPC_URL
+    def __init__(self, rpc_url: str = None, transport: HTTPTransport = None):
+        urls = [rpc_url] if rpc_url else settings.evm_rpc_urls_list
+        self.router = get_router(urls, passthrough_errors=(RPCError,))
+        self.transport = transport or get_transport()
     
-    def _call(self, method: str, params: List[Any]) -> Dict[str, Any]:
+    def _post(self, url: str, payload: Any) -> Any:
+        """POST a JSON-RPC payload to one endpoint"""
+        response = self.transport.post(url, json=payload)
+        response.raise_for_status()
+        return response.json()
+    
+    def _call(self, method: str, params: List[Any], min_head: int = None, requires: str = None) -> Dict[str, Any]:
         """Make JSON-RPC call"""
         payload = {
             "jsonrpc": "2.0",
@@ -21,19 +30,59 @@ class EVMRPCClient:
             "id": 1
         }
         
-        try:
-            response = requests.post(self.rpc_url, json=payload, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            
+        def send(url: str) -> Any:
+            data = self._post(url, payload)
             if "error" in data:
-                raise Exception(f"RPC Error: {data['error']}")
-            
+                raise RPCError(data["error"], url)
             return data.get("result")
+        
+        try:
+            if method == "eth_blockNumber":
+                return self.router.call_tip(send, head_of=lambda result: int(result, 16))
+            return self.router.call(send, min_head=min_head, requires=requires)
         except Exception as e:
             logger.error(f"RPC call failed: {method} - {e}")
             raise
     
+    def batch_call(self, calls: List[Tuple[str, List[Any]]]) -> List[Any]:
+        """Make a JSON-RPC batch call.
+        
+        Returns one entry per call, in the order given. Entries for calls the
+        node rejected are RPCError instances instead of results, so a single
+        failing item does not discard the rest of the batch.
+        """
+        if not calls:
+            return []
+        
+        payload = [
+            {"jsonrpc": "2.0", "method": method, "params": params, "id": i}
+            for i, (method, params) in enumerate(calls)
+        ]
+        
+        try:
+            data = self.router.call(lambda url: self._post(url, payload))
+        except Exception as e:
+            logger.error(f"RPC batch call failed: {len(calls)} calls - {e}")
+            raise
+        
+        # Some providers answer a whole batch with a single error object
+        if isinstance(data, dict):
+            raise RPCError(data.get("error", data))
+        
+        # Responses may come back in any order, match them by id
+        by_id = {item.get("id"): item for item in data if isinstance(item, dict)}
+        results = []
+        for i, (method, _) in enumerate(calls):
+            item = by_id.get(i)
+            if item is None:
+                results.append(RPCError({"code": None, "message": f"missing response for {method}"}))
+            elif item.get("error"):
+                results.append(RPCError(item["error"]))
+            else:
+                results.append(item.get("result"))
+        
+        return results
+    
     def get_latest_block_number(self) -> int:
         """Get latest block number"""
         result = self._call("eth_blockNumber", [])
@@ -42,10 +91,36 @@ class EVMRPCClient:
     def get_block(self, block_number: int, full_transactions: bool = True) -> Dict[str, Any]:
         """Get block by number"""
         hex_block = hex(block_number)
-        result = self._call("eth_getBlockByNumber", [hex_block, full_transactions])
+        result = self._call("eth_getBlockByNumber", [hex_block, full_transactions], min_head=block_number)
         return result
     
     def get_transaction_receipt(self, tx_hash: str) -> Dict[str, Any]:
         """Get transaction receipt"""
         result = self._call("eth_getTransactionReceipt", [tx_hash])
         return result
+    
+    def get_block_receipts(self, block_number: int) -> List[Dict[str, Any]]:
+        """Get all receipts of a block in one call (eth_getBlockReceipts), skipping endpoints known to lack it"""
+        result = self._call("eth_getBlockReceipts", [hex(block_number)], min_head=block_number, requires="eth_getBlockReceipts")
+        return result
+    
+    def get_logs(self, from_block: int, to_block: int, topics: List[Any], address: Optional[Any] = None) -> List[Dict[str, Any]]:
+        """Get logs matching a filter over a block range (eth_getLogs)"""
+        log_filter = {
+            "fromBlock": hex(from_block),
+            "toBlock": hex(to_block),
+            "topics": topics,
+        }
+        if address:
+            log_filter["address"] = address
+        result = self._call("eth_getLogs", [log_filter], min_head=to_block)
+        return result or []
+    
+    def get_transaction_receipts(self, tx_hashes: List[str]) -> List[Any]:
+        """Get transaction receipts in chunked batch calls (RPCError entries for failures)"""
+        batch_size = max(1, settings.EVM_RPC_BATCH_SIZE)
+        results = []
+        for i in range(0, len(tx_hashes), batch_size):
+            chunk = tx_hashes[i:i + batch_size]
+            results.extend(self.batch_call([("eth_getTransactionReceipt", [h]) for h in chunk]))
+        return results
@@ -1,16 +1,33 @@
 from sqlalchemy.orm import Session
-from typing import Dict, Any
-from app.ingestion.evm.rpc_client import EVMRPCClient
+from typing import Dict, Any, List, Optional, Tuple
+from app.ingestion.evm.rpc_client import EVMRPCClient, RPCError
 from app.ingestion.evm.parser import EVMParser
-from app.db.models import LabeledAddress, SyncState, RawTransfer, Chain
+from app.ingestion.evm.log_scanner import EVMLogScanner
+from app.ingestion.evm.tokens import TokenMetadataResolver, get_token_cache, record_pending_tokens
+from app.ingestion.address_index import EVMAddressIndex, get_address_index
+from app.ingestion.window import get_window
+from app.ingestion.reorg import ReorgGuard, ReorgDetected
+from app.ingestion.group_commit import GroupCommit, GroupCommitFailed
+from app.services.transfer_writer import RawTransferWriter
+from app.services.metrics import MetricsService
+from app.db.models import SyncState, Chain
+from app.core.config import settings
 from datetime import datetime
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
-# Safe batch size
+# Safe batch size, the adaptive window never goes below it
 BATCH_SIZE = 10
 
+RECEIPTS_MODES = ("AUTO", "BLOCK", "BATCH", "PER_TX")
+
+ERC20_MODES = ("RECEIPTS", "LOGS")
+
+# JSON-RPC "method not found" / "method not supported" error codes
+UNSUPPORTED_METHOD_CODES = (-32601, -32004)
+
 
 class EVMSync:
     """EVM chain sync service"""
@@ -19,9 +36,29 @@ class EVMSync:
         self.db = db
         self.rpc_client = EVMRPCClient()
         self.parser = EVMParser()
+        self.receipts_mode = settings.EVM_RECEIPTS_MODE.upper()
+        if self.receipts_mode not in RECEIPTS_MODES:
+            raise ValueError(f"Invalid EVM_RECEIPTS_MODE: {settings.EVM_RECEIPTS_MODE}")
+        self.erc20_mode = settings.EVM_ERC20_MODE.upper()
+        if self.erc20_mode not in ERC20_MODES:
+            raise ValueError(f"Invalid EVM_ERC20_MODE: {settings.EVM_ERC20_MODE}")
+        self.log_scanner = EVMLogScanner(self.rpc_client)
+        self.token_cache = get_token_cache(db)
+        self.window = get_window(
+            Chain.EVM.value, BATCH_SIZE, settings.EVM_SYNC_WINDOW_MAX, settings.EVM_SYNC_TARGET_BLOCK_MS
+        )
+        self.reorg_guard = ReorgGuard(db, Chain.EVM, self._canonical_hash, settings.EVM_REORG_MAX_DEPTH)
+        # (hash, parent hash) of fetched blocks until they are saved
+        self.headers: Dict[int, Tuple[str, Optional[str]]] = {}
+        self.commits = GroupCommit(db, Chain.EVM)
     
-    def sync(self) -> Dict[str, Any]:
-        """Sync EVM chain - process new blocks"""
+    def sync(self, catch_up: bool = False) -> Dict[str, Any]:
+        """Sync EVM chain - process new blocks.
+        
+        A normal run processes one batch window. In catch-up mode batches are
+        repeated until the sync is within EVM_CATCHUP_TARGET_LAG blocks of the
+        tip or SYNC_CATCHUP_TIME_BUDGET_SECONDS have passed.
+        """
         # Get sync state
         sync_state = self.db.query(SyncState).filter(SyncState.chain == Chain.EVM).first()
         if not sync_state:
@@ -35,82 +72,296 @@ class EVMSync:
             logger.info("No labeled addresses found for EVM")
             return {"processed": 0, "transfers": 0, "last_block": sync_state.last_processed_block}
         
+        started = time.monotonic()
+        processed_count = 0
+        transfer_count = 0
+        
+        while True:
+            result = self._sync_batch(sync_state, labeled_addresses)
+            # Failed batches still report the blocks committed before the failure
+            processed_count += result.get("processed", 0)
+            transfer_count += result.get("transfers", 0)
+            if "error" in result:
+                if processed_count == 0:
+                    return result
+                break
+            
+            if not catch_up or result["processed"] == 0:
+                break
+            if result["lag"] <= settings.EVM_CATCHUP_TARGET_LAG:
+                break
+            if time.monotonic() - started >= settings.SYNC_CATCHUP_TIME_BUDGET_SECONDS:
+                logger.info(f"EVM catch-up time budget reached, lag {result['lag']} blocks")
+                break
+        
+        # Resolve tokens first seen in this run, after their blocks are committed
+        self.resolve_tokens()
+        self._refresh_metrics()
+        
+        return {
+            "processed": processed_count,
+            "transfers": transfer_count,
+            "last_block": sync_state.last_processed_block,
+            "lag": result.get("lag"),
+            "window": self.window.size,
+        }
+    
+    def resolve_tokens(self) -> Dict[str, Any]:
+        """Resolve metadata of newly seen tokens (failures are retried next run)"""
+        try:
+            return TokenMetadataResolver(self.db, self.rpc_client, self.token_cache).resolve_pending()
+        except Exception as e:
+            logger.warning(f"Token metadata resolution failed: {e}")
+            self.db.rollback()
+            return {"error": str(e)}
+    
+    def _refresh_metrics(self):
+        """Recompute metric buckets this sync wrote that the periodic aggregation no longer covers (catch-up after an outage)"""
+        if self.commits.first_timestamp is None:
+            return
+        try:
+            MetricsService(self.db).refresh_stale(self.commits.first_timestamp, self.commits.last_timestamp)
+        except Exception as e:
+            logger.error(f"Failed to refresh metrics from {self.commits.first_timestamp}: {e}")
+            self.db.rollback()
+    
+    def _sync_batch(self, sync_state: SyncState, labeled_addresses: EVMAddressIndex) -> Dict[str, Any]:
+        """Process one batch window of blocks and adapt the window to lag and latency"""
         # Get latest block
         try:
-            latest_block = self.rpc_client.get_latest_block_number()
+            latest_block = self.rpc_client.get_latest_block_number() - settings.EVM_CONFIRMATIONS
         except Exception as e:
             logger.error(f"Failed to get latest block: {e}")
             return {"error": str(e)}
         
+        # Undo blocks the chain has replaced since the last run before building on them
+        try:
+            self.reorg_guard.verify(sync_state)
+        except Exception as e:
+            logger.error(f"EVM reorg check failed: {e}")
+            self.db.rollback()
+            return {"error": str(e)}
+        
         # Determine start block
         start_block = sync_state.last_processed_block + 1 if sync_state.last_processed_block else latest_block - BATCH_SIZE
         
         if start_block > latest_block:
             logger.info(f"No new blocks to process. Latest: {latest_block}, Last processed: {sync_state.last_processed_block}")
-            return {"processed": 0, "transfers": 0, "last_block": sync_state.last_processed_block}
+            return {"processed": 0, "transfers": 0, "lag": 0}
         
         # Process blocks in batches
-        end_block = min(start_block + BATCH_SIZE - 1, latest_block)
-        processed_count = 0
-        transfer_count = 0
+        end_block = min(start_block + self.window.size - 1, latest_block)
+        committed_blocks, committed_rows = self.commits.committed_blocks, self.commits.committed_rows
+        batch_started = time.monotonic()
+        commit_failed = False
         
-        for block_num in range(start_block, end_block + 1):
+        # In LOGS mode, one range scan replaces the per-block receipt download
+        logs_by_block = None
+        if self.erc20_mode == "LOGS":
             try:
-                block = self.rpc_client.get_block(block_num, full_transactions=True)
-                if not block:
-                    continue
-                
-                # Parse native ETH transfers
-                transfers = self.parser.parse_block(block, labeled_addresses)
-                
-                # Parse ERC20 transfers from receipts
-                for tx in block.get("transactions", []):
-                    if tx.get("hash"):
-                        try:
-                            receipt = self.rpc_client.get_transaction_receipt(tx["hash"])
-                            if receipt:
-                                erc20_transfers = self.parser.parse_receipt_logs(receipt, block, labeled_addresses)
-                                transfers.extend(erc20_transfers)
-                        except Exception as e:
-                            logger.warning(f"Failed to get receipt for {tx['hash']}: {e}")
-                
-                # Save transfers
-                for transfer_data in transfers:
-                    transfer = RawTransfer(**transfer_data)
-                    self.db.add(transfer)
-                    transfer_count += 1
-                
-                processed_count += 1
-                
-                # Update sync state every block
-                sync_state.last_processed_block = block_num
-                self.db.commit()
-                
+                logs_by_block = self._scan_transfer_logs(start_block, end_block, labeled_addresses)
             except Exception as e:
-                logger.error(f"Failed to process block {block_num}: {e}")
+                logger.error(f"Failed to scan transfer logs {start_block}-{end_block}: {e}")
+                return {"error": str(e)}
+        
+        if settings.EVM_PIPELINE_ENABLED:
+            from app.ingestion.evm.pipeline import EVMPipeline
+            
+            pipeline = EVMPipeline(self)
+            try:
+                pipeline.run(start_block, end_block, sync_state, labeled_addresses, logs_by_block)
+            except GroupCommitFailed as e:
+                logger.error(str(e))
+                commit_failed = True
+        else:
+            for block_num in range(start_block, end_block + 1):
+                try:
+                    block_logs = logs_by_block.get(block_num, []) if logs_by_block is not None else None
+                    transfers = self._process_block(block_num, labeled_addresses, block_logs)
+                    if transfers is None:
+                        continue
+                    
+                    self._save_block(sync_state, block_num, transfers)
+                    
+                except ReorgDetected as e:
+                    logger.warning(f"EVM reorg detected: {e}")
+                    break
+                except GroupCommitFailed as e:
+                    logger.error(str(e))
+                    commit_failed = True
+                    break
+                except Exception as e:
+                    logger.error(f"Failed to process block {block_num}: {e}")
+                    break
+        
+        # Blocks still in the open group, and the good blocks before a failed one
+        if not self.commits.commit():
+            commit_failed = True
+        processed_count = self.commits.committed_blocks - committed_blocks
+        transfer_count = self.commits.committed_rows - committed_rows
+        
+        if self.reorg_guard.fork_detected:
+            try:
+                self.reorg_guard.rollback(sync_state)
+            except Exception as e:
+                logger.error(f"EVM reorg rollback failed, retrying next run: {e}")
                 self.db.rollback()
-                break
         
-        return {
-            "processed": processed_count,
-            "transfers": transfer_count,
-            "last_block": sync_state.last_processed_block
-        }
+        last_block = sync_state.last_processed_block
+        lag = latest_block - last_block if last_block is not None else latest_block - start_block + 1
+        self.window.update(lag, processed_count, time.monotonic() - batch_started)
+        
+        if commit_failed:
+            # Sync state was rolled back to the last committed block, the next run resumes there
+            return {"error": "Failed to commit EVM blocks", "processed": processed_count, "transfers": transfer_count}
+        return {"processed": processed_count, "transfers": transfer_count, "lag": lag}
+    
+    def _save_block(self, sync_state: SyncState, block_num: int, transfers: List[Dict[str, Any]]) -> int:
+        """Persist a block's transfers and advance the sync state in the open commit group, returns new transfer rows"""
+        with self.commits.block(transfers) as group:
+            header = self.headers.pop(block_num, None)
+            if header is not None:
+                self.reorg_guard.record(block_num, *header)
+            
+            written = RawTransferWriter(self.db).write(transfers)
+            group.block_rows = written
+            record_pending_tokens(self.db, self.token_cache, transfers)
+            
+            # Committed together with the block's transfers
+            sync_state.last_processed_block = block_num
+        return written
+    
+    def _canonical_hash(self, block_num: int) -> Optional[str]:
+        """Hash of the node's current block at this height"""
+        block = self.rpc_client.get_block(block_num, full_transactions=False)
+        return block["hash"] if block else None
+    
+    def _process_block(
+        self,
+        block_num: int,
+        labeled_addresses: EVMAddressIndex,
+        block_logs: Optional[List[Dict[str, Any]]] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Fetch a block and parse transfers (None if block not available).
+        
+        ERC20 transfers come from block_logs when a log scan already covered
+        this block, otherwise from the block's receipts.
+        """
+        fetched = self._fetch_block(block_num, with_receipts=block_logs is None)
+        if fetched is None:
+            return None
+        block, receipts = fetched
+        return self._parse_block(block, receipts, labeled_addresses, block_logs)
+    
+    def _fetch_block(self, block_num: int, with_receipts: bool) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        """Fetch a block and, if asked, its receipts (None if block not available).
+        
+        Only touches the RPC client and the header map, so EVMPipeline runs it
+        for several blocks at once.
+        """
+        block = self.rpc_client.get_block(block_num, full_transactions=True)
+        if not block:
+            return None
+        self.headers[block_num] = (block["hash"], block.get("parentHash"))
+        return block, self._fetch_receipts(block) if with_receipts else []
+    
+    def _parse_block(
+        self,
+        block: Dict[str, Any],
+        receipts: List[Dict[str, Any]],
+        labeled_addresses: EVMAddressIndex,
+        block_logs: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Parse native and ERC20 transfers of a fetched block"""
+        # Parse native ETH transfers
+        transfers = self.parser.parse_block(block, labeled_addresses)
+        
+        if block_logs is not None:
+            transfers.extend(self.parser.parse_logs(block_logs, block, labeled_addresses, self.token_cache))
+            return transfers
+        
+        # Parse ERC20 transfers from receipts
+        for receipt in receipts:
+            erc20_transfers = self.parser.parse_receipt_logs(receipt, block, labeled_addresses, self.token_cache)
+            transfers.extend(erc20_transfers)
+        
+        return transfers
+    
+    def _scan_transfer_logs(
+        self,
+        start_block: int,
+        end_block: int,
+        labeled_addresses: EVMAddressIndex
+    ) -> Dict[int, List[Dict[str, Any]]]:
+        """Scan Transfer logs touching labeled addresses over a range, grouped by block number"""
+        logs_by_block = {}
+        for log in self.log_scanner.scan_transfers(start_block, end_block, labeled_addresses.keys()):
+            logs_by_block.setdefault(int(log["blockNumber"], 16), []).append(log)
+        return logs_by_block
+    
+    def _fetch_receipts(self, block: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Fetch receipts for all transactions in a block using the configured strategy"""
+        tx_hashes = [tx["hash"] for tx in block.get("transactions", []) if tx.get("hash")]
+        if not tx_hashes:
+            return []
+        
+        if self.receipts_mode in ("AUTO", "BLOCK") and self._block_receipts_supported():
+            try:
+                receipts = self.rpc_client.get_block_receipts(int(block["number"], 16))
+                if receipts is not None:
+                    return [receipt for receipt in receipts if receipt]
+            except RPCError as e:
+                if self._is_unsupported(e):
+                    # Recorded on the router for the endpoint that answered, kept for the life of the worker process
+                    logger.info(f"eth_getBlockReceipts not supported by {e.url}, falling back")
+                    self.rpc_client.router.set_capability(e.url, "eth_getBlockReceipts", False)
+                elif self.receipts_mode == "BLOCK":
+                    raise
+                else:
+                    logger.warning(f"eth_getBlockReceipts failed for block {block['number']}: {e}")
+        
+        if self.receipts_mode == "PER_TX":
+            return self._fetch_receipts_per_tx(tx_hashes)
+        return self._fetch_receipts_batched(tx_hashes)
+    
+    def _block_receipts_supported(self) -> bool:
+        """Whether eth_getBlockReceipts should be tried (unknown counts as supported until probed)"""
+        if self.receipts_mode == "BLOCK":
+            return True
+        return self.rpc_client.router.supports("eth_getBlockReceipts")
+    
+    @staticmethod
+    def _is_unsupported(error: RPCError) -> bool:
+        """Check whether an RPC error means the method is not available on the node"""
+        if error.code in UNSUPPORTED_METHOD_CODES:
+            return True
+        message = error.message.lower()
+        return "method" in message and any(
+            phrase in message for phrase in ("not found", "not supported", "does not exist", "not available")
+        )
+    
+    def _fetch_receipts_batched(self, tx_hashes: List[str]) -> List[Dict[str, Any]]:
+        """Fetch receipts in chunked JSON-RPC batches, items the batch failed are retried one by one"""
+        receipts = []
+        for tx_hash, receipt in zip(tx_hashes, self.rpc_client.get_transaction_receipts(tx_hashes)):
+            if isinstance(receipt, RPCError) or not receipt:
+                logger.warning(f"Batched receipt for {tx_hash} failed, retrying alone: {receipt}")
+                receipt = self._get_receipt(tx_hash)
+            receipts.append(receipt)
+        
+        return receipts
+    
+    def _fetch_receipts_per_tx(self, tx_hashes: List[str]) -> List[Dict[str, Any]]:
+        """Fetch receipts one call per transaction"""
+        return [self._get_receipt(tx_hash) for tx_hash in tx_hashes]
+    
+    def _get_receipt(self, tx_hash: str) -> Dict[str, Any]:
+        """Receipt of one transaction, raises so the block is retried instead of saved without its transfers"""
+        receipt = self.rpc_client.get_transaction_receipt(tx_hash)
+        if not receipt:
+            raise RPCError({"code": None, "message": f"no receipt for {tx_hash}"})
+        return receipt
     
-    def _get_labeled_addresses(self) -> Dict[str, Dict[str, Any]]:
-        """Get labeled addresses as dict for fast lookup"""
-        addresses = self.db.query(LabeledAddress).filter(
-            LabeledAddress.chain == Chain.EVM,
-            LabeledAddress.is_active == True
-        ).all()
-        
-        result = {}
-        for addr in addresses:
-            normalized = addr.address.lower()
-            result[normalized] = {
-                "exchange_id": str(addr.exchange_id),
-                "cluster_id": str(addr.cluster_id) if addr.cluster_id else None,
-                "label": addr.label.value
-            }
-        
-        return result
+    def _get_labeled_addresses(self) -> EVMAddressIndex:
+        """Get the labeled address index for fast lookup"""
+        return get_address_index(self.db, Chain.EVM)
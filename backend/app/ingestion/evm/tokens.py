@@ -0,0 +1,314 @@
+from sqlalchemy import insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from app.db.models import TokenMetadata, TokenMetadataStatus, RawTransfer
+from app.ingestion.evm.rpc_client import EVMRPCClient, RPCError
+from app.services.metrics import MetricsService
+from app.core.config import settings
+from datetime import datetime, timedelta
+from decimal import Decimal
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# ERC20 function selectors
+DECIMALS_SELECTOR = "0x313ce567"  # decimals()
+SYMBOL_SELECTOR = "0x95d89b41"  # symbol()
+
+# Decimals assumed until a token is resolved
+DEFAULT_DECIMALS = 18
+
+
+def placeholder_symbol(token_address: str) -> str:
+    """Symbol used for a token whose metadata is not known (yet)"""
+    return f"ERC20_{token_address[:8]}"
+
+
+class TokenMetadataCache:
+    """In-process LRU of token (symbol, decimals).
+    
+    Lookups never touch the network or the database: a miss queues the token
+    for resolution and the caller falls back to placeholder metadata. The
+    queue is per process; record_pending_tokens persists it with the transfers.
+    """
+    
+    def __init__(self, maxsize: int = None):
+        self.maxsize = maxsize or settings.TOKEN_CACHE_SIZE
+        self._entries: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self.warmed = False
+    
+    def lookup(self, token_address: str) -> Optional[Tuple[str, int]]:
+        """Get (symbol, decimals) or None after queueing the token for resolution"""
+        with self._lock:
+            entry = self._entries.get(token_address)
+            if entry is None:
+                self._pending.add(token_address)
+                return None
+            self._entries.move_to_end(token_address)
+            return entry
+    
+    def known(self, token_address: str) -> bool:
+        """Whether the token's metadata is cached (resolved, or failed and kept as placeholder)"""
+        with self._lock:
+            return token_address in self._entries
+    
+    def put(self, token_address: str, symbol: str, decimals: int):
+        with self._lock:
+            self._entries[token_address] = (symbol, decimals)
+            self._entries.move_to_end(token_address)
+            self._pending.discard(token_address)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def take_pending(self, limit: int) -> List[str]:
+        """Remove and return up to limit queued token addresses"""
+        with self._lock:
+            taken = []
+            while self._pending and len(taken) < limit:
+                taken.append(self._pending.pop())
+            return taken
+    
+    def requeue(self, token_addresses: List[str]):
+        with self._lock:
+            self._pending.update(token_addresses)
+    
+    def warm(self, db: Session):
+        """Load the most recently resolved tokens from the database"""
+        rows = db.query(TokenMetadata.address, TokenMetadata.symbol, TokenMetadata.decimals).filter(
+            TokenMetadata.status != TokenMetadataStatus.PENDING
+        ).order_by(
+            TokenMetadata.updated_at.desc()
+        ).limit(self.maxsize).all()
+        
+        for address, symbol, decimals in reversed(rows):
+            self.put(address, symbol, decimals)
+        self.warmed = True
+
+
+_cache: Optional[TokenMetadataCache] = None
+
+
+def get_token_cache(db: Session) -> TokenMetadataCache:
+    """Get the process-wide token cache, warmed from the database on first use"""
+    global _cache
+    if _cache is None:
+        _cache = TokenMetadataCache()
+    if not _cache.warmed:
+        _cache.warm(db)
+    return _cache
+
+
+def record_pending_tokens(db: Session, cache: TokenMetadataCache, transfers: List[Dict[str, Any]]):
+    """Store PENDING rows for tokens the transfers carry placeholder metadata for, in the caller's transaction.
+    
+    Committed with the transfers, so a worker restart that loses the cache's
+    queue does not leave them unresolved; TokenMetadataResolver reads these rows too.
+    """
+    addresses = {
+        transfer["asset_address"] for transfer in transfers
+        if transfer.get("asset_address") and transfer.get("asset_symbol") == placeholder_symbol(transfer["asset_address"])
+    }
+    rows = [
+        {
+            "address": address,
+            "symbol": placeholder_symbol(address),
+            "decimals": DEFAULT_DECIMALS,
+            "status": TokenMetadataStatus.PENDING,
+        }
+        for address in sorted(addresses) if not cache.known(address)
+    ]
+    if rows:
+        db.execute(_insert_pending_statement(db), rows)
+
+
+def _insert_pending_statement(db: Session):
+    """INSERT that keeps existing token rows where the dialect supports it"""
+    table = TokenMetadata.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(table).on_conflict_do_nothing(index_elements=["address"])
+    if dialect == "sqlite":
+        return sqlite.insert(table).on_conflict_do_nothing(index_elements=["address"])
+    return insert(table)
+
+
+class TokenMetadataResolver:
+    """Resolve queued tokens with batched eth_call and persist the results"""
+    
+    def __init__(self, db: Session, rpc_client: EVMRPCClient, cache: TokenMetadataCache):
+        self.db = db
+        self.rpc_client = rpc_client
+        self.cache = cache
+    
+    def resolve_pending(self, limit: int = None) -> Dict[str, Any]:
+        """Resolve up to limit queued or stored PENDING tokens, returns counts"""
+        limit = limit or settings.TOKEN_RESOLVE_BATCH_SIZE
+        addresses = self.cache.take_pending(limit)
+        if len(addresses) < limit:
+            # Queued by a worker that restarted (or by another worker) before resolving them
+            addresses.extend(self._stored_pending(addresses, limit - len(addresses)))
+        if not addresses:
+            return {"resolved": 0, "failed": 0}
+        
+        # Cached only once committed
+        metadata: List[Tuple[str, str, int]] = []
+        # Timestamps of the rewritten transfers, their metric buckets are rebuilt after the commit
+        rewritten: List[datetime] = []
+        
+        # Another worker may already have resolved some of them, after this one wrote placeholder transfers
+        rows = {row.address: row for row in self.db.query(TokenMetadata).filter(TokenMetadata.address.in_(addresses))}
+        known = [row for row in rows.values() if row.status != TokenMetadataStatus.PENDING]
+        for row in known:
+            rewritten.extend(self._fix_placeholder_transfers(row.address, row.symbol, row.decimals))
+            metadata.append((row.address, row.symbol, row.decimals))
+        known_addresses = {row.address for row in known}
+        to_fetch = [address for address in addresses if address not in known_addresses]
+        
+        fetched = {}
+        error = None
+        if to_fetch:
+            try:
+                fetched = self._fetch_metadata(to_fetch)
+            except Exception as e:
+                logger.warning(f"Token metadata resolution failed, will retry: {e}")
+                self.cache.requeue(to_fetch)
+                error = str(e)
+        
+        resolved_count = 0
+        failed_count = 0
+        now = datetime.utcnow()
+        for address, (symbol, decimals) in fetched.items():
+            status = TokenMetadataStatus.RESOLVED
+            if decimals is None:
+                # Not an ERC20 (or decimals() reverted), keep the placeholder so it is not retried every run
+                status = TokenMetadataStatus.FAILED
+                decimals = DEFAULT_DECIMALS
+                failed_count += 1
+            else:
+                resolved_count += 1
+            symbol = symbol or placeholder_symbol(address)
+            
+            row = rows.get(address)
+            if row is None:
+                self.db.add(TokenMetadata(
+                    address=address,
+                    symbol=symbol,
+                    decimals=decimals,
+                    status=status,
+                    resolved_at=now
+                ))
+            else:
+                row.symbol, row.decimals, row.status, row.resolved_at = symbol, decimals, status, now
+            
+            rewritten.extend(self._fix_placeholder_transfers(address, symbol, decimals))
+            metadata.append((address, symbol, decimals))
+        
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # Another worker stored some of the same tokens first, they are known on the retry
+            logger.info("Token metadata stored concurrently, will retry")
+            self.db.rollback()
+            self.cache.requeue(addresses)
+            return {"resolved": 0, "failed": 0}
+        
+        for address, symbol, decimals in metadata:
+            self.cache.put(address, symbol, decimals)
+        if rewritten:
+            self._rebuild_metrics(min(rewritten), max(rewritten))
+        
+        result = {"resolved": resolved_count, "failed": failed_count}
+        if error:
+            result["error"] = error
+        return result
+    
+    def _stored_pending(self, exclude: List[str], limit: int) -> List[str]:
+        """Oldest PENDING token rows not already taken from the queue"""
+        query = self.db.query(TokenMetadata.address).filter(TokenMetadata.status == TokenMetadataStatus.PENDING)
+        if exclude:
+            query = query.filter(TokenMetadata.address.notin_(exclude))
+        return [address for (address,) in query.order_by(TokenMetadata.created_at).limit(limit)]
+    
+    def _fetch_metadata(self, addresses: List[str]) -> Dict[str, Tuple[Optional[str], Optional[int]]]:
+        """Call decimals() and symbol() on each token in one batch"""
+        calls = []
+        for address in addresses:
+            calls.append(("eth_call", [{"to": address, "data": DECIMALS_SELECTOR}, "latest"]))
+            calls.append(("eth_call", [{"to": address, "data": SYMBOL_SELECTOR}, "latest"]))
+        
+        results = []
+        batch_size = max(2, settings.EVM_RPC_BATCH_SIZE - settings.EVM_RPC_BATCH_SIZE % 2)
+        for i in range(0, len(calls), batch_size):
+            results.extend(self.rpc_client.batch_call(calls[i:i + batch_size]))
+        
+        metadata = {}
+        for i, address in enumerate(addresses):
+            decimals_result = results[2 * i]
+            symbol_result = results[2 * i + 1]
+            decimals = None if isinstance(decimals_result, RPCError) else self._decode_decimals(decimals_result)
+            symbol = None if isinstance(symbol_result, RPCError) else self._decode_symbol(symbol_result)
+            metadata[address] = (symbol, decimals)
+        
+        return metadata
+    
+    def _fix_placeholder_transfers(self, address: str, symbol: str, decimals: int) -> List[datetime]:
+        """Rewrite transfers stored with placeholder metadata before the token was resolved, returns their timestamps"""
+        placeholder = placeholder_symbol(address)
+        if symbol == placeholder and decimals == DEFAULT_DECIMALS:
+            return []
+        
+        # Placeholder amounts were divided by 10**18 instead of 10**decimals
+        factor = Decimal(10) ** (DEFAULT_DECIMALS - decimals)
+        statement = update(RawTransfer).where(
+            RawTransfer.asset_address == address,
+            RawTransfer.asset_symbol == placeholder
+        ).values(
+            asset_symbol=symbol, amount=RawTransfer.amount * factor
+        ).returning(RawTransfer.timestamp).execution_options(synchronize_session=False)
+        return list(self.db.execute(statement).scalars())
+    
+    def _rebuild_metrics(self, first: datetime, last: datetime):
+        """Drop and recompute the metric buckets of rewritten transfers, replacing their placeholder symbol rows"""
+        since = first.replace(hour=0, minute=0, second=0, microsecond=0)
+        until = last.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        try:
+            MetricsService(self.db).rebuild_range(since, until)
+        except Exception as e:
+            logger.error(f"Failed to rebuild metrics from {since} to {until} after token resolution: {e}")
+            self.db.rollback()
+    
+    @staticmethod
+    def _decode_decimals(result: Optional[str]) -> Optional[int]:
+        """Decode a uint8 return value"""
+        if not result or result == "0x":
+            return None
+        try:
+            decimals = int(result[:66], 16)
+        except ValueError:
+            return None
+        return decimals if decimals <= 255 else None
+    
+    @staticmethod
+    def _decode_symbol(result: Optional[str]) -> Optional[str]:
+        """Decode a string return value, or a bytes32 one as used by some older tokens"""
+        if not result or result == "0x":
+            return None
+        try:
+            data = bytes.fromhex(result[2:])
+            if len(data) >= 64 and int.from_bytes(data[:32], "big") == 32:
+                length = int.from_bytes(data[32:64], "big")
+                raw = data[64:64 + length]
+            else:
+                raw = data[:32].rstrip(b"\x00")
+            symbol = raw.decode("utf-8", errors="ignore")
+        except ValueError:
+            return None
+        
+        symbol = "".join(ch for ch in symbol if ch.isprintable()).strip()
+        return symbol[:50] or None
@@ -0,0 +1,133 @@
+from contextlib import contextmanager
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from app.core.config import settings
+from app.db.models import Chain
+from app.db.partitions import TransferPartitions
+from app.services.pending_flows import reconcile_pending
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitFailed(Exception):
+    """The open group could not be committed, its blocks were rolled back"""
+    pass
+
+
+class GroupCommit:
+    """Commits ingested blocks in groups instead of one transaction per block.
+    
+    Each block is written inside a SAVEPOINT together with its checkpoint
+    (SyncState or backfill range), and the group is committed once it holds
+    max_blocks blocks or max_ms have passed since its first block. A block
+    that fails is rolled back to its savepoint and the good blocks before it
+    are committed right away, so the checkpoint always matches the committed
+    transfers. Pending flows are confirmed after the commit, as are the
+    after_commit callbacks of the committed blocks.
+    
+    committed_blocks and committed_rows count what actually reached the
+    database, callers report those rather than what they saved, and
+    first_timestamp / last_timestamp span the committed transfers.
+    """
+    
+    def __init__(self, db: Session, chain: Chain, max_blocks: int = None, max_ms: int = None):
+        self.db = db
+        self.chain = chain
+        self.max_blocks = max(1, max_blocks or settings.SYNC_COMMIT_BLOCKS)
+        self.max_seconds = (settings.SYNC_COMMIT_MS if max_ms is None else max_ms) / 1000
+        self.blocks = 0
+        self.rows = 0
+        self.block_rows = 0
+        self.transfers: List[Dict[str, Any]] = []
+        self.callbacks: List[Callable[[], Any]] = []
+        self.block_callbacks: List[Callable[[], Any]] = []
+        self.started: Optional[float] = None
+        self.committed_blocks = 0
+        self.committed_rows = 0
+        self.first_timestamp: Optional[datetime] = None
+        self.last_timestamp: Optional[datetime] = None
+    
+    @contextmanager
+    def block(self, transfers: Optional[List[Dict[str, Any]]] = None):
+        """Scope of one block's writes, commits the group when it is full.
+        
+        Set block_rows on the yielded group to the rows the block wrote.
+        Raises GroupCommitFailed when the commit of the full group fails, so
+        the caller stops instead of checkpointing past the lost blocks.
+        """
+        if transfers:
+            self._create_partitions(transfers)
+        if self.blocks == 0:
+            self.started = time.monotonic()
+        self.block_rows = 0
+        self.block_callbacks = []
+        savepoint = self.db.begin_nested()
+        try:
+            yield self
+            savepoint.commit()
+        except BaseException as e:
+            savepoint.rollback()
+            # The good blocks before this one are kept
+            if not self.commit():
+                raise self._failed() from e
+            raise
+        
+        self.blocks += 1
+        self.rows += self.block_rows
+        self.callbacks.extend(self.block_callbacks)
+        if transfers:
+            self.transfers.extend(transfers)
+        if self.blocks >= self.max_blocks or time.monotonic() - self.started >= self.max_seconds:
+            if not self.commit():
+                raise self._failed()
+    
+    def after_commit(self, callback: Callable[[], Any]):
+        """Run callback once the current block is committed, it is dropped if the block is rolled back"""
+        self.block_callbacks.append(callback)
+    
+    def commit(self) -> bool:
+        """Commit the blocks written so far, False if that failed (they are rolled back)"""
+        blocks, rows, transfers, callbacks = self.blocks, self.rows, self.transfers, self.callbacks
+        self.blocks = 0
+        self.rows = 0
+        self.transfers = []
+        self.callbacks = []
+        try:
+            self.db.commit()
+        except Exception as e:
+            logger.error(f"Failed to commit {blocks} {self.chain.value} blocks: {e}")
+            self.db.rollback()
+            return False
+        
+        self.committed_blocks += blocks
+        self.committed_rows += rows
+        if transfers:
+            timestamps = [transfer["timestamp"] for transfer in transfers]
+            first, last = min(timestamps), max(timestamps)
+            self.first_timestamp = min(self.first_timestamp or first, first)
+            self.last_timestamp = max(self.last_timestamp or last, last)
+        reconcile_pending(self.chain.value, transfers)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                # The blocks are committed, a failing follow-up must not report them as lost
+                logger.error(f"After-commit callback failed for {self.chain.value}: {e}")
+        return True
+    
+    def _create_partitions(self, transfers: List[Dict[str, Any]]):
+        """Create the partitions a block needs before its savepoint, outside the group's transaction"""
+        partitions = TransferPartitions(self.db)
+        months = partitions.missing_for(transfer["timestamp"] for transfer in transfers)
+        if not months:
+            return
+        # The group's writes hold a lock on raw_transfers that creating a partition would wait for
+        if not self.commit():
+            raise self._failed()
+        partitions.ensure(months)
+    
+    def _failed(self) -> GroupCommitFailed:
+        return GroupCommitFailed(f"{self.chain.value} blocks rolled back, resuming from the last committed block")
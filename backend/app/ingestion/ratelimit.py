@@ -0,0 +1,47 @@
+import threading
+import time
+from typing import Dict
+
+
+class TokenBucket:
+    """Client-side rate limiter: rate requests per second with bursts of up to burst.
+    
+    acquire() blocks until a token is available, so callers on many threads
+    share one quota.
+    """
+    
+    def __init__(self, rate: float, burst: int):
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self, tokens: float = 1):
+        """Take tokens, sleeping until the bucket has refilled enough"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, rate: float, burst: int) -> TokenBucket:
+    """Get the process-wide bucket for a provider so all its clients share the quota"""
+    with _buckets_lock:
+        bucket = _buckets.get(name)
+        if bucket is None or (bucket.rate, bucket.burst) != (rate, max(1, burst)):
+            bucket = TokenBucket(rate, burst)
+            _buckets[name] = bucket
+        return bucket
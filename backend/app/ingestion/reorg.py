@@ -0,0 +1,158 @@
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from typing import Any, Callable, Dict, Optional, Tuple
+from app.db.models import BlockHash, Chain, RawTransfer, SyncState
+import logging
+
+logger = logging.getLogger(__name__)
+
+# SyncState column holding the last processed height of each chain
+HEIGHT_FIELDS = {Chain.EVM: "last_processed_block", Chain.BTC: "last_processed_height"}
+
+# Hashes older than max_depth are pruned every this many blocks
+PRUNE_INTERVAL = 32
+
+
+class ReorgDetected(Exception):
+    """A block does not extend the stored chain"""
+    
+    def __init__(self, height: int, parent_hash: str, stored_hash: str):
+        super().__init__(f"Block {height} has parent {parent_hash}, stored block {height - 1} is {stored_hash}")
+        self.height = height
+
+
+class ReorgGuard:
+    """Last max_depth block hashes of a chain, used to detect and undo reorganizations.
+    
+    record() stores each ingested block and raises ReorgDetected when its
+    parent is not the stored previous block. verify() compares the last
+    processed block with the node's current one. On a fork, rollback()
+    walks back to the newest height where the stored and canonical hashes
+    agree and removes everything above it: transfers, stored hashes and the
+    affected metric buckets. The sync then re-ingests from there.
+    
+    State outside the database is the sync's to undo: on_rollback is called
+    with the ancestor height once the rollback is committed (BTCSync rewinds
+    its outpoint index there). Pending flows confirmed by the removed blocks
+    are not restored; the watchers record them again if the transactions
+    are re-announced.
+    """
+    
+    def __init__(
+        self,
+        db: Session,
+        chain: Chain,
+        get_hash: Callable[[int], Optional[str]],
+        max_depth: int,
+        on_rollback: Optional[Callable[[int], Any]] = None
+    ):
+        self.db = db
+        self.chain = chain
+        self.get_hash = get_hash
+        self.max_depth = max(1, max_depth)
+        self.on_rollback = on_rollback
+        self.fork_detected = False
+        # (height, hash) of the last recorded block, saves a lookup per block
+        self._last: Optional[Tuple[int, str]] = None
+    
+    def record(self, height: int, block_hash: str, parent_hash: Optional[str]):
+        """Store a block about to be committed with its transfers (raises ReorgDetected on a fork)"""
+        if parent_hash is not None:
+            stored = self._stored_hash(height - 1)
+            if stored is not None and stored != parent_hash:
+                self.fork_detected = True
+                raise ReorgDetected(height, parent_hash, stored)
+        
+        # Anything at or above this height is stale when it does not extend the last recorded block
+        # (e.g. after a manual reset), old entries are pruned along with it or periodically
+        extends_last = self._last is not None and self._last[0] == height - 1
+        if not extends_last or height % PRUNE_INTERVAL == 0:
+            self.db.query(BlockHash).filter(
+                BlockHash.chain == self.chain,
+                or_(BlockHash.height >= height, BlockHash.height <= height - self.max_depth)
+            ).delete(synchronize_session=False)
+        self.db.add(BlockHash(chain=self.chain, height=height, hash=block_hash, parent_hash=parent_hash))
+        self._last = (height, block_hash)
+    
+    def verify(self, sync_state: SyncState) -> Optional[int]:
+        """Roll back if the last processed block is no longer canonical, returns the new last height if so"""
+        last = getattr(sync_state, HEIGHT_FIELDS[self.chain])
+        if last is None:
+            return None
+        stored = self._stored_hash(last)
+        if stored is None:
+            return None
+        canonical = self.get_hash(last)
+        # None: the node does not have the block (yet), e.g. a lagging failover endpoint
+        if canonical is None or canonical == stored:
+            self.fork_detected = False
+            return None
+        return self.rollback(sync_state)
+    
+    def rollback(self, sync_state: SyncState) -> int:
+        """Undo all blocks above the newest common ancestor, returns its height"""
+        self.fork_detected = False
+        self._last = None
+        last = getattr(sync_state, HEIGHT_FIELDS[self.chain])
+        stored: Dict[int, str] = dict(
+            self.db.query(BlockHash.height, BlockHash.hash).filter(
+                BlockHash.chain == self.chain,
+                BlockHash.height <= last
+            )
+        )
+        
+        ancestor = None
+        for height in sorted(stored, reverse=True):
+            if stored[height] == self.get_hash(height):
+                ancestor = height
+                break
+        if ancestor is None:
+            # Deeper than the stored history, nothing older can be checked
+            ancestor = min(stored) - 1 if stored else last
+            logger.error(
+                f"{self.chain.value} reorg deeper than {len(stored)} stored blocks, rolling back to {ancestor}"
+            )
+        
+        orphaned_since = self.db.query(func.min(RawTransfer.timestamp)).filter(
+            RawTransfer.chain == self.chain,
+            RawTransfer.block_number > ancestor
+        ).scalar()
+        removed = self.db.query(RawTransfer).filter(
+            RawTransfer.chain == self.chain,
+            RawTransfer.block_number > ancestor
+        ).delete(synchronize_session=False)
+        self.db.query(BlockHash).filter(
+            BlockHash.chain == self.chain,
+            BlockHash.height > ancestor
+        ).delete(synchronize_session=False)
+        setattr(sync_state, HEIGHT_FIELDS[self.chain], ancestor)
+        self.db.commit()
+        
+        logger.warning(
+            f"{self.chain.value} reorg: rolled back {last - ancestor} blocks to {ancestor}, removed {removed} transfers"
+        )
+        
+        if self.on_rollback is not None:
+            try:
+                self.on_rollback(ancestor)
+            except Exception as e:
+                logger.error(f"Failed to undo {self.chain.value} state above block {ancestor}: {e}")
+        
+        if orphaned_since is not None:
+            from app.services.metrics import MetricsService
+            try:
+                MetricsService(self.db).rebuild_since(orphaned_since)
+            except Exception as e:
+                # The next full aggregation run recomputes the remaining buckets
+                logger.error(f"Failed to rebuild metrics after {self.chain.value} reorg: {e}")
+                self.db.rollback()
+        
+        return ancestor
+    
+    def _stored_hash(self, height: int) -> Optional[str]:
+        if self._last is not None and self._last[0] == height:
+            return self._last[1]
+        return self.db.query(BlockHash.hash).filter(
+            BlockHash.chain == self.chain,
+            BlockHash.height == height
+        ).scalar()
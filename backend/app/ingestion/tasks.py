@@ -9,15 +9,24 @@ logger = logging.getLogger(__name__)
 # Tasks will be registered by celery_app in worker
 
 
-def evm_sync_task():
-    """EVM sync task"""
+def evm_sync_task(catch_up: bool = False):
+    """EVM sync task (catch_up keeps syncing until near the tip or out of time budget).
+    
+    Runs are triggered by beat and by the newHeads subscriber, a lock keeps them from overlapping.
+    """
+    from redis.exceptions import LockError
     from app.db.session import SessionLocal
     from app.ingestion.evm.sync import EVMSync
     
+    lock = _sync_lock("evm")
+    if not lock.acquire(blocking=False):
+        logger.info("EVM sync already running, skipped")
+        return {"skipped": "already running"}
+    
     db = SessionLocal()
     try:
         sync = EVMSync(db)
-        result = sync.sync()
+        result = sync.sync(catch_up=catch_up)
         logger.info(f"EVM sync completed: {result}")
         return result
     except Exception as e:
@@ -25,17 +34,30 @@ def evm_sync_task():
         raise
     finally:
         db.close()
+        try:
+            lock.release()
+        except LockError:
+            logger.warning("EVM sync lock expired before the run finished")
 
 
-def btc_sync_task():
-    """BTC sync task"""
+def btc_sync_task(catch_up: bool = False):
+    """BTC sync task (catch_up keeps syncing until near the tip or out of time budget).
+    
+    Runs are triggered by beat and by the ZMQ block listener, a lock keeps them from overlapping.
+    """
+    from redis.exceptions import LockError
     from app.db.session import SessionLocal
     from app.ingestion.btc.sync import BTCSync
     
+    lock = _sync_lock("btc")
+    if not lock.acquire(blocking=False):
+        logger.info("BTC sync already running, skipped")
+        return {"skipped": "already running"}
+    
     db = SessionLocal()
     try:
         sync = BTCSync(db)
-        result = sync.sync()
+        result = sync.sync(catch_up=catch_up)
         logger.info(f"BTC sync completed: {result}")
         return result
     except Exception as e:
@@ -43,18 +65,77 @@ def btc_sync_task():
         raise
     finally:
         db.close()
+        try:
+            lock.release()
+        except LockError:
+            logger.warning("BTC sync lock expired before the run finished")
+
+
+def _sync_lock(chain: str):
+    """Redis lock for a chain's sync, expires after twice the catch-up time budget if a worker dies"""
+    import redis
+    from app.core.config import settings
+    
+    client = redis.from_url(settings.REDIS_URL)
+    return client.lock(f"sync-lock:{chain}", timeout=settings.SYNC_CATCHUP_TIME_BUDGET_SECONDS * 2)
+
+
+def backfill_dispatch_task():
+    """Enqueue backfill ranges that are ready to run"""
+    from celery import current_app
+    from app.db.session import SessionLocal
+    from app.ingestion.backfill import BackfillService
+    
+    db = SessionLocal()
+    try:
+        service = BackfillService(db)
+        service.refresh_jobs()
+        range_ids = service.dispatchable_ranges()
+        for range_id in range_ids:
+            current_app.send_task("backfill_range_task", args=[range_id])
+        if range_ids:
+            logger.info(f"Backfill dispatch enqueued {len(range_ids)} ranges")
+        return {"dispatched": len(range_ids)}
+    except Exception as e:
+        logger.error(f"Backfill dispatch failed: {e}")
+        raise
+    finally:
+        db.close()
+
+
+def backfill_range_task(range_id: str):
+    """Backfill a single block range"""
+    from app.db.session import SessionLocal
+    from app.ingestion.backfill import BackfillService
+    
+    db = SessionLocal()
+    try:
+        service = BackfillService(db)
+        result = service.run_range(range_id)
+        logger.info(f"Backfill range completed: {result}")
+        return result
+    except Exception as e:
+        logger.error(f"Backfill range {range_id} failed: {e}")
+        raise
+    finally:
+        db.close()
 
 
 def metrics_aggregate_task():
-    """Metrics aggregation task"""
+    """Metrics aggregation task
+    
+    Recomputes the recent buckets only (METRICS_AGGREGATE_LOOKBACK_HOURS, from the start of that day),
+    older ones are refreshed by the syncs, backfills and reorg rollbacks that change them.
+    """
     from app.db.session import SessionLocal
-    from app.services.metrics import MetricsService
+    from app.services.metrics import MetricsService, aggregation_start
     
+    since = aggregation_start()
     db = SessionLocal()
     try:
         service = MetricsService(db)
-        result_1h = service.aggregate_metrics("1h")
-        result_1d = service.aggregate_metrics("1d")
+        result_1h = service.aggregate_metrics("1h", since=since)
+        result_1d = service.aggregate_metrics("1d", since=since)
         logger.info(f"Metrics aggregation completed: 1h={result_1h}, 1d={result_1d}")
         return {"1h": result_1h, "1d": result_1d}
     except Exception as e:
@@ -64,6 +145,30 @@ def metrics_aggregate_task():
         db.close()
 
 
+def partition_maintenance_task():
+    """Create raw_transfers partitions ahead of time and detach the ones past retention"""
+    from datetime import datetime
+    from app.core.config import settings
+    from app.db.partitions import TransferPartitions, add_months, month_start
+    from app.db.session import SessionLocal
+    
+    db = SessionLocal()
+    try:
+        partitions = TransferPartitions(db)
+        created = partitions.ensure_ahead(settings.TRANSFER_PARTITION_PREMAKE_MONTHS)
+        detached = []
+        if settings.TRANSFER_RETENTION_MONTHS > 0:
+            cutoff = add_months(month_start(datetime.utcnow()), -settings.TRANSFER_RETENTION_MONTHS)
+            detached = partitions.detach_before(cutoff, drop=settings.TRANSFER_RETENTION_DROP)
+        logger.info(f"Partition maintenance completed: {created} created, {len(detached)} detached")
+        return {"created": created, "detached": detached}
+    except Exception as e:
+        logger.error(f"Partition maintenance failed: {e}")
+        raise
+    finally:
+        db.close()
+
+
 def alerts_task():
     """Alerts task"""
     from app.db.session import SessionLocal
@@ -0,0 +1,135 @@
+import httpx
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying: rate limiting and gateway/overload errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class RPCError(Exception):
+    """Error object returned by the node for a JSON-RPC request (url is the endpoint that answered)"""
+    
+    def __init__(self, error: Any, url: Optional[str] = None):
+        self.error = error
+        self.url = url
+        self.code = error.get("code") if isinstance(error, dict) else None
+        self.message = error.get("message", "") if isinstance(error, dict) else str(error)
+        super().__init__(f"RPC Error: {error}")
+
+
+class HTTPTransport:
+    """Pooled HTTP client shared by all chain clients.
+    
+    Keeps connections alive across calls, retries transient failures with
+    jittered exponential backoff and optionally speaks HTTP/2.
+    """
+    
+    def __init__(
+        self,
+        pool_size: int = None,
+        max_retries: int = None,
+        backoff_seconds: float = None,
+        backoff_max_seconds: float = None,
+        timeout: float = None,
+        http2: bool = None
+    ):
+        self.pool_size = pool_size or settings.HTTP_POOL_SIZE
+        self.max_retries = settings.HTTP_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_seconds = backoff_seconds or settings.HTTP_RETRY_BACKOFF_SECONDS
+        self.backoff_max_seconds = backoff_max_seconds or settings.HTTP_RETRY_BACKOFF_MAX_SECONDS
+        self.timeout = timeout or settings.HTTP_TIMEOUT_SECONDS
+        http2 = settings.HTTP2_ENABLED if http2 is None else http2
+        
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        try:
+            self.client = httpx.Client(http2=http2, limits=limits, timeout=self.timeout)
+        except ImportError:
+            # HTTP/2 needs the optional h2 package
+            logger.warning("HTTP/2 requested but h2 is not installed, using HTTP/1.1")
+            self.client = httpx.Client(limits=limits, timeout=self.timeout)
+    
+    def close(self):
+        """Close all pooled connections"""
+        self.client.close()
+    
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        json: Any = None,
+        params: Dict[str, Any] = None,
+        headers: Dict[str, str] = None,
+        auth: Tuple[str, str] = None,
+        timeout: float = None,
+        retry_statuses: Tuple[int, ...] = RETRY_STATUSES,
+        raise_for_status: bool = True
+    ) -> httpx.Response:
+        """Send a request, retrying connection errors, timeouts and retry_statuses"""
+        attempt = 0
+        while True:
+            try:
+                response = self.client.request(
+                    method,
+                    url,
+                    json=json,
+                    params=params,
+                    headers=headers,
+                    auth=auth,
+                    timeout=timeout or self.timeout
+                )
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.debug(f"{method} {url} failed ({e}), retrying in {delay:.2f}s")
+            else:
+                if response.status_code not in retry_statuses or attempt >= self.max_retries:
+                    if raise_for_status:
+                        response.raise_for_status()
+                    return response
+                delay = self._backoff(attempt, response.headers.get("Retry-After"))
+                logger.debug(f"{method} {url} returned {response.status_code}, retrying in {delay:.2f}s")
+            
+            time.sleep(delay)
+            attempt += 1
+    
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        """Send a GET request"""
+        return self.request("GET", url, **kwargs)
+    
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        """Send a POST request"""
+        return self.request("POST", url, **kwargs)
+    
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Full-jitter exponential backoff, honouring Retry-After when the server sends one"""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max_seconds)
+            except ValueError:
+                pass
+        ceiling = min(self.backoff_max_seconds, self.backoff_seconds * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+
+_transport: Optional[HTTPTransport] = None
+_transport_pid: Optional[int] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> HTTPTransport:
+    """Get the process-wide transport (recreated after fork so pooled sockets are never shared)"""
+    global _transport, _transport_pid
+    with _transport_lock:
+        if _transport is None or _transport_pid != os.getpid():
+            _transport = HTTPTransport()
+            _transport_pid = os.getpid()
+        return _transport
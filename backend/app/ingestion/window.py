@@ -0,0 +1,48 @@
+from typing import Dict
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveBatchWindow:
+    """Number of blocks to process per sync batch.
+    
+    The window doubles while the sync is behind the tip by more than one window
+    and blocks are processed faster than the target latency, and halves as soon
+    as per-block latency goes above the target. It never leaves [min_size, max_size].
+    """
+    
+    def __init__(self, min_size: int, max_size: int, target_block_ms: float):
+        self.min_size = max(1, min_size)
+        self.max_size = max(self.min_size, max_size)
+        self.target_block_ms = target_block_ms
+        self.size = self.min_size
+        self.last_block_ms = None
+    
+    def update(self, lag: int, blocks: int, elapsed_seconds: float) -> int:
+        """Adjust the window after a batch, returns the new size"""
+        if blocks <= 0:
+            return self.size
+        
+        block_ms = elapsed_seconds * 1000 / blocks
+        self.last_block_ms = block_ms
+        
+        if block_ms > self.target_block_ms:
+            self.size = max(self.min_size, self.size // 2)
+        elif lag > self.size:
+            self.size = min(self.max_size, self.size * 2)
+        
+        return self.size
+
+
+# Windows live for the life of the worker process so they keep their size between beat runs
+_windows: Dict[str, AdaptiveBatchWindow] = {}
+
+
+def get_window(chain: str, min_size: int, max_size: int, target_block_ms: float) -> AdaptiveBatchWindow:
+    """Get the process-wide batch window for a chain"""
+    window = _windows.get(chain)
+    if window is None or (window.min_size, window.max_size, window.target_block_ms) != (min_size, max_size, target_block_ms):
+        window = AdaptiveBatchWindow(min_size, max_size, target_block_ms)
+        _windows[chain] = window
+    return window
@@ -0,0 +1,100 @@
+from array import array
+from typing import List
+
+MASK64 = 0xFFFFFFFFFFFFFFFF
+
+# Attempts with a new seed before giving up when peeling fails
+MAX_BUILD_ATTEMPTS = 64
+
+
+def _mix(key: bytes, seed: int) -> int:
+    """Seeded 64-bit hash of a key.
+    
+    Starts from Python's bytes hash (SipHash, randomized per process), so a
+    filter is only valid in the process that built it.
+    """
+    h = (hash(key) ^ seed) & MASK64
+    h = ((h ^ (h >> 33)) * 0xFF51AFD7ED558CCD) & MASK64
+    h = ((h ^ (h >> 33)) * 0xC4CEB9FE1A85EC53) & MASK64
+    return h ^ (h >> 33)
+
+
+class XorFilter:
+    """3-wise xor filter with 8-bit fingerprints (about 9.8 bits per key, ~0.4% false positives).
+    
+    Answers "definitely not in the set" for most absent keys so an exact
+    lookup only runs for members and rare false positives.
+    """
+    
+    def __init__(self, keys: List[bytes], seed: int = 0x2545F4914F6CDD1D):
+        self.block_length = max(1, (int(1.23 * len(keys)) + 32) // 3)
+        capacity = 3 * self.block_length
+        
+        for _ in range(MAX_BUILD_ATTEMPTS):
+            order = self._peel(keys, seed, capacity)
+            if order is not None:
+                break
+            seed = _mix(seed.to_bytes(8, "little"), 0x9E3779B97F4A7C15)
+        else:
+            raise ValueError("Could not build xor filter, keys are probably not unique")
+        
+        self.seed = seed
+        fingerprints = bytearray(capacity)
+        for hash_value, slot in reversed(order):
+            h0, h1, h2 = self._slots(hash_value)
+            fingerprints[slot] = self._fingerprint(hash_value) ^ fingerprints[h0] ^ fingerprints[h1] ^ fingerprints[h2]
+        self.fingerprints = bytes(fingerprints)
+    
+    def _slots(self, hash_value: int):
+        """One slot per block, each from the high bits of its own rotation of the hash (multiply-shift)"""
+        block = self.block_length
+        h1 = ((hash_value << 21) | (hash_value >> 43)) & MASK64
+        h2 = ((hash_value << 42) | (hash_value >> 22)) & MASK64
+        return (
+            (hash_value * block) >> 64,
+            block + ((h1 * block) >> 64),
+            2 * block + ((h2 * block) >> 64),
+        )
+    
+    @staticmethod
+    def _fingerprint(hash_value: int) -> int:
+        # Folded so the fingerprint does not share bits with the slots
+        return (hash_value ^ (hash_value >> 32)) & 0xFF
+    
+    def _peel(self, keys: List[bytes], seed: int, capacity: int):
+        """Order keys so each owns a slot no later key touches, None if the hypergraph has a cycle"""
+        counts = array("I", bytes(4 * capacity))
+        xors = array("Q", bytes(8 * capacity))
+        slots = self._slots
+        
+        for key in keys:
+            hash_value = _mix(key, seed)
+            for slot in slots(hash_value):
+                counts[slot] += 1
+                xors[slot] ^= hash_value
+        
+        queue = [slot for slot in range(capacity) if counts[slot] == 1]
+        order = []
+        while queue:
+            slot = queue.pop()
+            if counts[slot] != 1:
+                continue
+            hash_value = xors[slot]
+            order.append((hash_value, slot))
+            for other in slots(hash_value):
+                counts[other] -= 1
+                xors[other] ^= hash_value
+                if counts[other] == 1:
+                    queue.append(other)
+        
+        return order if len(order) == len(keys) else None
+    
+    def __contains__(self, key: bytes) -> bool:
+        hash_value = _mix(key, self.seed)
+        h0, h1, h2 = self._slots(hash_value)
+        fingerprints = self.fingerprints
+        return self._fingerprint(hash_value) == fingerprints[h0] ^ fingerprints[h1] ^ fingerprints[h2]
+    
+    @property
+    def size_bytes(self) -> int:
+        return len(self.fingerprints)
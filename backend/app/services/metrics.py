@@ -1,13 +1,23 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, text
 from app.db.models import RawTransfer, FlowMetric, Exchange
+from app.core.config import settings
 from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Advisory lock serializing aggregation runs, flow_metrics has no unique key to upsert on
+AGGREGATE_LOCK_KEY = 0x666C6F77
+
+
+def aggregation_start() -> datetime:
+    """Start of the buckets the periodic aggregation recomputes (METRICS_AGGREGATE_LOOKBACK_HOURS back, from the start of that day)"""
+    since = datetime.utcnow() - timedelta(hours=settings.METRICS_AGGREGATE_LOOKBACK_HOURS)
+    return since.replace(hour=0, minute=0, second=0, microsecond=0)
+
 
 class MetricsService:
     """Metrics aggregation service"""
@@ -15,8 +25,17 @@ class MetricsService:
     def __init__(self, db: Session):
         self.db = db
     
-    def aggregate_metrics(self, window: str = "1h") -> Dict[str, Any]:
-        """Aggregate flow metrics from raw transfers"""
+    def aggregate_metrics(
+        self,
+        window: str = "1h",
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """Aggregate flow metrics from raw transfers in [since, until) (bounds should be bucket starts).
+        
+        The bounds are plain timestamp comparisons so PostgreSQL only scans
+        the monthly partitions they cover.
+        """
         # Determine time bucket function based on window
         if window == "1h":
             time_bucket_expr = func.date_trunc("hour", RawTransfer.timestamp)
@@ -25,8 +44,15 @@ class MetricsService:
         else:
             raise ValueError(f"Unsupported window: {window}")
         
-        # Get all transfers
-        transfers = self.db.query(RawTransfer).all()
+        # Held until the commit below
+        self._lock()
+        
+        query = self.db.query(RawTransfer)
+        if since is not None:
+            query = query.filter(RawTransfer.timestamp >= since)
+        if until is not None:
+            query = query.filter(RawTransfer.timestamp < until)
+        transfers = query.all()
         
         # Group by time_bucket, exchange, asset
         metrics_map = {}
@@ -91,6 +117,55 @@ class MetricsService:
             "total": len(metrics_map)
         }
     
+    def rebuild_since(self, since: datetime) -> Dict[str, Any]:
+        """Recompute all buckets from the one containing since, e.g. after a reorg removed transfers.
+        
+        Buckets are dropped first, so ones left without transfers disappear
+        instead of keeping the orphaned amounts. The drop happens under the
+        aggregation lock, so a concurrent run cannot re-insert them meanwhile.
+        """
+        results = {}
+        for window in ("1h", "1d"):
+            bucket_start = self._get_time_bucket(since, window)
+            self._lock()
+            self.db.query(FlowMetric).filter(
+                FlowMetric.window == window,
+                FlowMetric.time_bucket >= bucket_start
+            ).delete(synchronize_session=False)
+            results[window] = self.aggregate_metrics(window, since=bucket_start)
+        return results
+    
+    def refresh_range(self, start: datetime, end: datetime) -> Dict[str, Any]:
+        """Recompute the buckets covering [start, end], e.g. after a backfill wrote older transfers"""
+        since = self._get_time_bucket(start, "1d")
+        until = self._get_time_bucket(end, "1d") + timedelta(days=1)
+        return {window: self.aggregate_metrics(window, since=since, until=until) for window in ("1h", "1d")}
+    
+    def refresh_stale(self, start: datetime, end: datetime) -> Optional[Dict[str, Any]]:
+        """Recompute the buckets of [start, end] older than the periodic aggregation covers, e.g. after a sync caught up"""
+        cutoff = aggregation_start()
+        if start >= cutoff:
+            return None
+        return self.refresh_range(start, min(end, cutoff))
+    
+    def rebuild_range(self, since: datetime, until: datetime) -> Dict[str, Any]:
+        """Drop and recompute the buckets in [since, until) (bucket starts), one transaction per window"""
+        results = {}
+        for window in ("1h", "1d"):
+            self._lock()
+            self.db.query(FlowMetric).filter(
+                FlowMetric.window == window,
+                FlowMetric.time_bucket >= since,
+                FlowMetric.time_bucket < until
+            ).delete(synchronize_session=False)
+            results[window] = self.aggregate_metrics(window, since=since, until=until)
+        return results
+    
+    def _lock(self):
+        """Serialize with other aggregation runs until the transaction ends"""
+        if self.db.get_bind().dialect.name == "postgresql":
+            self.db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": AGGREGATE_LOCK_KEY})
+    
     def _get_time_bucket(self, dt: datetime, window: str) -> datetime:
         """Get time bucket for a datetime"""
         if window == "1h":
@@ -0,0 +1,122 @@
+from typing import Any, Dict, Iterable, List, Optional
+from datetime import datetime
+from decimal import Decimal
+from app.core.config import settings
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Redis keys: one JSON value per pending transaction, plus a first-seen index per chain
+FLOW_KEY = "pending-flow:{chain}:{tx_hash}"
+INDEX_KEY = "pending-flows:{chain}"
+STATS_KEY = "pending-flow-stats:{chain}"
+
+_store: Optional["PendingFlowStore"] = None
+
+
+def _json_default(value: Any):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class PendingFlowStore:
+    """Short-lived store of unconfirmed transactions touching labeled addresses (Redis, PENDING_FLOW_TTL_SECONDS).
+    
+    Watchers add matches as they see them in the mempool; the syncs confirm
+    them when the transaction is ingested from a block. Entries that never
+    confirm (dropped or replaced transactions) expire on their own.
+    """
+    
+    def __init__(self, client=None, ttl: int = None):
+        if client is None:
+            import redis
+            client = redis.from_url(settings.REDIS_URL)
+        self.client = client
+        self.ttl = ttl or settings.PENDING_FLOW_TTL_SECONDS
+    
+    def add(self, chain: str, flow: Dict[str, Any]) -> bool:
+        """Record a pending flow, False if the transaction was already recorded"""
+        tx_hash = flow["tx_hash"]
+        now = time.time()
+        flow = dict(flow, chain=chain, seen_at=now)
+        
+        key = FLOW_KEY.format(chain=chain, tx_hash=tx_hash)
+        index = INDEX_KEY.format(chain=chain)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.set(key, json.dumps(flow, default=_json_default), ex=self.ttl, nx=True)
+        pipe.zadd(index, {tx_hash: now}, nx=True)
+        pipe.zremrangebyscore(index, 0, now - self.ttl)
+        added = pipe.execute()[0]
+        if added:
+            self.client.hincrby(STATS_KEY.format(chain=chain), "seen", 1)
+        return bool(added)
+    
+    def confirm(self, chain: str, tx_hashes: Iterable[str]) -> int:
+        """Remove flows whose transactions were ingested from a block, returns how many were pending"""
+        tx_hashes = list(set(tx_hashes))
+        if not tx_hashes:
+            return 0
+        
+        keys = [FLOW_KEY.format(chain=chain, tx_hash=tx_hash) for tx_hash in tx_hashes]
+        index = INDEX_KEY.format(chain=chain)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zmscore(index, tx_hashes)
+        pipe.delete(*keys)
+        pipe.zrem(index, *tx_hashes)
+        seen_scores, confirmed, _ = pipe.execute()
+        
+        if confirmed:
+            now = time.time()
+            delays = [now - score for score in seen_scores if score is not None]
+            self.client.hincrby(STATS_KEY.format(chain=chain), "confirmed", confirmed)
+            if delays:
+                logger.info(
+                    f"{confirmed} pending {chain} flows confirmed, "
+                    f"seen {max(delays):.0f}s to {min(delays):.0f}s before ingestion"
+                )
+        return confirmed
+    
+    def list(self, chain: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recently seen pending flows of a chain"""
+        index = INDEX_KEY.format(chain=chain)
+        tx_hashes = [
+            tx_hash.decode() if isinstance(tx_hash, bytes) else tx_hash
+            for tx_hash in self.client.zrevrange(index, 0, limit - 1)
+        ]
+        if not tx_hashes:
+            return []
+        values = self.client.mget([FLOW_KEY.format(chain=chain, tx_hash=tx_hash) for tx_hash in tx_hashes])
+        return [json.loads(value) for value in values if value is not None]
+    
+    def stats(self, chain: str) -> Dict[str, int]:
+        raw = self.client.hgetall(STATS_KEY.format(chain=chain))
+        return {
+            (k.decode() if isinstance(k, bytes) else k): int(v)
+            for k, v in raw.items()
+        }
+
+
+def get_pending_store() -> PendingFlowStore:
+    """Process-wide pending flow store"""
+    global _store
+    if _store is None:
+        _store = PendingFlowStore()
+    return _store
+
+
+def reconcile_pending(chain: str, transfers: List[Dict[str, Any]]):
+    """Confirm pending flows for transfers just ingested from a block (no-op unless PENDING_FLOWS_ENABLED).
+    
+    The pending store is best effort, a Redis failure never fails the sync.
+    """
+    if not settings.PENDING_FLOWS_ENABLED or not transfers:
+        return
+    try:
+        get_pending_store().confirm(chain, (transfer["tx_hash"] for transfer in transfers))
+    except Exception as e:
+        logger.warning(f"Failed to reconcile pending {chain} flows: {e}")
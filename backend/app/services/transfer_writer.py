@@ -0,0 +1,123 @@
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.db.models import RawTransfer, Chain, TransferDirection
+from app.db.partitions import TransferPartitions
+from app.core.config import settings
+from typing import Any, Dict, List
+import io
+
+# Written explicitly; id and created_at come from the column defaults
+COLUMNS = (
+    "timestamp", "chain", "tx_hash", "block_number", "log_index", "from_address", "to_address",
+    "asset_symbol", "asset_address", "amount", "direction", "exchange_from_id", "exchange_to_id",
+)
+
+# COPY cannot skip rows that already exist, so it fills an unindexed per-connection staging table first
+STAGING_TABLE = "raw_transfers_staging"
+_COLUMN_LIST = ", ".join(COLUMNS)
+CREATE_STAGING_SQL = (
+    f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} ON COMMIT DELETE ROWS "
+    f"AS SELECT {_COLUMN_LIST} FROM raw_transfers WITH NO DATA"
+)
+COPY_SQL = f"COPY {STAGING_TABLE} ({_COLUMN_LIST}) FROM STDIN"
+MERGE_SQL = (
+    f"INSERT INTO raw_transfers ({_COLUMN_LIST}) SELECT {_COLUMN_LIST} FROM {STAGING_TABLE} "
+    f"ON CONFLICT DO NOTHING"
+)
+# DELETE rather than TRUNCATE: a group of blocks writes several times per transaction, and truncating
+# swaps the table's file each time. ON COMMIT DELETE ROWS cleans up the dead rows.
+CLEAR_STAGING_SQL = f"DELETE FROM {STAGING_TABLE}"
+
+# Enum columns store member names, parsers hand over values ("deposit") or members
+CHAIN_NAMES = {chain.value: chain.name for chain in Chain}
+DIRECTION_NAMES = {direction.value: direction.name for direction in TransferDirection}
+
+# COPY text format escapes
+_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+NULL = "\\N"
+
+
+def _text(value: Any) -> str:
+    return NULL if value is None else str(value).translate(_ESCAPES)
+
+
+def _copy_line(transfer: Dict[str, Any]) -> str:
+    """One raw_transfers row in COPY text format"""
+    return "\t".join((
+        transfer["timestamp"].isoformat(" "),
+        CHAIN_NAMES[transfer["chain"]],
+        _text(transfer["tx_hash"]),
+        str(transfer["block_number"]),
+        _text(transfer.get("log_index")),
+        _text(transfer["from_address"]),
+        _text(transfer["to_address"]),
+        _text(transfer["asset_symbol"]),
+        _text(transfer.get("asset_address")),
+        str(transfer["amount"]),
+        DIRECTION_NAMES[transfer["direction"]],
+        _text(transfer.get("exchange_from_id")),
+        _text(transfer.get("exchange_to_id")),
+    )) + "\n"
+
+
+class RawTransferWriter:
+    """Bulk insert of parser transfer dicts into raw_transfers, without ORM objects.
+    
+    Streams rows with COPY on PostgreSQL (psycopg2), and falls back to
+    multi-row INSERT ... VALUES elsewhere. Rows go through the session's
+    connection, so they commit or roll back with the rest of the block.
+    Transfers already stored (same natural key) are skipped, so any block
+    range can be re-ingested, also by several workers at once. Missing
+    monthly partitions are created first, which needs a transaction that
+    has not written to raw_transfers yet (GroupCommit takes care of that).
+    """
+    
+    def __init__(self, db: Session, method: str = None):
+        self.db = db
+        self.method = (method or settings.TRANSFER_WRITE_METHOD).upper()
+    
+    def write(self, transfers: List[Dict[str, Any]]) -> int:
+        """Insert transfers, returns the number of new rows (duplicates are skipped)"""
+        if not transfers:
+            return 0
+        TransferPartitions(self.db).ensure_for(transfer["timestamp"] for transfer in transfers)
+        if self.method == "COPY" and self._copy_supported():
+            return self._copy(transfers)
+        return self._insert(transfers)
+    
+    def _copy_supported(self) -> bool:
+        dialect = self.db.get_bind().dialect
+        return dialect.name == "postgresql" and dialect.driver == "psycopg2"
+    
+    def _copy(self, transfers: List[Dict[str, Any]]) -> int:
+        buffer = io.StringIO("".join(_copy_line(transfer) for transfer in transfers))
+        cursor = self.db.connection().connection.cursor()
+        try:
+            # Created on first use per connection (and again after a rolled back transaction dropped it)
+            cursor.execute(CREATE_STAGING_SQL)
+            cursor.copy_expert(COPY_SQL, buffer)
+            cursor.execute(MERGE_SQL)
+            inserted = cursor.rowcount
+            cursor.execute(CLEAR_STAGING_SQL)
+            return inserted
+        finally:
+            cursor.close()
+    
+    def _insert(self, transfers: List[Dict[str, Any]]) -> int:
+        rows = [{column: transfer.get(column) for column in COLUMNS} for transfer in transfers]
+        # executemany is sent as multi-row VALUES pages of this size (SQLAlchemy insertmanyvalues)
+        statement = self._insert_statement().execution_options(
+            insertmanyvalues_page_size=settings.TRANSFER_INSERT_BATCH_SIZE
+        )
+        return self.db.execute(statement, rows).rowcount
+    
+    def _insert_statement(self):
+        """INSERT that skips existing natural keys where the dialect supports it"""
+        table = RawTransfer.__table__
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            return postgresql.insert(table).on_conflict_do_nothing()
+        if dialect == "sqlite":
+            return sqlite.insert(table).on_conflict_do_nothing()
+        return insert(table)
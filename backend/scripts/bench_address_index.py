@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Benchmark labeled address lookups: dict of dicts (previous _get_labeled_addresses) against AddressIndex
+
+Reports memory and lookups/sec for hits and misses, by address and by event topic (EVM)
+or by scriptPubKey (BTC), with and without the xor filter.
+
+Usage:
+    python scripts/bench_address_index.py                                 # 1M and 10M EVM addresses
+    python scripts/bench_address_index.py --chain btc --sizes 1000000
+    python scripts/bench_address_index.py --sizes 10000000 --dict-max 1000000   # skip the 6 GB dict
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+import uuid
+from app.ingestion.address_index import EVMAddressIndex, BTCAddressIndex
+from app.ingestion.btc.script import address_to_script, script_to_address
+
+EXCHANGES = [str(uuid.UUID(int=i + 1)) for i in range(500)]
+CLUSTERS = [str(uuid.UUID(int=10 ** 6 + i)) for i in range(5000)]
+LABELS = ["hot", "cold", "deposit", "withdraw", "unknown"]
+
+
+def random_address(chain: str, rng: random.Random) -> str:
+    if chain == "evm":
+        return "0x" + rng.randbytes(20).hex()
+    # Mix of P2WPKH, P2PKH and P2TR
+    kind = rng.random()
+    if kind < 0.6:
+        return script_to_address(b"\x00\x14" + rng.randbytes(20))
+    if kind < 0.9:
+        return script_to_address(b"\x76\xa9\x14" + rng.randbytes(20) + b"\x88\xac")
+    return script_to_address(b"\x51\x20" + rng.randbytes(32))
+
+
+def rows(chain: str, count: int, seed: int):
+    """Labeled address rows as the database query yields them"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield (
+            random_address(chain, rng),
+            rng.choice(EXCHANGES),
+            rng.choice(CLUSTERS) if rng.random() < 0.3 else None,
+            rng.choice(LABELS),
+        )
+
+
+def build_dict(chain: str, count: int, seed: int) -> dict:
+    return {
+        address: {"exchange_id": exchange_id, "cluster_id": cluster_id, "label": label}
+        for address, exchange_id, cluster_id, label in rows(chain, count, seed)
+    }
+
+
+def traced(fn):
+    """(result, live traced MB, seconds)"""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current / 1024 / 1024, elapsed
+
+
+def rate(fn, items, repeat: int = 3) -> float:
+    """Best lookups per second over the items"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for item in items:
+            fn(item)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return len(items) / best
+
+
+def probes(chain: str, count: int, seed: int, lookups: int):
+    """(hit addresses, miss addresses) to query"""
+    step = max(1, count // lookups)
+    hits = [row[0] for i, row in enumerate(rows(chain, count, seed)) if i % step == 0][:lookups]
+    rng = random.Random(seed + 1)
+    misses = [random_address(chain, rng) for _ in range(len(hits))]
+    return hits, misses
+
+
+def fast_path_items(chain: str, addresses: list) -> list:
+    """What the parsers query: event topics for EVM, scriptPubKeys for BTC"""
+    if chain == "evm":
+        return ["0x" + "0" * 24 + address[2:] for address in addresses]
+    return [address_to_script(address) for address in addresses]
+
+
+def report(name: str, memory_mb: float, build_s: float, lookups: dict):
+    cells = "  ".join(f"{label} {value / 1000:7.0f}k/s" for label, value in lookups.items())
+    print(f"  {name:<18} {memory_mb:8.1f} MB  build {build_s:6.1f}s  {cells}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chain", choices=("evm", "btc"), default="evm")
+    parser.add_argument("--sizes", default="1000000,10000000", help="Comma-separated labeled address counts")
+    parser.add_argument("--lookups", type=int, default=200000, help="Hit and miss queries per measurement")
+    parser.add_argument("--dict-max", type=int, default=10000000, help="Skip the dict baseline above this size (about 600 bytes per address)")
+    parser.add_argument("--filter-max", type=int, default=10000000, help="Skip the xor filter variant above this size (slow to build)")
+    args = parser.parse_args()
+    
+    index_class = EVMAddressIndex if args.chain == "evm" else BTCAddressIndex
+    seed = 1
+    
+    for count in (int(size) for size in args.sizes.split(",")):
+        hits, misses = probes(args.chain, count, seed, args.lookups)
+        fast_hits, fast_misses = fast_path_items(args.chain, hits), fast_path_items(args.chain, misses)
+        print(f"{args.chain.upper()} {count:,} labeled addresses ({len(hits):,} hit and miss lookups)")
+        
+        if count <= args.dict_max:
+            labeled, memory_mb, build_s = traced(lambda: build_dict(args.chain, count, seed))
+            report("dict", memory_mb, build_s, {"hit": rate(labeled.get, hits), "miss": rate(labeled.get, misses)})
+            del labeled
+            gc.collect()
+        else:
+            print("  dict               skipped (--dict-max)")
+        
+        variants = [("index", False)] + ([("index + xor", True)] if count <= args.filter_max else [])
+        for name, xor_filter in variants:
+            started = time.perf_counter()
+            index = index_class(rows(args.chain, count, seed), xor_filter=xor_filter)
+            build_s = time.perf_counter() - started
+            # What the parsers get, backed by the index itself above ADDRESS_INDEX_SET_MAX
+            if args.chain == "evm":
+                matcher = index.topic_matcher()
+                fast = matcher.__contains__
+            else:
+                matcher = index.script_matcher()
+                fast = matcher.get
+            
+            lookups = {
+                "hit": rate(index.get, hits),
+                "miss": rate(index.get, misses),
+                "fast hit": rate(fast, fast_hits),
+                "fast miss": rate(fast, fast_misses),
+            }
+            report(name, index.size_bytes / 1024 / 1024, build_s, lookups)
+            
+            if any(index.get(address) is None for address in hits) or any(address in index for address in misses):
+                print("WARNING: index lookups are wrong")
+                sys.exit(1)
+            del index, matcher, fast
+            gc.collect()
+        
+        del hits, misses, fast_hits, fast_misses
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark BIP158 filter lookups: hashing each script per block vs FilterQueries' packed lanes
+
+Builds synthetic filters with random block hashes and times BlockFilter.match_any for a set of labeled
+scripts (P2WPKH, P2PKH and P2TR sized), half of the blocks containing one of them.
+
+Usage:
+    python scripts/bench_block_filter.py --scripts 2000 --elements 3000 --blocks 20
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import random
+import time
+from app.ingestion.btc.block_filter import FILTER_M, FILTER_P, BlockFilter, FilterQueries, siphash24
+
+
+def encode_filter(items, block_hash: str) -> bytes:
+    """Golomb-Rice coded filter of items under the block's key"""
+    key_filter = BlockFilter(b"", block_hash)
+    n = len(items)
+    values = sorted({(siphash24(key_filter.k0, key_filter.k1, item) * n * FILTER_M) >> 64 for item in items})
+    bits = []
+    last = 0
+    for value in values:
+        delta = value - last
+        last = value
+        bits.append("1" * (delta >> FILTER_P) + "0" + format(delta & ((1 << FILTER_P) - 1), f"0{FILTER_P}b"))
+    stream = "".join(bits)
+    stream += "0" * (-len(stream) % 8)
+    count = len(values)
+    prefix = bytes([count]) if count < 0xFD else b"\xfd" + count.to_bytes(2, "little")
+    return prefix + int(stream, 2).to_bytes(len(stream) // 8, "big")
+
+
+class PerScript(list):
+    """Queries hashing one script at a time"""
+    
+    def siphash24(self, k0: int, k1: int):
+        return [siphash24(k0, k1, script) for script in self]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scripts", type=int, default=2000, help="Labeled scripts")
+    parser.add_argument("--elements", type=int, default=3000, help="Filter elements per block")
+    parser.add_argument("--blocks", type=int, default=20)
+    args = parser.parse_args()
+    
+    scripts = [random.randbytes(random.choice((22, 25, 34))) for _ in range(args.scripts)]
+    blocks = []
+    for i in range(args.blocks):
+        block_hash = random.randbytes(32).hex()
+        items = [random.randbytes(25) for _ in range(args.elements)] + ([scripts[i]] if i % 2 else [])
+        blocks.append(BlockFilter(encode_filter(items, block_hash), block_hash))
+    
+    start = time.perf_counter()
+    queries = FilterQueries(scripts)
+    prepare = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    scalar_matches = [block_filter.match_any(PerScript(set(scripts))) for block_filter in blocks]
+    scalar = (time.perf_counter() - start) / args.blocks
+    
+    start = time.perf_counter()
+    packed_matches = [block_filter.match_any(queries) for block_filter in blocks]
+    packed = (time.perf_counter() - start) / args.blocks
+    
+    assert scalar_matches == packed_matches
+    print(f"Scripts: {args.scripts}, filter elements: {args.elements}, matching blocks: {sum(packed_matches)}/{args.blocks}")
+    print(f"per script   {scalar * 1000:>8.2f} ms/block")
+    print(f"packed       {packed * 1000:>8.2f} ms/block ({prepare * 1000:.1f} ms to prepare once)")
+    print(f"Speedup: {scalar / packed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Benchmark BTCSync._parse_block on getblock verbosity 3 JSON against _parse_raw_block on the serialized block
+
+Measures CPU time and peak traced memory of decoding the response body and parsing it.
+
+Usage:
+    python scripts/bench_btc_parser.py                      # synthetic ~2 MB block
+    python scripts/bench_btc_parser.py --fetch 840000       # from BTC_RPC_URL (needs Core 23.0+)
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import gc
+import hashlib
+import json
+import random
+import struct
+import time
+import tracemalloc
+from app.ingestion.btc.sync import BTCSync
+from app.ingestion.btc.outpoints import OutpointIndex, to_sats
+from app.ingestion.btc.raw_block import RawBlock
+from app.ingestion.btc.script import script_to_address
+from app.ingestion.address_index import BTCAddressIndex
+
+
+def varint(n: int) -> bytes:
+    if n < 0xFD:
+        return bytes([n])
+    if n <= 0xFFFF:
+        return b"\xfd" + struct.pack("<H", n)
+    return b"\xfe" + struct.pack("<I", n)
+
+
+def p2wpkh(program: bytes) -> bytes:
+    return b"\x00\x14" + program
+
+
+def synthetic_block(tx_count: int, labeled_scripts: list, hit_rate: float):
+    """Serialized segwit block plus the prevouts of its inputs as (txid, vout) -> (script, sats)"""
+    prevouts = {}
+    txs = []
+    for _ in range(tx_count):
+        inputs, witness = b"", b""
+        for _ in range(2):
+            prev_txid = random.randbytes(32)
+            vout = random.randint(0, 3)
+            script = random.choice(labeled_scripts) if random.random() < hit_rate else p2wpkh(random.randbytes(20))
+            prevouts[(prev_txid[::-1].hex(), vout)] = (script, random.randint(10 ** 4, 10 ** 8))
+            inputs += prev_txid + struct.pack("<I", vout) + b"\x00" + struct.pack("<I", 0xFFFFFFFD)
+            witness += b"\x02" + b"\x48" + random.randbytes(72) + b"\x21" + random.randbytes(33)
+        outputs = b""
+        for _ in range(2):
+            script = random.choice(labeled_scripts) if random.random() < hit_rate else p2wpkh(random.randbytes(20))
+            outputs += struct.pack("<Q", random.randint(10 ** 4, 10 ** 8)) + varint(len(script)) + script
+        txs.append(
+            struct.pack("<I", 2) + b"\x00\x01" + varint(2) + inputs + varint(2) + outputs + witness + struct.pack("<I", 0)
+        )
+    
+    header = struct.pack("<I", 0x20000000) + random.randbytes(64) + struct.pack("<III", int(time.time()), 0x17034219, 0)
+    return header + varint(len(txs)) + b"".join(txs), prevouts
+
+
+def to_verbosity3(raw: bytes, prevouts: dict, height: int) -> dict:
+    """getblock verbosity 3 shaped JSON for a serialized block"""
+    block = RawBlock(raw)
+    
+    def script_json(script: bytes) -> dict:
+        result = {"asm": "", "desc": "", "hex": script.hex(), "type": "witness_v0_keyhash"}
+        address = script_to_address(script)
+        if address:
+            result["address"] = address
+        return result
+    
+    txs = []
+    for tx in block.transactions():
+        vin = []
+        for prev_txid, vout in tx.inputs:
+            txid_hex = prev_txid[::-1].hex()
+            entry = {"txid": txid_hex, "vout": vout, "scriptSig": {"asm": "", "hex": ""},
+                     "txinwitness": [random.randbytes(72).hex(), random.randbytes(33).hex()], "sequence": 4294967293}
+            if (txid_hex, vout) in prevouts:
+                script, value = prevouts[(txid_hex, vout)]
+                entry["prevout"] = {"generated": False, "height": height - 1, "value": value / 1e8,
+                                    "scriptPubKey": script_json(script)}
+            vin.append(entry)
+        txs.append({
+            "txid": tx.txid, "hash": tx.txid, "version": 2, "size": 370, "vsize": 208, "weight": 832, "locktime": 0,
+            "vin": vin,
+            "vout": [{"value": value / 1e8, "n": n, "scriptPubKey": script_json(script)}
+                     for n, (value, script) in enumerate(tx.outputs)],
+            "fee": 0.00001, "hex": random.randbytes(370).hex(),
+        })
+    return {"hash": block.hash, "height": height, "time": block.timestamp, "nTx": len(txs), "tx": txs}
+
+
+def fetch_block(height: int):
+    from app.ingestion.btc.core_rpc import BitcoinCoreRPC
+    rpc = BitcoinCoreRPC()
+    block_hash = rpc.get_block_hash(height)
+    raw = rpc.get_raw_block(block_hash)
+    block_json = rpc.get_block(block_hash, verbosity=3)
+    prevouts = {}
+    for tx in block_json["tx"]:
+        for input_tx in tx["vin"]:
+            if "prevout" in input_tx:
+                prevout = input_tx["prevout"]
+                prevouts[(input_tx["txid"], input_tx["vout"])] = (
+                    bytes.fromhex(prevout["scriptPubKey"]["hex"]), to_sats(prevout["value"])
+                )
+    return raw, json.dumps({"result": block_json}), prevouts
+
+
+def measure(fn, repeat: int):
+    """(best cpu seconds, peak traced MB, result); tracing slows allocations so it gets its own run"""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.process_time()
+        result = fn()
+        elapsed = time.process_time() - started
+        best = elapsed if best is None else min(best, elapsed)
+    
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 1024 / 1024, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fetch", type=int, help="Fetch this block height from BTC_RPC_URL")
+    parser.add_argument("--txs", type=int, default=5000, help="Synthetic block transaction count")
+    parser.add_argument("--labeled", type=int, default=2000, help="Number of labeled addresses")
+    parser.add_argument("--hit-rate", type=float, default=0.01, help="Share of synthetic scripts paying a labeled address")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    
+    random.seed(1)
+    labeled_scripts = [p2wpkh(hashlib.sha256(b"labeled%d" % i).digest()[:20]) for i in range(args.labeled)]
+    
+    height = args.fetch if args.fetch is not None else 840000
+    if args.fetch is not None:
+        raw, json_body, prevouts = fetch_block(args.fetch)
+        # Label a sample of real output scripts so the block has matches
+        sample = [script for _, script in [o for tx in RawBlock(raw).transactions() for o in tx.outputs][::100]]
+        labeled_scripts += sample
+    else:
+        raw, prevouts = synthetic_block(args.txs, labeled_scripts, args.hit_rate)
+        json_body = json.dumps({"result": to_verbosity3(raw, prevouts, height)})
+    raw_body = json.dumps({"result": raw.hex()})
+    
+    labeled = BTCAddressIndex(
+        (script_to_address(script), "bench", None, "hot") for script in labeled_scripts if script_to_address(script)
+    )
+    
+    # The raw path resolves inputs from the outpoint index (LABELED mode), seed it like the live sync would
+    index = OutpointIndex(":memory:")
+    index.apply_block(height - 1, [
+        (txid, vout, script_to_address(script), value)
+        for (txid, vout), (script, value) in prevouts.items()
+        if script_to_address(script) in labeled
+    ], [])
+    
+    sync = BTCSync(None, update_outpoints=False)
+    sync.outpoints = index
+    sync.outpoint_mode = "LABELED"
+    # Seeded just below the block, so misses are not looked up on a node
+    sync.index_start = height - 1
+    
+    # Built once per labeled set by the sync, not per block
+    labeled.script_matcher()
+    
+    json_cpu, json_mem, json_transfers = measure(
+        lambda: sync._parse_block(json.loads(json_body)["result"], labeled, height), args.repeat
+    )
+    raw_cpu, raw_mem, raw_transfers = measure(
+        lambda: sync._parse_raw_block(bytes.fromhex(json.loads(raw_body)["result"]), labeled, height), args.repeat
+    )
+    
+    print(f"Block: {len(raw) / 1024 / 1024:.2f} MB serialized, {RawBlock(raw).tx_count} txs, "
+          f"JSON body {len(json_body) / 1024 / 1024:.1f} MB, labeled {len(labeled)}")
+    print(f"JSON (verbosity 3): {json_cpu * 1000:8.1f} ms CPU, {json_mem:7.1f} MB peak, {len(json_transfers)} transfers")
+    print(f"RAW  (verbosity 0): {raw_cpu * 1000:8.1f} ms CPU, {raw_mem:7.1f} MB peak, {len(raw_transfers)} transfers")
+    
+    if len(json_transfers) != len(raw_transfers):
+        print("WARNING: transfer counts differ")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark saving blocks with one commit per block vs group commit
+
+Drives EVMSync._save_block (block hash, transfers, sync state) with synthetic
+blocks far above any real height against DATABASE_URL, then deletes them and
+restores the EVM sync state. Use a development database.
+
+Usage:
+    python scripts/bench_group_commit.py --blocks 2000 --transfers 5 --groups 1 10 50 200
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import hashlib
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from app.db.session import SessionLocal
+from app.db.models import BlockHash, Chain, RawTransfer, SyncState
+from app.ingestion.evm.sync import EVMSync
+from app.ingestion.group_commit import GroupCommit
+
+# Synthetic heights, well above any real chain
+FIRST_BLOCK = 900000000
+
+
+def block_hash(number: int, run: int) -> str:
+    return "0x" + hashlib.sha256(f"{run}:{number}".encode()).hexdigest()
+
+
+def synthetic_block(number: int, count: int):
+    timestamp = datetime.utcnow().replace(microsecond=0) - timedelta(days=1)
+    return [
+        {
+            "chain": "EVM",
+            "tx_hash": "0x" + random.randbytes(32).hex(),
+            "block_number": number,
+            "log_index": i,
+            "from_address": "0x" + random.randbytes(20).hex(),
+            "to_address": "0x" + random.randbytes(20).hex(),
+            "asset_symbol": "USDT",
+            "asset_address": "0xdac17f958d2ee523a2206206994597c13d831ec7",
+            "amount": Decimal(random.randint(1, 10 ** 12)) / Decimal(10 ** 6),
+            "direction": "deposit",
+            "exchange_from_id": None,
+            "exchange_to_id": None,
+            "timestamp": timestamp,
+        }
+        for i in range(count)
+    ]
+
+
+def cleanup(db):
+    db.query(RawTransfer).filter(
+        RawTransfer.chain == Chain.EVM,
+        RawTransfer.block_number >= FIRST_BLOCK
+    ).delete(synchronize_session=False)
+    db.query(BlockHash).filter(
+        BlockHash.chain == Chain.EVM,
+        BlockHash.height >= FIRST_BLOCK
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+def bench(group: int, blocks: int, transfers: int, run: int) -> float:
+    db = SessionLocal()
+    try:
+        sync = EVMSync(db)
+        sync.commits = GroupCommit(db, Chain.EVM, max_blocks=group, max_ms=60000)
+        sync_state = db.query(SyncState).filter(SyncState.chain == Chain.EVM).first()
+        block_data = [synthetic_block(FIRST_BLOCK + i, transfers) for i in range(blocks)]
+        
+        start = time.perf_counter()
+        for i, block_transfers in enumerate(block_data):
+            number = FIRST_BLOCK + i
+            parent = block_hash(number - 1, run) if i else None
+            sync.headers[number] = (block_hash(number, run), parent)
+            sync._save_block(sync_state, number, block_transfers)
+        sync.commits.commit()
+        elapsed = time.perf_counter() - start
+    finally:
+        db.rollback()
+        cleanup(db)
+        db.close()
+    print(f"group {group:<4} {blocks / elapsed:>8,.0f} blocks/sec ({elapsed:.2f}s)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=2000)
+    parser.add_argument("--transfers", type=int, default=5, help="Transfers per block")
+    parser.add_argument("--groups", type=int, nargs="+", default=[1, 10, 50, 200], help="Blocks per commit to compare")
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    sync_state = db.query(SyncState).filter(SyncState.chain == Chain.EVM).first()
+    if sync_state is None:
+        sync_state = SyncState(chain=Chain.EVM, last_processed_block=None)
+        db.add(sync_state)
+        db.commit()
+    saved = sync_state.last_processed_block
+    cleanup(db)
+    
+    print(f"Blocks: {args.blocks}, transfers per block: {args.transfers}")
+    try:
+        timings = {group: bench(group, args.blocks, args.transfers, run) for run, group in enumerate(args.groups)}
+    finally:
+        sync_state = db.query(SyncState).filter(SyncState.chain == Chain.EVM).first()
+        sync_state.last_processed_block = saved
+        db.commit()
+        db.close()
+    
+    baseline = timings[args.groups[0]]
+    speedups = ", ".join(f"{group}: {baseline / elapsed:.1f}x" for group, elapsed in timings.items())
+    print(f"Speedup over {args.groups[0]} block(s) per commit: {speedups}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Benchmark ERC20 receipt log parsing (logs/sec before and after the topic fast path)
+
+Usage:
+    python scripts/bench_parser.py                          # synthetic busy block
+    python scripts/bench_parser.py --fetch 19000000 --save block.json
+    python scripts/bench_parser.py --block block.json --labeled 5000
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import json
+import random
+import time
+from decimal import Decimal
+from datetime import datetime
+from app.ingestion.address_index import EVMAddressIndex
+from app.ingestion.evm.parser import EVMParser, TRANSFER_EVENT_SIGNATURE
+from app.ingestion.evm.tokens import TokenMetadataCache, placeholder_symbol, DEFAULT_DECIMALS
+
+
+def legacy_parse_receipt_logs(receipt, block, labeled_addresses, token_cache):
+    """Previous implementation: decode every Transfer log, then check labels"""
+    transfers = []
+    timestamp = datetime.fromtimestamp(int(block["timestamp"], 16))
+    block_number = int(block["number"], 16)
+    
+    for position, log in enumerate(receipt["logs"]):
+        if not log.get("topics") or len(log["topics"]) < 3:
+            continue
+        if log["topics"][0].lower() != TRANSFER_EVENT_SIGNATURE.lower():
+            continue
+        
+        from_addr = "0x" + log["topics"][1][-40:].lower()
+        to_addr = "0x" + log["topics"][2][-40:].lower()
+        amount = Decimal(int(log.get("data", "0x0"), 16))
+        
+        from_exchange = labeled_addresses.get(from_addr)
+        to_exchange = labeled_addresses.get(to_addr)
+        if not (from_exchange or to_exchange):
+            continue
+        
+        token_address = log["address"].lower()
+        metadata = token_cache.lookup(token_address)
+        asset_symbol, decimals = metadata or (placeholder_symbol(token_address), DEFAULT_DECIMALS)
+        transfers.append({
+            "timestamp": timestamp,
+            "block_number": block_number,
+            "log_index": int(log["logIndex"], 16) if log.get("logIndex") else position,
+            "from_address": from_addr,
+            "to_address": to_addr,
+            "asset_symbol": asset_symbol,
+            "amount": amount / Decimal(10**decimals),
+        })
+    
+    return transfers
+
+
+def random_address() -> str:
+    return "0x" + "%040x" % random.getrandbits(160)
+
+
+def synthetic_block(tx_count: int, logs_per_tx: int, labeled: list, hit_rate: float):
+    """Busy-block shaped receipts: mostly Transfer logs between unlabeled addresses"""
+    other_topic = "0x" + "%064x" % random.getrandbits(256)
+    receipts = []
+    log_index = 0
+    for _ in range(tx_count):
+        logs = []
+        for _ in range(logs_per_tx):
+            if random.random() < 0.6:
+                from_addr = random.choice(labeled) if random.random() < hit_rate else random_address()
+                topics = [TRANSFER_EVENT_SIGNATURE, "0x" + "0" * 24 + from_addr[2:], "0x" + "0" * 24 + random_address()[2:]]
+            else:
+                topics = [other_topic, "0x" + "%064x" % random.getrandbits(256)]
+            logs.append({
+                "address": random_address(),
+                "topics": topics,
+                "data": "0x" + "%064x" % random.getrandbits(80),
+                "logIndex": hex(log_index),
+            })
+            log_index += 1
+        receipts.append({"transactionHash": "0x" + "%064x" % random.getrandbits(256), "logs": logs})
+    
+    block = {"number": hex(19000000), "timestamp": hex(int(time.time()))}
+    return block, receipts
+
+
+def fetch_block(block_number: int):
+    from app.ingestion.evm.rpc_client import EVMRPCClient
+    client = EVMRPCClient()
+    block = client.get_block(block_number, full_transactions=False)
+    receipts = client.get_block_receipts(block_number)
+    return {"number": block["number"], "timestamp": block["timestamp"]}, receipts
+
+
+def bench(fn, receipts, block, labeled, token_cache, repeat: int):
+    best = None
+    transfers = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        transfers = sum(len(fn(receipt, block, labeled, token_cache)) for receipt in receipts)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, transfers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--block", help="Recorded block JSON ({\"block\": ..., \"receipts\": [...]})")
+    parser.add_argument("--fetch", type=int, help="Fetch this block from EVM_RPC_URL")
+    parser.add_argument("--save", help="Save the fetched block to this file")
+    parser.add_argument("--labeled", type=int, default=5000, help="Number of labeled addresses")
+    parser.add_argument("--txs", type=int, default=1500, help="Synthetic block transaction count")
+    parser.add_argument("--logs-per-tx", type=int, default=8)
+    parser.add_argument("--hit-rate", type=float, default=0.005, help="Share of synthetic Transfer logs from a labeled address")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    random.seed(1)
+    labeled_list = [random_address() for _ in range(args.labeled)]
+    
+    if args.fetch is not None:
+        block, receipts = fetch_block(args.fetch)
+        if args.save:
+            with open(args.save, "w") as f:
+                json.dump({"block": block, "receipts": receipts}, f)
+    elif args.block:
+        with open(args.block) as f:
+            recorded = json.load(f)
+        block, receipts = recorded["block"], recorded["receipts"]
+    else:
+        block, receipts = synthetic_block(args.txs, args.logs_per_tx, labeled_list, args.hit_rate)
+    
+    if args.fetch is not None or args.block:
+        # Label a few real senders so the recorded block has matches
+        senders = [
+            "0x" + log["topics"][1][-40:].lower()
+            for receipt in receipts for log in receipt["logs"]
+            if len(log.get("topics", [])) >= 3 and log["topics"][0] == TRANSFER_EVENT_SIGNATURE
+        ]
+        labeled_list += senders[::200]
+    
+    labeled = {
+        address: {"exchange_id": "bench", "cluster_id": None, "label": "hot"}
+        for address in labeled_list
+    }
+    token_cache = TokenMetadataCache(maxsize=100000)
+    log_count = sum(len(receipt["logs"]) for receipt in receipts)
+    
+    index = EVMAddressIndex((address, "bench", None, "hot") for address in labeled_list)
+    
+    before, before_transfers = bench(legacy_parse_receipt_logs, receipts, block, labeled, token_cache, args.repeat)
+    after, after_transfers = bench(EVMParser.parse_receipt_logs, receipts, block, index, token_cache, args.repeat)
+    
+    print(f"Receipts: {len(receipts)}, logs: {log_count}, labeled: {len(labeled)}")
+    print(f"Before: {log_count / before:,.0f} logs/sec ({before * 1000:.1f} ms, {before_transfers} transfers)")
+    print(f"After:  {log_count / after:,.0f} logs/sec ({after * 1000:.1f} ms, {after_transfers} transfers)")
+    print(f"Speedup: {before / after:.1f}x")
+    
+    if before_transfers != after_transfers:
+        print("WARNING: transfer counts differ")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
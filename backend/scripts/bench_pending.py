@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark pending transaction matching of the EVM and BTC mempool watchers
+
+Feeds synthetic transactions through each watcher's handle() with an in-memory
+flow store, so the numbers are the per-process matching ceiling (Redis writes
+only happen for the few matches).
+
+Usage:
+    python scripts/bench_pending.py --txs 50000 --labeled 100000
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import hashlib
+import random
+import struct
+import time
+from app.ingestion.address_index import BTCAddressIndex, EVMAddressIndex
+from app.ingestion.btc.mempool_watcher import MempoolWatcher
+from app.ingestion.btc.script import script_to_address
+from app.ingestion.evm.parser import TRANSFER_SELECTOR
+from app.ingestion.evm.pending_watcher import PendingTransactionWatcher
+from app.ingestion.evm.tokens import TokenMetadataCache
+
+
+class MemoryStore:
+    def __init__(self):
+        self.flows = {}
+    
+    def add(self, chain, flow):
+        self.flows[(chain, flow["tx_hash"])] = flow
+        return True
+
+
+def random_address() -> str:
+    return "0x" + random.randbytes(20).hex()
+
+
+def evm_transaction(labeled: list, hit_rate: float) -> dict:
+    to_addr = random.choice(labeled) if random.random() < hit_rate else random_address()
+    tx = {"hash": "0x" + random.randbytes(32).hex(), "from": random_address(), "value": "0x0", "input": "0x"}
+    if random.random() < 0.5:
+        tx["to"] = to_addr
+        tx["value"] = hex(random.randint(10 ** 15, 10 ** 19))
+    else:
+        tx["to"] = random_address()
+        tx["input"] = TRANSFER_SELECTOR + to_addr[2:].rjust(64, "0") + hex(random.randint(1, 10 ** 12))[2:].rjust(64, "0")
+    return tx
+
+
+def btc_transaction(labeled_scripts: list, hit_rate: float) -> bytes:
+    inputs = b"".join(
+        random.randbytes(32) + struct.pack("<I", 0) + b"\x00" + struct.pack("<I", 0xFFFFFFFD) for _ in range(2)
+    )
+    outputs = b""
+    for _ in range(2):
+        script = random.choice(labeled_scripts) if random.random() < hit_rate else b"\x00\x14" + random.randbytes(20)
+        outputs += struct.pack("<Q", random.randint(10 ** 4, 10 ** 8)) + bytes([len(script)]) + script
+    witness = (b"\x02\x48" + random.randbytes(72) + b"\x21" + random.randbytes(33)) * 2
+    return struct.pack("<I", 2) + b"\x00\x01\x02" + inputs + b"\x02" + outputs + witness + struct.pack("<I", 0)
+
+
+def rate(handle, messages) -> float:
+    start = time.perf_counter()
+    for message in messages:
+        handle(message)
+    return len(messages) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--txs", type=int, default=50000, help="Transactions per chain")
+    parser.add_argument("--labeled", type=int, default=100000, help="Number of labeled addresses per chain")
+    parser.add_argument("--hit-rate", type=float, default=0.01, help="Share of transactions paying a labeled address")
+    args = parser.parse_args()
+    
+    random.seed(1)
+    labeled = [random_address() for _ in range(args.labeled)]
+    evm = PendingTransactionWatcher(store=MemoryStore())
+    evm.labeled = EVMAddressIndex((address, "bench", None, "hot") for address in labeled)
+    evm.token_cache = TokenMetadataCache(maxsize=1000)
+    evm_txs = [evm_transaction(labeled, args.hit_rate) for _ in range(args.txs)]
+    evm_rate = rate(evm.handle, evm_txs)
+    
+    labeled_scripts = [b"\x00\x14" + hashlib.sha256(b"labeled%d" % i).digest()[:20] for i in range(args.labeled)]
+    btc = MempoolWatcher(store=MemoryStore())
+    btc.labeled = BTCAddressIndex((script_to_address(script), "bench", None, "hot") for script in labeled_scripts)
+    btc.labeled.script_matcher()
+    btc_txs = [[b"rawtx", btc_transaction(labeled_scripts, args.hit_rate), struct.pack("<I", i)] for i in range(args.txs)]
+    btc_rate = rate(btc.handle, btc_txs)
+    
+    print(f"Transactions: {args.txs} per chain, labeled: {args.labeled}, hit rate: {args.hit_rate}")
+    print(f"EVM: {evm_rate:,.0f} tx/sec ({evm.stats['matched']} matched)")
+    print(f"BTC: {btc_rate:,.0f} tx/sec ({btc.stats['matched']} matched, {btc.stats['invalid']} invalid)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark writing raw transfers: ORM objects vs multi-row INSERT vs COPY
+
+Runs against DATABASE_URL (PostgreSQL for COPY). Each run writes into an open
+transaction that is rolled back, so the database is left unchanged.
+
+Usage:
+    python scripts/bench_transfer_writer.py --rows 50000 --block-size 200
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from app.db.session import SessionLocal
+from app.db.models import RawTransfer
+from app.db.partitions import TransferPartitions
+from app.services.transfer_writer import RawTransferWriter
+
+
+def synthetic_transfers(count: int):
+    start = datetime(2024, 1, 1)
+    directions = ["deposit", "withdraw", "internal", "unknown"]
+    return [
+        {
+            "chain": "EVM",
+            "tx_hash": "0x" + random.randbytes(32).hex(),
+            "block_number": 19000000 + i // 200,
+            "log_index": i % 200,
+            "from_address": "0x" + random.randbytes(20).hex(),
+            "to_address": "0x" + random.randbytes(20).hex(),
+            "asset_symbol": "USDT",
+            "asset_address": "0xdac17f958d2ee523a2206206994597c13d831ec7",
+            "amount": Decimal(random.randint(1, 10 ** 12)) / Decimal(10 ** 6),
+            "direction": random.choice(directions),
+            "exchange_from_id": None,
+            "exchange_to_id": None,
+            "timestamp": start + timedelta(seconds=12 * (i // 200)),
+        }
+        for i in range(count)
+    ]
+
+
+def orm_write(db, transfers):
+    TransferPartitions(db).ensure_for(transfer["timestamp"] for transfer in transfers)
+    for transfer_data in transfers:
+        db.add(RawTransfer(**transfer_data))
+    db.flush()
+
+
+def bench(name, write, transfers, block_size: int) -> float:
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        for i in range(0, len(transfers), block_size):
+            write(db, transfers[i:i + block_size])
+        elapsed = time.perf_counter() - start
+    finally:
+        db.rollback()
+        db.close()
+    print(f"{name:<7} {len(transfers) / elapsed:>10,.0f} rows/sec ({elapsed:.2f}s)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--block-size", type=int, default=200, help="Transfers written per call, like one block")
+    args = parser.parse_args()
+    
+    transfers = synthetic_transfers(args.rows)
+    print(f"Rows: {args.rows}, per write: {args.block_size}")
+    orm = bench("ORM", orm_write, transfers, args.block_size)
+    insert = bench("INSERT", lambda db, rows: RawTransferWriter(db, "INSERT").write(rows), transfers, args.block_size)
+    copy = bench("COPY", lambda db, rows: RawTransferWriter(db, "COPY").write(rows), transfers, args.block_size)
+    print(f"Speedup over ORM: INSERT {orm / insert:.1f}x, COPY {orm / copy:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Local Esplora-compatible stub serving synthetic blocks, for running BTC_MODE=EXPLORER without a provider
+
+Usage:
+    python scripts/esplora_stub.py --port 3002 --blocks 10 --txs 3000
+    BTC_MODE=EXPLORER BTC_EXPLORER_BASE_URL=http://127.0.0.1:3002 ...
+
+Serves /blocks/tip/height, /block-height/{h}, /block/{hash}, /block/{hash}/txids,
+/block/{hash}/txs/{start} and /tx/{txid}, and prints request counts per route on exit.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import time
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+PAGE_SIZE = 25
+
+
+def _hash(*parts) -> str:
+    return hashlib.sha256(":".join(str(p) for p in parts).encode()).hexdigest()
+
+
+def build_chain(block_count: int, tx_count: int, addresses: list, start_height: int):
+    """Synthetic chain where each transaction spends an output of the previous block"""
+    blocks, txs = [], {}
+    prev_txids = []
+    for i in range(block_count):
+        height = start_height + i
+        block_hash = _hash("block", height)
+        block_txids = []
+        for j in range(tx_count):
+            txid = _hash("tx", height, j)
+            if j == 0 or not prev_txids:
+                vin = [{"is_coinbase": True, "scriptsig": "03" + "%06x" % height, "sequence": 4294967295}]
+            else:
+                prev_txid = random.choice(prev_txids)
+                prev = txs[prev_txid]["vout"][0]
+                vin = [{"txid": prev_txid, "vout": 0, "prevout": prev, "is_coinbase": False, "sequence": 4294967293}]
+            vout = [
+                {
+                    "scriptpubkey": "0014" + _hash("spk", txid, n)[:40],
+                    "scriptpubkey_type": "v0_p2wpkh",
+                    "scriptpubkey_address": random.choice(addresses),
+                    "value": random.randint(1000, 10 ** 8),
+                }
+                for n in range(2)
+            ]
+            txs[txid] = {"txid": txid, "vin": vin, "vout": vout}
+            block_txids.append(txid)
+        blocks.append({
+            "id": block_hash,
+            "height": height,
+            "timestamp": int(time.time()) - (block_count - i) * 600,
+            "tx_count": tx_count,
+            "txids": block_txids,
+        })
+        prev_txids = block_txids
+    return blocks, txs
+
+
+def make_handler(blocks, txs, counts, delay):
+    by_height = {b["height"]: b for b in blocks}
+    by_hash = {b["id"]: b for b in blocks}
+    
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+        
+        def send(self, body, status=200):
+            data = (body if isinstance(body, str) else json.dumps(body)).encode()
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        
+        def do_GET(self):
+            time.sleep(delay)
+            path = self.path.rstrip("/")
+            if path == "/blocks/tip/height":
+                counts["tip"] += 1
+                return self.send(str(blocks[-1]["height"]))
+            match = re.fullmatch(r"/block-height/(\d+)", path)
+            if match and int(match.group(1)) in by_height:
+                counts["block-height"] += 1
+                return self.send(by_height[int(match.group(1))]["id"])
+            match = re.fullmatch(r"/block/([0-9a-f]{64})(/txids|/txs/(\d+))?", path)
+            if match and match.group(1) in by_hash:
+                block = by_hash[match.group(1)]
+                if match.group(2) is None:
+                    counts["block"] += 1
+                    return self.send({k: v for k, v in block.items() if k != "txids"})
+                if match.group(2) == "/txids":
+                    counts["txids"] += 1
+                    return self.send(block["txids"])
+                counts["txs-page"] += 1
+                start = int(match.group(3))
+                return self.send([txs[txid] for txid in block["txids"][start:start + PAGE_SIZE]])
+            match = re.fullmatch(r"/tx/([0-9a-f]{64})", path)
+            if match and match.group(1) in txs:
+                counts["tx"] += 1
+                return self.send(txs[match.group(1)])
+            return self.send("Not found", status=404)
+    
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Esplora-compatible stub")
+    parser.add_argument("--port", type=int, default=3002)
+    parser.add_argument("--blocks", type=int, default=10)
+    parser.add_argument("--txs", type=int, default=3000, help="Transactions per block")
+    parser.add_argument("--start-height", type=int, default=800000)
+    parser.add_argument("--addresses", nargs="*", default=["bc1qstubexchangehotwallet0000000000000000"],
+                        help="Addresses to pay (label some of them to get transfers)")
+    parser.add_argument("--delay-ms", type=float, default=0, help="Added latency per request")
+    args = parser.parse_args()
+    
+    random.seed(1)
+    addresses = args.addresses + [f"bc1qstub{i:032d}" for i in range(1000)]
+    blocks, txs = build_chain(args.blocks, args.txs, addresses, args.start_height)
+    counts = Counter()
+    
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(blocks, txs, counts, args.delay_ms / 1000))
+    print(f"Serving {args.blocks} blocks ({blocks[0]['height']}-{blocks[-1]['height']}) on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Requests: {dict(counts)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Local EVM JSON-RPC stand-in with a growing chain that reorganizes, for exercising the sync's fork handling without a node
+
+Usage:
+    python scripts/evm_rpc_stub.py --interval 2 --reorg-every 5 --reorg-depth 3 --addresses 0xYourLabeledAddress
+    EVM_RPC_URL=http://127.0.0.1:8545 python -c "from app.ingestion.tasks import evm_sync_task; evm_sync_task()"
+    curl http://127.0.0.1:8545/canonical    # tx hashes paying --addresses on the current chain
+    python scripts/evm_rpc_stub.py --port 8545 8546 --no-block-receipts 8546    # two endpoints of one chain
+    EVM_RPC_URLS=http://127.0.0.1:8545,http://127.0.0.1:8546 python -c "..."
+
+Answers eth_blockNumber, eth_getBlockByNumber, eth_getBlockReceipts and eth_getTransactionReceipt, single or
+batched. Every block pays each of --addresses once; a reorg replaces the last --reorg-depth blocks with a fork whose
+transactions (and hashes) differ. After a sync, raw_transfers should hold exactly the /canonical hashes up to its
+last processed block. Each --port serves the same chain; ports listed in --no-block-receipts answer
+eth_getBlockReceipts with "method not found", like nodes without it.
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+def _hash(*parts) -> str:
+    return "0x" + hashlib.sha256(":".join(str(p) for p in parts).encode()).hexdigest()
+
+
+class Chain:
+    def __init__(self, start: int, addresses: list, txs_per_block: int):
+        self.addresses = [address.lower() for address in addresses]
+        self.txs_per_block = txs_per_block
+        self.fork = 0
+        self.lock = threading.Lock()
+        self.blocks = []
+        self.reorgs = 0
+        self.append(start)
+    
+    def append(self, number: int = None):
+        number = self.blocks[-1]["number"] + 1 if number is None else number
+        parent = self.blocks[-1]["hash"] if self.blocks else _hash("genesis")
+        block_hash = _hash("block", number, self.fork)
+        txs = [
+            {
+                "hash": _hash("tx", number, self.fork, i),
+                "from": "0x" + random.randbytes(20).hex(),
+                "to": self.addresses[i] if i < len(self.addresses) else "0x" + random.randbytes(20).hex(),
+                "value": hex(random.randint(10 ** 15, 10 ** 19)),
+                "input": "0x",
+                "blockNumber": hex(number),
+                "blockHash": block_hash,
+                "transactionIndex": hex(i),
+            }
+            for i in range(max(self.txs_per_block, len(self.addresses)))
+        ]
+        self.blocks.append({
+            "number": number,
+            "hash": block_hash,
+            "parentHash": parent,
+            "timestamp": int(time.time()),
+            "transactions": txs,
+        })
+    
+    def reorg(self, depth: int):
+        """Replace the last depth blocks with a fork one block longer"""
+        depth = min(depth, len(self.blocks) - 1)
+        self.fork += 1
+        self.reorgs += 1
+        del self.blocks[len(self.blocks) - depth:]
+        for _ in range(depth + 1):
+            self.append()
+    
+    def block(self, number: int):
+        offset = number - self.blocks[0]["number"]
+        return self.blocks[offset] if 0 <= offset < len(self.blocks) else None
+    
+    def rpc_block(self, number: int, full: bool):
+        block = self.block(number)
+        if block is None:
+            return None
+        txs = block["transactions"] if full else [tx["hash"] for tx in block["transactions"]]
+        return {
+            "number": hex(block["number"]),
+            "hash": block["hash"],
+            "parentHash": block["parentHash"],
+            "timestamp": hex(block["timestamp"]),
+            "transactions": txs,
+        }
+    
+    def receipt(self, tx: dict, block: dict) -> dict:
+        return {
+            "transactionHash": tx["hash"],
+            "blockNumber": hex(block["number"]),
+            "blockHash": block["hash"],
+            "status": "0x1",
+            "logs": [],
+        }
+    
+    def handle(self, request: dict, block_receipts: bool = True) -> dict:
+        method, params = request.get("method"), request.get("params") or []
+        reply = {"jsonrpc": "2.0", "id": request.get("id")}
+        if method == "eth_getBlockReceipts" and not block_receipts:
+            method = None
+        with self.lock:
+            if method == "eth_blockNumber":
+                reply["result"] = hex(self.blocks[-1]["number"])
+            elif method == "eth_getBlockByNumber":
+                number = self.blocks[-1]["number"] if params[0] == "latest" else int(params[0], 16)
+                reply["result"] = self.rpc_block(number, bool(params[1]))
+            elif method == "eth_getBlockReceipts":
+                block = self.block(int(params[0], 16))
+                reply["result"] = [self.receipt(tx, block) for tx in block["transactions"]] if block else None
+            elif method == "eth_getTransactionReceipt":
+                reply["result"] = next(
+                    (self.receipt(tx, block) for block in self.blocks for tx in block["transactions"] if tx["hash"] == params[0]),
+                    None
+                )
+            else:
+                reply["error"] = {"code": -32601, "message": "the method does not exist/is not available"}
+        return reply
+    
+    def canonical(self) -> dict:
+        with self.lock:
+            return {
+                "head": self.blocks[-1]["number"],
+                "reorgs": self.reorgs,
+                "tx_hashes": [
+                    tx["hash"] for block in self.blocks for tx in block["transactions"] if tx["to"] in self.addresses
+                ],
+            }
+
+
+def produce(chain: Chain, args):
+    """Extend the chain every interval and reorganize it every --reorg-every blocks"""
+    for produced in range(1, 10 ** 9):
+        time.sleep(args.interval)
+        with chain.lock:
+            if args.reorg_every and produced % args.reorg_every == 0:
+                chain.reorg(args.reorg_depth)
+                print(f"reorg: replaced last {args.reorg_depth} blocks, head {chain.blocks[-1]['number']}")
+            else:
+                chain.append()
+                print(f"head {chain.blocks[-1]['number']}")
+
+
+def make_handler(chain: Chain, block_receipts: bool = True):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+        
+        def send(self, body):
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        
+        def do_GET(self):
+            self.send(chain.canonical())
+        
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if isinstance(request, list):
+                return self.send([chain.handle(item, block_receipts) for item in request])
+            return self.send(chain.handle(request, block_receipts))
+    
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, nargs="+", default=[8545], help="Ports serving the chain, one endpoint each")
+    parser.add_argument("--no-block-receipts", type=int, nargs="*", default=[], help="Ports without eth_getBlockReceipts")
+    parser.add_argument("--start", type=int, default=19000000, help="First block number")
+    parser.add_argument("--interval", type=float, default=2, help="Seconds between blocks")
+    parser.add_argument("--reorg-every", type=int, default=5, help="Reorganize every N blocks (0 never)")
+    parser.add_argument("--reorg-depth", type=int, default=3, help="Blocks replaced by each reorg")
+    parser.add_argument("--txs", type=int, default=20, help="Transactions per block")
+    parser.add_argument("--addresses", nargs="*", default=["0x" + "ab" * 20],
+                        help="Addresses paid in every block (label them to get transfers)")
+    args = parser.parse_args()
+    
+    chain = Chain(args.start, args.addresses, args.txs)
+    threading.Thread(target=produce, args=(chain, args), daemon=True).start()
+    
+    servers = [
+        ThreadingHTTPServer(("127.0.0.1", port), make_handler(chain, port not in args.no_block_receipts))
+        for port in args.port
+    ]
+    for server in servers[1:]:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    for port in args.port:
+        receipts = "" if port not in args.no_block_receipts else " (no eth_getBlockReceipts)"
+        print(f"Serving EVM JSON-RPC on http://127.0.0.1:{port}{receipts} from block {args.start}")
+    try:
+        servers[0].serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.server_close()
+        print(f"Reorgs: {chain.reorgs}, head {chain.blocks[-1]['number']}")
+
+
+if __name__ == "__main__":
+    main()
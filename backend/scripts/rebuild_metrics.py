@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Rebuild all flow metrics from raw transfers, one month at a time
+
+Run once after upgrading past migrations 004 and 006: buckets aggregated
+before them can hold duplicate transfers the natural key has since removed,
+and the periodic aggregation only recomputes recent ones.
+
+Usage:
+    python scripts/rebuild_metrics.py [--since 2024-01-01]
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from app.db.session import SessionLocal
+from app.db.models import FlowMetric, RawTransfer
+from app.db.partitions import add_months, month_start
+from app.services.metrics import MetricsService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--since", type=datetime.fromisoformat, help="First month to rebuild (default: oldest transfer or metric)")
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    try:
+        since = args.since
+        if since is None:
+            oldest = [db.query(func.min(RawTransfer.timestamp)).scalar(), db.query(func.min(FlowMetric.time_bucket)).scalar()]
+            oldest = [timestamp for timestamp in oldest if timestamp is not None]
+            if not oldest:
+                print("No transfers or metrics, nothing to rebuild")
+                return
+            since = min(oldest)
+        
+        service = MetricsService(db)
+        month = month_start(since)
+        end = datetime.utcnow() + timedelta(days=1)
+        while datetime(month.year, month.month, 1) < end:
+            start = datetime(month.year, month.month, 1)
+            next_month = add_months(month, 1)
+            results = service.rebuild_range(start, datetime(next_month.year, next_month.month, 1))
+            print(f"{month:%Y-%m}: 1h={results['1h']['total']} 1d={results['1d']['total']} buckets")
+            month = next_month
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Local WebSocket JSON-RPC stand-in announcing newHeads and pending transactions, for running the EVM head subscriber
+and pending transaction watcher without a node
+
+Usage:
+    python scripts/ws_rpc_stub.py --port 8546 --interval 12
+    python scripts/ws_rpc_stub.py --interval 1 --skip-every 5 --drop-every 20   # gaps and dropped connections
+    EVM_WS_URL=ws://127.0.0.1:8546 python -m app.head_subscriber                # from worker/
+    python scripts/ws_rpc_stub.py --pending-rate 2000                           # pending transactions per second
+
+Answers eth_subscribe("newHeads"), eth_subscribe("newPendingTransactions"[, true]) and eth_blockNumber;
+other methods get a "method not found" error.
+"""
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import time
+
+
+class Chain:
+    def __init__(self, start: int):
+        self.head = start
+        self.subscribers = set()
+        self.pending_subscribers = set()
+        self.ids = itertools.count(1)
+    
+    def header(self, number: int) -> dict:
+        return {
+            "number": hex(number),
+            "hash": "0x" + hashlib.sha256(b"stub head %d" % number).hexdigest(),
+            "parentHash": "0x" + hashlib.sha256(b"stub head %d" % (number - 1)).hexdigest(),
+            "timestamp": hex(int(time.time())),
+        }
+
+
+async def produce(chain: Chain, args):
+    """Advance the head and notify subscribers, skipping announcements and dropping connections as asked"""
+    for announced in itertools.count(1):
+        await asyncio.sleep(args.interval)
+        chain.head += 1
+        if args.skip_every and announced % args.skip_every == 0:
+            print(f"head {chain.head} not announced")
+            continue
+        for ws, subscription in list(chain.subscribers):
+            message = {"jsonrpc": "2.0", "method": "eth_subscription",
+                       "params": {"subscription": subscription, "result": chain.header(chain.head)}}
+            try:
+                await ws.send(json.dumps(message))
+            except Exception:
+                chain.subscribers.discard((ws, subscription))
+        print(f"head {chain.head} -> {len(chain.subscribers)} subscribers")
+        if args.drop_every and announced % args.drop_every == 0:
+            for ws, _ in list(chain.subscribers):
+                await ws.close()
+            chain.subscribers.clear()
+            print("dropped all connections")
+
+
+def pending_transaction() -> dict:
+    return {
+        "hash": "0x" + random.randbytes(32).hex(),
+        "from": "0x" + random.randbytes(20).hex(),
+        "to": "0x" + random.randbytes(20).hex(),
+        "value": hex(random.randint(10 ** 15, 10 ** 19)),
+        "input": "0x",
+    }
+
+
+async def produce_pending(chain: Chain, rate: int):
+    """Announce random pending transactions, in 100 ms batches"""
+    per_tick = max(1, rate // 10)
+    while True:
+        await asyncio.sleep(0.1)
+        for ws, subscription, full in list(chain.pending_subscribers):
+            try:
+                for _ in range(per_tick):
+                    tx = pending_transaction()
+                    message = {"jsonrpc": "2.0", "method": "eth_subscription",
+                               "params": {"subscription": subscription, "result": tx if full else tx["hash"]}}
+                    await ws.send(json.dumps(message))
+            except Exception:
+                chain.pending_subscribers.discard((ws, subscription, full))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8546)
+    parser.add_argument("--start", type=int, default=19000000, help="Initial head number")
+    parser.add_argument("--interval", type=float, default=12, help="Seconds between blocks")
+    parser.add_argument("--skip-every", type=int, default=0, help="Do not announce every Nth block")
+    parser.add_argument("--drop-every", type=int, default=0, help="Close all connections every N blocks")
+    parser.add_argument("--pending-rate", type=int, default=0, help="Pending transactions announced per second")
+    args = parser.parse_args()
+    
+    import websockets
+    
+    chain = Chain(args.start)
+    
+    async def handle(ws, *_):
+        async for raw in ws:
+            request = json.loads(raw)
+            reply = {"jsonrpc": "2.0", "id": request.get("id")}
+            if request.get("method") == "eth_subscribe" and request.get("params") == ["newHeads"]:
+                reply["result"] = hex(next(chain.ids))
+                # Reply before the first notification, like a node
+                await ws.send(json.dumps(reply))
+                chain.subscribers.add((ws, reply["result"]))
+                continue
+            if request.get("method") == "eth_subscribe" and request.get("params", [None])[0] == "newPendingTransactions":
+                reply["result"] = hex(next(chain.ids))
+                await ws.send(json.dumps(reply))
+                chain.pending_subscribers.add((ws, reply["result"], request["params"][1:] == [True]))
+                continue
+            if request.get("method") == "eth_blockNumber":
+                reply["result"] = hex(chain.head)
+            else:
+                reply["error"] = {"code": -32601, "message": "the method does not exist/is not available"}
+            await ws.send(json.dumps(reply))
+    
+    async def serve():
+        async with websockets.serve(handle, "127.0.0.1", args.port):
+            print(f"Serving newHeads on ws://127.0.0.1:{args.port}")
+            if args.pending_rate:
+                asyncio.create_task(produce_pending(chain, args.pending_rate))
+            await produce(chain, args)
+    
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for Bitcoin Core's -zmqpubhashblock publisher, for running the BTC block listener without a node
+
+Usage:
+    python scripts/zmq_stub.py --port 28332 --interval 10             # one block every 10s
+    python scripts/zmq_stub.py --interval 30 --burst 5 --gap-every 4  # bursts (catch-up/reorg), skipped sequences
+    BTC_ZMQ_URL=tcp://127.0.0.1:28332 python -m app.zmq_listener      # from worker/
+
+Publishes [b"hashblock", 32-byte hash, 4-byte little-endian sequence] like bitcoind.
+"""
+import argparse
+import hashlib
+import struct
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=28332)
+    parser.add_argument("--interval", type=float, default=10, help="Seconds between announcements (or bursts)")
+    parser.add_argument("--burst", type=int, default=1, help="Blocks announced back to back each interval")
+    parser.add_argument("--count", type=int, default=0, help="Stop after this many blocks (0 runs until interrupted)")
+    parser.add_argument("--gap-every", type=int, default=0, help="Skip a sequence number every N messages")
+    args = parser.parse_args()
+    
+    import zmq
+    
+    socket = zmq.Context.instance().socket(zmq.PUB)
+    socket.bind(f"tcp://127.0.0.1:{args.port}")
+    print(f"Publishing hashblock on tcp://127.0.0.1:{args.port}")
+    # Subscribers that connect right away would miss the first message otherwise
+    time.sleep(1)
+    
+    sequence = 0
+    height = 0
+    try:
+        while not args.count or height < args.count:
+            for _ in range(args.burst):
+                if args.gap_every and sequence and sequence % args.gap_every == 0:
+                    sequence += 1
+                block_hash = hashlib.sha256(b"stub block %d" % height).digest()
+                socket.send_multipart([b"hashblock", block_hash, struct.pack("<I", sequence)])
+                print(f"hashblock {block_hash.hex()} seq {sequence}")
+                sequence += 1
+                height += 1
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        socket.close(linger=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -31,6 +31,10 @@ celery_app.conf.update(
             "task": "btc_sync_task",
             "schedule": 60.0,  # Every 60 seconds
         },
+        "backfill-dispatch": {
+            "task": "backfill_dispatch_task",
+            "schedule": 30.0,  # Every 30 seconds
+        },
         "metrics-aggregate": {
             "task": "metrics_aggregate_task",
             "schedule": 300.0,  # Every 5 minutes
@@ -39,13 +43,28 @@ celery_app.conf.update(
             "task": "alerts_task",
             "schedule": 300.0,  # Every 5 minutes
         },
+        "partition-maintenance": {
+            "task": "partition_maintenance_task",
+            "schedule": 86400.0,  # Daily
+        },
     },
 )
 
 # Register tasks
-from app.ingestion.tasks import evm_sync_task, btc_sync_task, metrics_aggregate_task, alerts_task
+from app.ingestion.tasks import (
+    evm_sync_task,
+    btc_sync_task,
+    backfill_dispatch_task,
+    backfill_range_task,
+    metrics_aggregate_task,
+    alerts_task,
+    partition_maintenance_task,
+)
 
 celery_app.task(name="evm_sync_task")(evm_sync_task)
 celery_app.task(name="btc_sync_task")(btc_sync_task)
+celery_app.task(name="backfill_dispatch_task")(backfill_dispatch_task)
+celery_app.task(name="backfill_range_task")(backfill_range_task)
 celery_app.task(name="metrics_aggregate_task")(metrics_aggregate_task)
 celery_app.task(name="alerts_task")(alerts_task)
+celery_app.task(name="partition_maintenance_task")(partition_maintenance_task)
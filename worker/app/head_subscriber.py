@@ -0,0 +1,43 @@
+"""
+EVM newHeads subscriber for worker
+Run with: python -m app.head_subscriber (needs EVM_WS_URL)
+
+Syncs run in this process, so the address index, token cache and HTTP pool stay warm between blocks.
+"""
+import sys
+import os
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../backend"))
+
+import asyncio
+import logging
+import signal
+from app.core.config import settings
+from app.ingestion.evm.head_subscriber import HeadSubscriber
+from app.ingestion.tasks import evm_sync_task
+
+logger = logging.getLogger(__name__)
+
+
+async def run():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+    
+    subscriber = HeadSubscriber(on_head=lambda head: evm_sync_task())
+    await subscriber.run(stop)
+    logger.info(f"EVM newHeads subscriber stopped: {subscriber.stats}")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if not settings.EVM_WS_URL:
+        logger.error("EVM_WS_URL is not set, nothing to subscribe to")
+        sys.exit(1)
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Pending (mempool) flow watchers for worker
+Run with: python -m app.pending_watcher evm   (needs EVM_PENDING_WS_URL or EVM_WS_URL)
+          python -m app.pending_watcher btc   (needs BTC_ZMQ_RAWTX_URL and pyzmq)
+
+Matches are kept in Redis for PENDING_FLOW_TTL_SECONDS and confirmed by the syncs once mined.
+"""
+import sys
+import os
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../backend"))
+
+import argparse
+import asyncio
+import logging
+import signal
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+async def run_evm():
+    from app.ingestion.evm.pending_watcher import PendingTransactionWatcher
+    
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+    
+    watcher = PendingTransactionWatcher()
+    await watcher.run(stop)
+    logger.info(f"EVM pending transaction watcher stopped: {watcher.stats}")
+
+
+def run_btc():
+    from app.ingestion.btc.mempool_watcher import MempoolWatcher
+    
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+    signal.signal(signal.SIGINT, lambda *_: stopping.append(True))
+    
+    watcher = MempoolWatcher()
+    watcher.run(stop=lambda: bool(stopping))
+    logger.info(f"BTC mempool watcher stopped: {watcher.stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch pending transactions for labeled address flows")
+    parser.add_argument("chain", choices=["evm", "btc"])
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if not settings.PENDING_FLOWS_ENABLED:
+        logger.error("PENDING_FLOWS_ENABLED is off, pending flows would never be confirmed")
+        sys.exit(1)
+    
+    if args.chain == "evm":
+        if not (settings.EVM_PENDING_WS_URL or settings.EVM_WS_URL):
+            logger.error("EVM_PENDING_WS_URL / EVM_WS_URL is not set, nothing to subscribe to")
+            sys.exit(1)
+        asyncio.run(run_evm())
+    else:
+        if not settings.BTC_ZMQ_RAWTX_URL:
+            logger.error("BTC_ZMQ_RAWTX_URL is not set, nothing to listen to")
+            sys.exit(1)
+        run_btc()
+
+
+if __name__ == "__main__":
+    main()
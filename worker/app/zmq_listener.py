@@ -0,0 +1,38 @@
+"""
+BTC block notification listener for worker
+Run with: python -m app.zmq_listener (needs BTC_ZMQ_URL and pyzmq)
+"""
+import sys
+import os
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../backend"))
+
+import logging
+import signal
+from app.celery_app import celery_app
+from app.core.config import settings
+from app.ingestion.btc.zmq_listener import BlockNotificationListener
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if not settings.BTC_ZMQ_URL:
+        logger.error("BTC_ZMQ_URL is not set, nothing to listen to")
+        sys.exit(1)
+    
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+    signal.signal(signal.SIGINT, lambda *_: stopping.append(True))
+    
+    listener = BlockNotificationListener(
+        dispatch=lambda: celery_app.send_task("btc_sync_task", kwargs={"catch_up": True})
+    )
+    listener.run(stop=lambda: bool(stopping))
+    logger.info(f"BTC block notification listener stopped: {listener.stats}")
+
+
+if __name__ == "__main__":
+    main()